@@ -1,13 +1,18 @@
+import os
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
+from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 from flask_bcrypt import Bcrypt
+from flask_mail import Mail
 from flask_cors import CORS
 from flask_socketio import SocketIO
 
 db = SQLAlchemy()
+migrate = Migrate()
 jwt = JWTManager()
 bcrypt = Bcrypt()
+mail = Mail()
 socketio = SocketIO(cors_allowed_origins="*", async_mode="threading")
 
 def create_app():
@@ -15,8 +20,10 @@ def create_app():
     app.config.from_object('app.config.Config')
 
     db.init_app(app)
+    migrate.init_app(app, db, directory=os.path.join(os.path.dirname(app.root_path), "migrations"))
     jwt.init_app(app)
     bcrypt.init_app(app)
+    mail.init_app(app)
     socketio.init_app(app)
 
     CORS(app, resources={r"/*": {
@@ -25,7 +32,8 @@ def create_app():
             "https://127.0.0.1:5173",
             "https://192.168.100.11:5173",
             "https://10.167.47.181:5173"
-        ]
+        ],
+        "expose_headers": ["X-Siguiente-Cursor"]
     }}, supports_credentials=True)
 
     from app.routes.auth import auth_bp
@@ -37,6 +45,9 @@ def create_app():
     from app.routes.inscripciones import inscripciones_bp
     from app.routes.carreras import carreras_bp
     from app.routes.chatbot import chatbot_bp
+    from app.routes.sincronizacion import sincronizacion_bp
+    from app.routes.correos import correos_bp
+    from app.routes.importaciones import importaciones_bp
 
     app.register_blueprint(auth_bp, url_prefix="/auth")
     app.register_blueprint(usuarios_bp, url_prefix="/usuarios")
@@ -47,5 +58,26 @@ def create_app():
     app.register_blueprint(inscripciones_bp, url_prefix='/inscripciones')
     app.register_blueprint(carreras_bp, url_prefix="/carreras")
     app.register_blueprint(chatbot_bp, url_prefix="/chatbot")
+    app.register_blueprint(sincronizacion_bp, url_prefix="/sincronizacion")
+    app.register_blueprint(correos_bp, url_prefix="/correos")
+    app.register_blueprint(importaciones_bp, url_prefix="/importaciones")
+
+    from app.routes import sockets  # registra los eventos de Socket.IO
+
+    from app.utils.cola_registros import cola_registros
+    cola_registros.init_app(app)
+
+    from app.utils.envio_correos import envio_correos
+    envio_correos.init_app(app)
+
+    from app.utils.importaciones import importaciones
+    from app.utils.importacion_usuarios import ProcesadorUsuarios
+    from app.utils.importacion_materias import ProcesadorMaterias
+    importaciones.init_app(app)
+    importaciones.registrar("usuarios", ProcesadorUsuarios)
+    importaciones.registrar("materias", ProcesadorMaterias)
+
+    from app.comandos import registrar_comandos
+    registrar_comandos(app)
 
     return app
@@ -0,0 +1,151 @@
+import click
+from flask.cli import AppGroup
+
+# ============================================================
+# COMANDOS DE MANTENIMIENTO (flask <grupo> <comando>)
+# ============================================================
+acumulados_cli = AppGroup("acumulados", help="Acumulados de asistencia por estudiante y materia.")
+
+
+@acumulados_cli.command("reconstruir")
+def reconstruir_acumulados():
+    """Recalcula todos los acumulados desde los registros de asistencia (también tras cambiar qué cuentan)."""
+    from app.utils.acumulados import reconstruir
+
+    reconstruir()
+    click.echo("✅ Acumulados de asistencia reconstruidos")
+
+
+inscripciones_cli = AppGroup("inscripciones", help="Operaciones en lote sobre inscripciones.")
+
+
+@inscripciones_cli.command("bajas-automaticas")
+@click.option("--umbral", type=float, default=None, help="Proporción máxima de ausencias (0-1).")
+@click.option("--minimo-clases", type=int, default=None, help="Clases mínimas antes de evaluar.")
+@click.option("--aplicar", is_flag=True, help="Aplica las bajas (por defecto solo simula).")
+def bajas_automaticas(umbral, minimo_clases, aplicar):
+    """Da de baja por inasistencia a quienes superan el umbral."""
+    from app.utils.bajas import evaluar_bajas
+
+    afectadas = evaluar_bajas(umbral=umbral, minimo_clases=minimo_clases, aplicar=aplicar)
+    for a in afectadas:
+        click.echo(f"{a['id']}\testudiante={a['estudiante_id']}\tmateria={a['materia_id']}\t{a['porcentaje_inasistencia']}%")
+    click.echo(f"{'✅ Bajas aplicadas' if aplicar else 'Simulación'}: {len(afectadas)} inscripciones")
+
+
+asistencia_cli = AppGroup("asistencia", help="Registro diferido (write-behind) de asistencias.")
+
+
+@asistencia_cli.command("recuperar-diario")
+def recuperar_diario():
+    """Vuelca los registros que quedaron en el diario (con el servidor detenido)."""
+    from app.utils.cola_registros import cola_registros
+
+    try:
+        pendientes = cola_registros.recuperar()
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    if pendientes:
+        raise click.ClickException(f"{len(pendientes)} registros siguen en el diario (sin conexión)")
+    click.echo("✅ Diario de asistencias volcado")
+
+
+registros_cli = AppGroup("registros", help="Particiones mensuales de registros_de_asistencia.")
+
+
+@registros_cli.command("crear-particiones")
+@click.option("--meses", type=int, default=None, help="Meses hacia adelante (por defecto REGISTROS_PARTICIONES_FUTURAS).")
+def crear_particiones(meses):
+    """Crea las particiones del mes actual y de los próximos meses."""
+    from app.utils.particiones import crear_particiones_futuras
+
+    creadas = crear_particiones_futuras(meses)
+    for nombre in creadas:
+        click.echo(nombre)
+    click.echo(f"✅ Particiones creadas: {len(creadas)}")
+
+
+@registros_cli.command("convertir")
+def convertir_registros():
+    """Convierte la tabla común existente en tabla particionada por mes."""
+    from app.utils.particiones import convertir
+
+    if convertir():
+        click.echo("✅ registros_de_asistencia ahora está particionada por mes")
+    else:
+        click.echo("La tabla ya estaba particionada")
+
+
+@registros_cli.command("archivar")
+@click.option("--semestres", type=int, default=2, help="Cuatrimestres a conservar, contando el actual.")
+@click.option("--esquema", default=None, help="Esquema al que mover las particiones archivadas.")
+def archivar_registros(semestres, esquema):
+    """Desengancha las particiones de cuatrimestres viejos, congelando antes sus acumulados."""
+    from app.utils.particiones import archivar
+
+    try:
+        archivadas = archivar(semestres, esquema)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    for nombre in archivadas:
+        click.echo(nombre)
+    click.echo(f"✅ Particiones archivadas: {len(archivadas)}")
+
+
+indices_cli = AppGroup("indices", help="Índices de las consultas frecuentes.")
+
+
+@indices_cli.command("verificar")
+def verificar_indices():
+    """Corre EXPLAIN sobre las consultas clave y falla si alguna recorre la tabla entera."""
+    from app.utils.planes import verificar_planes
+
+    fallas = 0
+    for nombre, tabla, ok, secuenciales in verificar_planes():
+        if ok:
+            click.echo(f"✅ {nombre} ({tabla})")
+        else:
+            fallas += 1
+            click.echo(f"❌ {nombre}: Seq Scan en {', '.join(secuenciales)}")
+    if fallas:
+        raise click.ClickException(f"{fallas} consultas sin índice")
+
+
+sincronizacion_cli = AppGroup("sincronizacion", help="Sincronización incremental de clientes.")
+
+
+@sincronizacion_cli.command("purgar")
+@click.option("--dias", type=int, default=None, help="Días a conservar (por defecto SINCRONIZACION_RETENCION_DIAS).")
+def purgar_sincronizacion(dias):
+    """Borra las lápidas viejas; los clientes con una marca anterior se resincronizan completos."""
+    from app.utils.sincronizacion import purgar_eliminaciones
+
+    click.echo(f"✅ Lápidas borradas: {purgar_eliminaciones(dias)}")
+
+
+correos_cli = AppGroup("correos", help="Bandeja de salida de correos.")
+
+
+@correos_cli.command("enviar")
+def enviar_correos():
+    """Envía ahora todos los correos pendientes (sin esperar al hilo de fondo)."""
+    from app.utils.envio_correos import envio_correos
+
+    total = 0
+    while True:
+        tomados = envio_correos.enviar_pendientes()
+        if not tomados:
+            break
+        total += tomados
+    estado = envio_correos.estado()
+    click.echo(f"✅ Correos procesados: {total} (pendientes: {estado['pendientes']}, fallidos: {estado['fallidos']})")
+
+
+def registrar_comandos(app):
+    app.cli.add_command(acumulados_cli)
+    app.cli.add_command(inscripciones_cli)
+    app.cli.add_command(asistencia_cli)
+    app.cli.add_command(registros_cli)
+    app.cli.add_command(indices_cli)
+    app.cli.add_command(sincronizacion_cli)
+    app.cli.add_command(correos_cli)
@@ -7,6 +7,59 @@ class Config:
     JWT_VERIFY_SUB = False
     SECRET_KEY = os.environ.get('SECRET_KEY', 'G7x@kZ9vK#kTf9Qw$3x!')
 
+    # === Umbrales de asistencia (minutos desde el inicio de la clase) ===
+    ASISTENCIA_MINUTOS_PRESENTE = int(os.environ.get("ASISTENCIA_MINUTOS_PRESENTE", "5"))
+    ASISTENCIA_MINUTOS_TARDANZA = int(os.environ.get("ASISTENCIA_MINUTOS_TARDANZA", "30"))
+
+    # === Registro de asistencias en lote ===
+    ASISTENCIA_LOTE_MAX = int(os.environ.get("ASISTENCIA_LOTE_MAX", "10000"))
+    ASISTENCIA_LOTE_MAX_BYTES = int(os.environ.get("ASISTENCIA_LOTE_MAX_BYTES", str(8 * 1024 * 1024)))  # cuerpo, comprimido o no
+
+    # === Baja automática por inasistencia ===
+    BAJA_MAX_INASISTENCIAS = float(os.environ.get("BAJA_MAX_INASISTENCIAS", "0.25"))  # proporción de ausencias
+    BAJA_MINIMO_CLASES = int(os.environ.get("BAJA_MINIMO_CLASES", "4"))
+
+    # === Registro diferido (write-behind) de asistencias ===
+    ASISTENCIA_WRITE_BEHIND = os.environ.get("ASISTENCIA_WRITE_BEHIND", "false").lower() == "true"
+    ASISTENCIA_FLUSH_MS = int(os.environ.get("ASISTENCIA_FLUSH_MS", "200"))
+    ASISTENCIA_FLUSH_FILAS = int(os.environ.get("ASISTENCIA_FLUSH_FILAS", "500"))
+    ASISTENCIA_DIARIO_DIR = os.environ.get("ASISTENCIA_DIARIO_DIR")  # diario con fsync; por defecto <instance>/diario_asistencia
+    ASISTENCIA_MAX_REINTENTOS = int(os.environ.get("ASISTENCIA_MAX_REINTENTOS", "10"))  # por fila, antes de descartarla
+
+    # === Asistencia en vivo (Socket.IO): cada cuánto se emite el lote ===
+    ASISTENCIA_EMISION_MS = int(os.environ.get("ASISTENCIA_EMISION_MS", "300"))
+
+    # === Tokens QR rotativos ===
+    QR_ROTACION_SEGUNDOS = int(os.environ.get("QR_ROTACION_SEGUNDOS", "15"))
+    QR_VALIDEZ_SEGUNDOS = int(os.environ.get("QR_VALIDEZ_SEGUNDOS", "30"))  # ventana actual + la anterior
+
+    # === Cronogramas de clases recurrentes: máximo de clases por pedido ===
+    CLASES_RECURRENTES_MAX = int(os.environ.get("CLASES_RECURRENTES_MAX", "5000"))
+
+    # === Importaciones de Excel/CSV en segundo plano ===
+    IMPORTACIONES_DIR = os.environ.get("IMPORTACIONES_DIR")  # por defecto <instance>/importaciones
+    IMPORTACIONES_HILOS = int(os.environ.get("IMPORTACIONES_HILOS", "1"))  # trabajos simultáneos
+    IMPORTACION_BLOQUE = int(os.environ.get("IMPORTACION_BLOQUE", "1000"))  # filas por transacción
+    IMPORTACION_MAX_ERRORES = int(os.environ.get("IMPORTACION_MAX_ERRORES", "500"))  # detalle guardado por trabajo
+
+    # === Importación masiva de usuarios: hilos para los hashes bcrypt (0 = uno por CPU) ===
+    USUARIOS_HASH_HILOS = int(os.environ.get("USUARIOS_HASH_HILOS", "0"))
+
+    # === Listado de clases: tamaño de página por defecto y máximo ===
+    CLASES_LIMITE = int(os.environ.get("CLASES_LIMITE", "200"))
+    CLASES_LIMITE_MAX = int(os.environ.get("CLASES_LIMITE_MAX", "500"))
+
+    # === Sincronización incremental (deltas por marca de agua) ===
+    SINCRONIZACION_LIMITE = int(os.environ.get("SINCRONIZACION_LIMITE", "1000"))  # filas por tabla y página
+    SINCRONIZACION_RETENCION_DIAS = int(os.environ.get("SINCRONIZACION_RETENCION_DIAS", "90"))  # lápidas
+
+    # === Particiones mensuales de registros_de_asistencia ===
+    REGISTROS_PARTICIONES_FUTURAS = int(os.environ.get("REGISTROS_PARTICIONES_FUTURAS", "3"))  # meses por delante
+
+    # === Analítica de asistencia: vigencia y tamaño del cache por filtros ===
+    ANALITICA_CACHE_SEGUNDOS = int(os.environ.get("ANALITICA_CACHE_SEGUNDOS", "300"))
+    ANALITICA_CACHE_MAX = int(os.environ.get("ANALITICA_CACHE_MAX", "64"))  # combinaciones de filtros
+
  # === Configuración de Flask-Mail ===
     MAIL_SERVER = os.environ.get("MAIL_SERVER", "smtp.gmail.com")
     MAIL_PORT = int(os.environ.get("MAIL_PORT", "587"))
@@ -17,4 +70,12 @@ class Config:
         os.environ.get("MAIL_DEFAULT_NAME", "Sistema de Asistencia"),
         os.environ.get("MAIL_DEFAULT_EMAIL", os.environ.get("MAIL_USERNAME", ""))
     )
-    MAIL_SUPPRESS_SEND = os.environ.get("MAIL_SUPPRESS_SEND", "false").lower() == "true"
\ No newline at end of file
+    MAIL_SUPPRESS_SEND = os.environ.get("MAIL_SUPPRESS_SEND", "false").lower() == "true"
+
+    # === Bandeja de salida de correos (envío en segundo plano) ===
+    CORREOS_WORKER = os.environ.get("CORREOS_WORKER", "true").lower() == "true"
+    CORREOS_INTERVALO_SEGUNDOS = int(os.environ.get("CORREOS_INTERVALO_SEGUNDOS", "5"))
+    CORREOS_LOTE = int(os.environ.get("CORREOS_LOTE", "50"))  # correos por conexión SMTP
+    CORREOS_MAX_INTENTOS = int(os.environ.get("CORREOS_MAX_INTENTOS", "6"))
+    CORREOS_REINTENTO_SEGUNDOS = int(os.environ.get("CORREOS_REINTENTO_SEGUNDOS", "60"))  # se duplica en cada intento
+    CORREOS_BLOQUEO_SEGUNDOS = int(os.environ.get("CORREOS_BLOQUEO_SEGUNDOS", "300"))  # reserva de un lote en curso
@@ -1,5 +1,10 @@
 from app import db
 from datetime import datetime
+from sqlalchemy import DDL, event
+
+# Transacción que escribe la fila (xid8 como entero): ordena los cambios
+# por confirmación para la sincronización (ver app/utils/sincronizacion.py)
+XID_ACTUAL = db.text("pg_current_xact_id()::text::bigint")
 
 class Usuario(db.Model):
     __tablename__ = 'usuarios'
@@ -19,7 +24,7 @@ class Usuario(db.Model):
 class Docente(db.Model):
     __tablename__ = 'docentes'
     id = db.Column(db.Integer, primary_key=True)
-    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False, index=True)
     usuario = db.relationship('Usuario', backref='docente')
 
 class Curso(db.Model):
@@ -27,12 +32,14 @@ class Curso(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     nombre = db.Column(db.String(100))
     nivel = db.Column(db.String(50))
-    carrera_id = db.Column(db.Integer, db.ForeignKey("carreras.id"), nullable=False) #agregado
+    carrera_id = db.Column(db.Integer, db.ForeignKey("carreras.id"), nullable=False, index=True) #agregado
+    actualizado_en = db.Column(db.DateTime, nullable=False, server_default=db.func.now(), server_onupdate=db.FetchedValue())  # sincronización
+    transaccion_id = db.Column(db.BigInteger, nullable=False, server_default=XID_ACTUAL, server_onupdate=db.FetchedValue())  # sincronización
 
 class Estudiante(db.Model):
     __tablename__ = 'estudiantes'
     id = db.Column(db.Integer, primary_key=True)
-    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'))
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), index=True)
     curso_id = db.Column(db.Integer, db.ForeignKey('cursos.id'))
     qr_codigo = db.Column(db.Text, unique=True)
 
@@ -40,22 +47,41 @@ class Estudiante(db.Model):
 
 class Materia(db.Model):
     __tablename__ = 'materias'
+    __table_args__ = (
+        # Búsqueda por nombre con ILIKE '%texto%' (requiere pg_trgm)
+        db.Index('ix_materias_nombre_trgm', 'nombre',
+                 postgresql_using='gin', postgresql_ops={'nombre': 'gin_trgm_ops'}),
+    )
     id = db.Column(db.Integer, primary_key=True)
     nombre = db.Column(db.String(100), nullable=False)
-    curso_id = db.Column(db.Integer, db.ForeignKey('cursos.id'), nullable=False)
-    docente_id = db.Column(db.Integer, db.ForeignKey('docentes.id'), nullable=True)
+    curso_id = db.Column(db.Integer, db.ForeignKey('cursos.id'), nullable=False, index=True)
+    docente_id = db.Column(db.Integer, db.ForeignKey('docentes.id'), nullable=True, index=True)
+    actualizado_en = db.Column(db.DateTime, nullable=False, server_default=db.func.now(), server_onupdate=db.FetchedValue())  # sincronización
+    transaccion_id = db.Column(db.BigInteger, nullable=False, server_default=XID_ACTUAL, server_onupdate=db.FetchedValue())  # sincronización
 
     curso = db.relationship('Curso', backref='materias')
     docente = db.relationship('Docente', backref='materias')
 
+event.listen(
+    Materia.__table__, 'before_create',
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect='postgresql')
+)
+
 class Clase(db.Model):
     __tablename__ = 'clases'
+    __table_args__ = (
+        db.Index('ix_clases_materia_fecha', 'materia_id', 'fecha'),
+        db.Index('ix_clases_docente_fecha', 'docente_id', 'fecha'),
+        db.Index('ix_clases_fecha', 'fecha'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     materia_id = db.Column(db.Integer, db.ForeignKey('materias.id'), nullable=False)
     docente_id = db.Column(db.Integer, db.ForeignKey('docentes.id'), nullable=False)
     fecha = db.Column(db.Date, nullable=False)
     hora_inicio = db.Column(db.Time, nullable=False)
     hora_fin = db.Column(db.Time, nullable=False)
+    actualizado_en = db.Column(db.DateTime, nullable=False, server_default=db.func.now(), server_onupdate=db.FetchedValue())  # sincronización
+    transaccion_id = db.Column(db.BigInteger, nullable=False, server_default=XID_ACTUAL, server_onupdate=db.FetchedValue())  # sincronización
 
     materia = db.relationship('Materia', backref='clases')
     docente = db.relationship('Docente', backref='clases')
@@ -64,6 +90,12 @@ class Clase(db.Model):
 
 class EstudiantesMaterias(db.Model):
     __tablename__ = 'estudiantes_materias'
+    __table_args__ = (
+        # Padrón de una materia: solo inscripciones activas
+        db.Index('ix_estudiantes_materias_activas', 'materia_id', 'estudiante_id',
+                 postgresql_where=db.text("estado = 'activo'")),
+        db.Index('ix_estudiantes_materias_estudiante', 'estudiante_id', 'materia_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     estudiante_id = db.Column(db.Integer, db.ForeignKey('estudiantes.id'), nullable=False)
     materia_id = db.Column(db.Integer, db.ForeignKey('materias.id'), nullable=False)
@@ -71,6 +103,8 @@ class EstudiantesMaterias(db.Model):
     fecha_baja = db.Column(db.DateTime, nullable=True)
     estado = db.Column(db.String(30), default='activo')  # 'activo' o 'baja_por_inasistencia'
     docente_id = db.Column(db.Integer, db.ForeignKey('docentes.id'),nullable=True)  # opcional para registrar la baja
+    actualizado_en = db.Column(db.DateTime, nullable=False, server_default=db.func.now(), server_onupdate=db.FetchedValue())  # sincronización
+    transaccion_id = db.Column(db.BigInteger, nullable=False, server_default=XID_ACTUAL, server_onupdate=db.FetchedValue())  # sincronización
 
     estudiante = db.relationship('Estudiante', backref='inscripciones')
     materia = db.relationship('Materia', backref='inscriptos')
@@ -78,23 +112,229 @@ class EstudiantesMaterias(db.Model):
 
 class RegistrosDeAsistencia(db.Model):
     __tablename__ = 'registros_de_asistencia'
+    # Tabla particionada por mes sobre fecha_hora (ver app/utils/particiones.py).
+    # La clave primaria incluye la columna de partición; el registro único
+    # por estudiante y clase lo garantiza RegistroUnico (el índice único de
+    # cada partición solo cubre su mes).
+    __table_args__ = (
+        db.Index('ix_registros_de_asistencia_clase_id', 'clase_id'),
+        db.Index('ix_registros_de_asistencia_fecha_hora_id', 'fecha_hora', 'id'),
+        {'postgresql_partition_by': 'RANGE (fecha_hora)'},
+    )
 
-    id = db.Column(db.Integer, primary_key=True)
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     estudiante_id = db.Column(db.Integer, db.ForeignKey('estudiantes.id'), nullable=False)
     clase_id = db.Column(db.Integer, db.ForeignKey('clases.id'), nullable=False)
     método_registro = db.Column(db.String(20), nullable=False)  # 'QR' o 'Reconocimiento facial'
-    fecha_hora = db.Column(db.DateTime, default=datetime.now)
+    fecha_hora = db.Column(db.DateTime, primary_key=True, default=datetime.now)
 
     estudiante = db.relationship('Estudiante', backref='asistencias')
     #clase = db.relationship('Clase', backref='asistencias')
 
+# Un registro por estudiante y clase en toda la tabla: los índices únicos
+# de las particiones mensuales no ven los registros de otros meses, así que
+# cada INSERT en registros_de_asistencia toma antes el par en esta tabla
+class RegistroUnico(db.Model):
+    __tablename__ = 'registros_unicos'
+    __table_args__ = (
+        db.Index('ix_registros_unicos_clase_id', 'clase_id'),
+    )
+
+    estudiante_id = db.Column(db.Integer, db.ForeignKey('estudiantes.id', ondelete='CASCADE'), primary_key=True)
+    clase_id = db.Column(db.Integer, db.ForeignKey('clases.id', ondelete='CASCADE'), primary_key=True)
+
 class Carrera(db.Model):
     __tablename__ = "carreras"
     id = db.Column(db.Integer, primary_key=True)
     nombre = db.Column(db.String(100), nullable=False)
     descripcion = db.Column(db.String(255))
     activo = db.Column(db.Boolean, default=True)  # NUEVO
+    actualizado_en = db.Column(db.DateTime, nullable=False, server_default=db.func.now(), server_onupdate=db.FetchedValue())  # sincronización
+    transaccion_id = db.Column(db.BigInteger, nullable=False, server_default=XID_ACTUAL, server_onupdate=db.FetchedValue())  # sincronización
 
     # Relación: una carrera tiene muchos cursos
     cursos = db.relationship("Curso", backref="carrera", lazy=True)
 
+
+# Contadores de asistencia por estudiante y materia (solo clases con fecha ya alcanzada)
+class AcumuladoAsistencia(db.Model):
+    __tablename__ = 'acumulados_asistencia'
+    estudiante_id = db.Column(db.Integer, db.ForeignKey('estudiantes.id'), primary_key=True)
+    materia_id = db.Column(db.Integer, db.ForeignKey('materias.id'), primary_key=True, index=True)
+    clases = db.Column(db.Integer, nullable=False, default=0)
+    presentes = db.Column(db.Integer, nullable=False, default=0)
+    tardanzas = db.Column(db.Integer, nullable=False, default=0)
+    ausentes = db.Column(db.Integer, nullable=False, default=0)
+
+
+# Contadores congelados de las clases cuyos registros se archivaron
+# (particiones desenganchadas): se suman al recalcular los acumulados
+class AcumuladoArchivado(db.Model):
+    __tablename__ = 'acumulados_archivados'
+    estudiante_id = db.Column(db.Integer, db.ForeignKey('estudiantes.id'), primary_key=True)
+    materia_id = db.Column(db.Integer, db.ForeignKey('materias.id'), primary_key=True)
+    clases = db.Column(db.Integer, nullable=False, default=0)
+    presentes = db.Column(db.Integer, nullable=False, default=0)
+    tardanzas = db.Column(db.Integer, nullable=False, default=0)
+    ausentes = db.Column(db.Integer, nullable=False, default=0)
+
+
+# Fila única: hasta qué fecha de clase están sumados los acumulados y
+# desde qué fecha los registros siguen enganchados (archivado_hasta)
+class EstadoAcumulados(db.Model):
+    __tablename__ = 'estado_acumulados'
+    id = db.Column(db.Integer, primary_key=True)
+    acumulado_hasta = db.Column(db.Date, nullable=False)
+    archivado_hasta = db.Column(db.Date)
+
+
+
+# Bandeja de salida: los correos se envían desde un hilo en segundo plano
+class CorreoSaliente(db.Model):
+    __tablename__ = 'correos_salientes'
+    __table_args__ = (
+        db.Index('ix_correos_salientes_pendientes', 'proximo_intento',
+                 postgresql_where=db.text("estado = 'pendiente'")),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    destinatario = db.Column(db.String(100), nullable=False)
+    asunto = db.Column(db.String(200), nullable=False)
+    cuerpo = db.Column(db.Text)  # se borra al enviarse o fallar: puede tener credenciales
+    estado = db.Column(db.String(20), nullable=False, default='pendiente')  # 'pendiente', 'enviado' o 'fallido'
+    intentos = db.Column(db.Integer, nullable=False, default=0)
+    proximo_intento = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    ultimo_error = db.Column(db.Text)
+    creado_en = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    enviado_en = db.Column(db.DateTime)
+
+
+# Importaciones de Excel/CSV que se procesan en segundo plano por bloques
+class TrabajoImportacion(db.Model):
+    __tablename__ = 'trabajos_importacion'
+    id = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(20), nullable=False)  # 'usuarios' o 'materias'
+    estado = db.Column(db.String(20), nullable=False, default='pendiente')  # 'pendiente', 'procesando', 'terminado' o 'fallido'
+    archivo = db.Column(db.String(255), nullable=False)  # ruta en IMPORTACIONES_DIR
+    nombre_archivo = db.Column(db.String(255))
+    creado_por = db.Column(db.Integer, db.ForeignKey('usuarios.id'))
+    filas_procesadas = db.Column(db.Integer, nullable=False, default=0)
+    filas_importadas = db.Column(db.Integer, nullable=False, default=0)
+    total_errores = db.Column(db.Integer, nullable=False, default=0)
+    errores = db.Column(db.JSON, nullable=False, default=list)  # los primeros IMPORTACION_MAX_ERRORES
+    mensaje_error = db.Column(db.Text)
+    creado_en = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    iniciado_en = db.Column(db.DateTime)
+    terminado_en = db.Column(db.DateTime)
+
+# Filas borradas de las tablas sincronizadas (las llena un trigger). Guarda
+# a quién pertenecía la fila para mandar cada lápida solo a quien la veía.
+class Eliminacion(db.Model):
+    __tablename__ = 'eliminaciones'
+    id = db.Column(db.BigInteger, primary_key=True)
+    tabla = db.Column(db.String(50), nullable=False)
+    registro_id = db.Column(db.Integer, nullable=False)
+    eliminado_en = db.Column(db.DateTime, nullable=False, server_default=db.func.now(), index=True)
+    transaccion_id = db.Column(db.BigInteger, nullable=False, server_default=XID_ACTUAL, index=True)
+    materia_id = db.Column(db.Integer)     # la materia (o la materia de la clase / inscripción)
+    docente_id = db.Column(db.Integer)     # docente de la materia o de la clase
+    estudiante_id = db.Column(db.Integer)  # estudiante de la inscripción
+
+
+# Cambios de quién ve una materia: reasignación de docente o alta, baja o
+# reincorporación de una inscripción (los llenan triggers). La
+# sincronización reenvía o quita la materia y sus filas dependientes.
+class CambioAlcance(db.Model):
+    __tablename__ = 'cambios_alcance'
+    id = db.Column(db.BigInteger, primary_key=True)
+    transaccion_id = db.Column(db.BigInteger, nullable=False, server_default=XID_ACTUAL, index=True)
+    materia_id = db.Column(db.Integer, nullable=False)
+    docente_id = db.Column(db.Integer)
+    estudiante_id = db.Column(db.Integer)
+    creado_en = db.Column(db.DateTime, nullable=False, server_default=db.func.now(), index=True)
+
+
+# ============================================================
+# SINCRONIZACIÓN INCREMENTAL (ver app/utils/sincronizacion.py)
+# ============================================================
+# Los triggers cubren también los UPDATE/DELETE masivos (query.delete(),
+# INSERT ... SELECT, SQL crudo), que no pasan por los eventos del ORM.
+FUNCIONES_SINCRONIZACION = """
+CREATE OR REPLACE FUNCTION marcar_actualizado() RETURNS trigger AS $$
+BEGIN
+    NEW.actualizado_en := now();
+    NEW.transaccion_id := pg_current_xact_id()::text::bigint;
+    RETURN NEW;
+END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION registrar_eliminaciones() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO eliminaciones (tabla, registro_id, eliminado_en, materia_id, docente_id, estudiante_id)
+    SELECT TG_TABLE_NAME, id, now(),
+           CASE WHEN TG_TABLE_NAME = 'materias' THEN id ELSE (to_jsonb(b) ->> 'materia_id')::int END,
+           -- en estudiantes_materias, docente_id es quien dio la baja, no el dueño
+           CASE WHEN TG_TABLE_NAME = 'estudiantes_materias' THEN NULL ELSE (to_jsonb(b) ->> 'docente_id')::int END,
+           (to_jsonb(b) ->> 'estudiante_id')::int
+    FROM borradas b;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION registrar_alcance_materias() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO cambios_alcance (materia_id, docente_id)
+    SELECT n.id, x.docente_id
+    FROM nuevas n JOIN viejas v ON v.id = n.id
+    CROSS JOIN LATERAL (VALUES (v.docente_id), (n.docente_id)) x(docente_id)
+    WHERE v.docente_id IS DISTINCT FROM n.docente_id AND x.docente_id IS NOT NULL;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION registrar_alcance_inscripciones() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' THEN
+        INSERT INTO cambios_alcance (materia_id, estudiante_id)
+        SELECT DISTINCT x.materia_id, x.estudiante_id
+        FROM nuevas n JOIN viejas v ON v.id = n.id
+        CROSS JOIN LATERAL (VALUES (v.materia_id, v.estudiante_id), (n.materia_id, n.estudiante_id))
+            x(materia_id, estudiante_id)
+        WHERE (v.estado, v.materia_id, v.estudiante_id) IS DISTINCT FROM (n.estado, n.materia_id, n.estudiante_id);
+    ELSE
+        INSERT INTO cambios_alcance (materia_id, estudiante_id)
+        SELECT DISTINCT materia_id, estudiante_id FROM filas;
+    END IF;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+"""
+
+TRIGGERS_SINCRONIZACION = """
+CREATE TRIGGER trg_%(table)s_actualizado BEFORE UPDATE ON %(table)s
+    FOR EACH ROW WHEN (OLD.* IS DISTINCT FROM NEW.*) EXECUTE FUNCTION marcar_actualizado();
+CREATE TRIGGER trg_%(table)s_eliminado AFTER DELETE ON %(table)s
+    REFERENCING OLD TABLE AS borradas FOR EACH STATEMENT EXECUTE FUNCTION registrar_eliminaciones();
+"""
+
+TRIGGERS_ALCANCE = {
+    Materia: """
+CREATE TRIGGER trg_materias_alcance AFTER UPDATE ON materias
+    REFERENCING OLD TABLE AS viejas NEW TABLE AS nuevas
+    FOR EACH STATEMENT EXECUTE FUNCTION registrar_alcance_materias();
+""",
+    EstudiantesMaterias: """
+CREATE TRIGGER trg_estudiantes_materias_alcance_alta AFTER INSERT ON estudiantes_materias
+    REFERENCING NEW TABLE AS filas FOR EACH STATEMENT EXECUTE FUNCTION registrar_alcance_inscripciones();
+CREATE TRIGGER trg_estudiantes_materias_alcance_baja AFTER DELETE ON estudiantes_materias
+    REFERENCING OLD TABLE AS filas FOR EACH STATEMENT EXECUTE FUNCTION registrar_alcance_inscripciones();
+CREATE TRIGGER trg_estudiantes_materias_alcance_cambio AFTER UPDATE ON estudiantes_materias
+    REFERENCING OLD TABLE AS viejas NEW TABLE AS nuevas
+    FOR EACH STATEMENT EXECUTE FUNCTION registrar_alcance_inscripciones();
+""",
+}
+
+TABLAS_SINCRONIZADAS = [Carrera, Curso, Materia, Clase, EstudiantesMaterias]
+
+for _modelo in TABLAS_SINCRONIZADAS:
+    _tabla = _modelo.__table__
+    db.Index(f'ix_{_tabla.name}_transaccion', _tabla.c.transaccion_id, _tabla.c.id)
+    event.listen(_tabla, 'after_create', DDL(FUNCIONES_SINCRONIZACION).execute_if(dialect='postgresql'))
+    event.listen(_tabla, 'after_create', DDL(TRIGGERS_SINCRONIZACION).execute_if(dialect='postgresql'))
+    if _modelo in TRIGGERS_ALCANCE:
+        event.listen(_tabla, 'after_create', DDL(TRIGGERS_ALCANCE[_modelo]).execute_if(dialect='postgresql'))
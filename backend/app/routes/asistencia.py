@@ -1,6 +1,8 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime, date
+import json
+import zlib
 from app import db
 from app.utils.security import docente_required, estudiante_required, admin_required
 from app.models import (
@@ -21,17 +23,107 @@ asistencia_bp = Blueprint('asistencia', __name__)
 @jwt_required()
 @docente_required
 def registrar_asistencia():
+    from app.utils.registro_asistencia import insertar_registro
+    from app.utils.padron import padron
+    from app.utils.tiempo_real import emisor_asistencia
+    from app.utils import acumulados
+
     data = request.json
-    nuevo_registro = RegistrosDeAsistencia(
-        estudiante_id=data['estudiante_id'],
-        clase_id=data['clase_id'],
-        método_registro=data['metodo']
+    acumulados.poner_al_dia()
+    nuevo, fecha_hora, metodo = insertar_registro(
+        data['estudiante_id'], data['clase_id'], datetime.now(), data['metodo']
     )
-    db.session.add(nuevo_registro)
+    if nuevo:
+        acumulados.registrar_presencias([(data['estudiante_id'], data['clase_id'], fecha_hora)])
     db.session.commit()
+
+    if nuevo:
+        padron.reservar_registro(data['clase_id'], data['estudiante_id'], fecha_hora, metodo)
+        clase = padron.obtener_clase(data['clase_id'])
+        if clase:
+            emisor_asistencia.notificar(clase, data['estudiante_id'], fecha_hora)
+
     return jsonify({"mensaje": "Asistencia registrada"}), 201
 
 
+# ============================================================
+# REGISTRO EN LOTE (OFFLINE / LECTORA DE QR)
+# ============================================================
+class _CuerpoExcedido(Exception):
+    pass
+
+
+def _leer_cuerpo(limite):
+    """
+    Cuerpo de la petición, descomprimido si viene en gzip. Ni el cuerpo
+    recibido ni el descomprimido pueden pasar de `limite` bytes: se lee y
+    se descomprime solo hasta ahí (un gzip chico puede inflar a gigas).
+    """
+    if request.content_length is not None and request.content_length > limite:
+        raise _CuerpoExcedido
+    crudo = request.stream.read(limite + 1)
+    if len(crudo) > limite:
+        raise _CuerpoExcedido
+    if request.headers.get('Content-Encoding', '').lower() != 'gzip':
+        return crudo
+
+    descompresor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)  # formato gzip
+    try:
+        salida = descompresor.decompress(crudo, limite + 1)
+    except zlib.error:
+        raise ValueError("gzip inválido")
+    if len(salida) > limite:
+        raise _CuerpoExcedido
+    if not descompresor.eof:
+        raise ValueError("gzip incompleto")
+    return salida
+
+
+@asistencia_bp.route('/registrar_lote', methods=['POST'])
+@jwt_required()
+@docente_required
+def registrar_asistencia_lote():
+    from app.utils.lote_asistencia import registrar_lote
+
+    identidad = get_jwt_identity()
+    docente_id = identidad.get('docente_id')
+    if docente_id is None:
+        docente = Docente.query.filter_by(usuario_id=identidad['id']).first()
+        if not docente:
+            return jsonify({"error": "Docente no encontrado"}), 404
+        docente_id = docente.id
+
+    limite = current_app.config.get('ASISTENCIA_LOTE_MAX_BYTES', 8 * 1024 * 1024)
+    try:
+        data = json.loads(_leer_cuerpo(limite))
+    except _CuerpoExcedido:
+        return jsonify({"error": f"El cuerpo supera los {limite} bytes"}), 413
+    except ValueError:
+        return jsonify({"error": "Cuerpo inválido (se espera JSON, opcionalmente gzip)"}), 400
+
+    registros = data.get('registros') if isinstance(data, dict) else data
+    if not isinstance(registros, list):
+        return jsonify({"error": "Debe enviar una lista de registros"}), 400
+
+    maximo = current_app.config.get('ASISTENCIA_LOTE_MAX', 10000)
+    if len(registros) > maximo:
+        return jsonify({"error": f"Máximo {maximo} registros por lote"}), 413
+
+    resultados = registrar_lote(registros, docente_id=docente_id)
+
+    conteo = {}
+    for r in resultados:
+        conteo[r["estado"]] = conteo.get(r["estado"], 0) + 1
+
+    return jsonify({
+        "total": len(resultados),
+        "registrados": conteo.get("registrado", 0),
+        "ya_registrados": conteo.get("ya_registrado", 0) + conteo.get("duplicado_en_lote", 0),
+        "rechazados": conteo.get("rechazado", 0) + conteo.get("invalido", 0),
+        "resultados": resultados
+    }), 200
+
+
 # ============================================================
 # REPORTE ADMIN
 # ============================================================
@@ -39,33 +131,46 @@ def registrar_asistencia():
 @jwt_required()
 @admin_required
 def obtener_reporte_asistencia():
+    from app.utils import reporte
+
     estudiante_id = request.args.get('estudiante_id', type=int)
     materia_id = request.args.get('materia_id', type=int)
     desde = request.args.get('desde')
     hasta = request.args.get('hasta')
-
-    query = RegistrosDeAsistencia.query.join(Clase).join(Materia)
-
-    if estudiante_id:
-        query = query.filter(RegistrosDeAsistencia.estudiante_id == estudiante_id)
-    if materia_id:
-        query = query.filter(Clase.materia_id == materia_id)
-    if desde:
-        query = query.filter(RegistrosDeAsistencia.fecha_hora >= desde)
-    if hasta:
-        query = query.filter(RegistrosDeAsistencia.fecha_hora <= hasta)
-
-    resultados = []
-    for r in query.all():
-        resultados.append({
-            "id": r.id,
-            "estudiante_id": r.estudiante_id,
-            "clase_id": r.clase_id,
-            "materia_id": r.clase.materia_id,
-            "fecha_hora": r.fecha_hora.isoformat(),
-            "metodo": r.método_registro
-        })
-
+    formato = request.args.get('formato', 'json')
+    limite = request.args.get('limite', type=int)
+
+    cursor = None
+    if request.args.get('cursor'):
+        try:
+            cursor = reporte.decodificar_cursor(request.args['cursor'])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+    consulta = reporte.consulta_reporte(estudiante_id, materia_id, desde, hasta, cursor)
+
+    # Streaming en memoria constante (cursor del lado del servidor)
+    if formato == 'csv':
+        return Response(
+            stream_with_context(reporte.stream_csv(consulta)),
+            mimetype='text/csv',
+            headers={"Content-Disposition": "attachment; filename=reporte_asistencia.csv"}
+        )
+    if formato == 'ndjson':
+        return Response(
+            stream_with_context(reporte.stream_ndjson(consulta)),
+            mimetype='application/x-ndjson'
+        )
+    if formato != 'json':
+        return jsonify({"error": "Formato inválido (json, csv o ndjson)"}), 400
+
+    # Paginación por keyset sobre (fecha_hora, id)
+    if limite:
+        limite = max(1, min(limite, 5000))
+        datos, siguiente = reporte.pagina(consulta, limite)
+        return jsonify({"datos": datos, "siguiente_cursor": siguiente}), 200
+
+    resultados = [reporte.fila_a_dict(f) for f in db.session.execute(consulta)]
     return jsonify(resultados), 200
 
 
@@ -76,56 +181,11 @@ def obtener_reporte_asistencia():
 @jwt_required()
 @estudiante_required
 def registrar_asistencia_por_clase(clase_id):
-    identidad = get_jwt_identity()
-    estudiante = Estudiante.query.filter_by(usuario_id=identidad['id']).first()
-    if not estudiante:
-        return jsonify({"error": "Estudiante no encontrado"}), 404
-
-    clase = Clase.query.get(clase_id)
-    if not clase:
-        return jsonify({"error": "Clase no encontrada"}), 404
-
-    # Verificar inscripción
-    inscripcion = EstudiantesMaterias.query.filter_by(
-        estudiante_id=estudiante.id,
-        materia_id=clase.materia_id,
-        estado='activo'
-    ).first()
-
-    if not inscripcion:
-        return jsonify({"error": "No estás inscripto en esta materia"}), 403
+    from app.utils.registro_asistencia import registrar_asistencia_qr
 
-    # Ya registrado
-    ya_registrado = RegistrosDeAsistencia.query.filter_by(
-        estudiante_id=estudiante.id,
-        clase_id=clase.id
-    ).first()
-
-    if ya_registrado:
-        return jsonify({
-            "mensaje": "Ya registraste asistencia",
-            "materia": clase.materia.nombre if clase.materia else None,
-            "fecha": ya_registrado.fecha_hora.strftime("%Y-%m-%d"),
-            "hora": ya_registrado.fecha_hora.strftime("%H:%M:%S"),
-            "metodo": ya_registrado.método_registro
-        }), 200
-
-    # Registrar nueva asistencia
-    nueva = RegistrosDeAsistencia(
-        estudiante_id=estudiante.id,
-        clase_id=clase.id,
-        fecha_hora=datetime.now(),
-        método_registro='QR'
-    )
-    db.session.add(nueva)
-    db.session.commit()
-
-    return jsonify({
-        "mensaje": "Asistencia registrada",
-        "materia": clase.materia.nombre,
-        "fecha": nueva.fecha_hora.strftime("%Y-%m-%d"),
-        "hora": nueva.fecha_hora.strftime("%H:%M:%S")
-    }), 201
+    identidad = get_jwt_identity()
+    cuerpo, status = registrar_asistencia_qr(identidad['id'], clase_id)
+    return jsonify(cuerpo), status
 
 
 # ============================================================
@@ -136,15 +196,31 @@ def registrar_asistencia_por_clase(clase_id):
 @estudiante_required
 def registrar_asistencia_con_token():
     from app.utils.security import verificar_token_asistencia
+    from app.utils.tokens_qr import tokens_qr
+
+    from app.utils.registro_asistencia import registrar_asistencia_qr
+
+    usuario_id = get_jwt_identity()['id']
+    token = (request.get_json(silent=True) or {}).get('token')
+
+    # Reenvío del mismo token por el mismo estudiante
+    previa = tokens_qr.respuesta_previa(token, usuario_id)
+    if previa:
+        return jsonify(previa), 200
 
-    token = request.json.get('token')
     datos = verificar_token_asistencia(token)
 
     if not datos:
         return jsonify({"error": "Token inválido o expirado"}), 400
 
-    clase_id = datos.get('clase_id')
-    return registrar_asistencia_por_clase(clase_id)
+    cuerpo, status = registrar_asistencia_qr(usuario_id, datos.get('clase_id'))
+    if status in (200, 201):
+        tokens_qr.marcar_usado(token, usuario_id, {
+            **cuerpo,
+            "mensaje": "Ya registraste asistencia",
+            "metodo": cuerpo.get("metodo", "QR")
+        })
+    return jsonify(cuerpo), status
 
 
 # ============================================================
@@ -154,80 +230,148 @@ def registrar_asistencia_con_token():
 @jwt_required()
 @docente_required
 def resumen_docente():
+    from app.utils.resumen import resumen_clase, resumen_vacio
 
-    identidad = get_jwt_identity()
-    docente = Docente.query.filter_by(usuario_id=identidad["id"]).first()
+    clase_id = request.args.get("clase_id", type=int)
+    materia_id = request.args.get("materia_id", type=int)
+    umbral_presente = request.args.get("minutos_presente", type=int)
+    umbral_tardanza = request.args.get("minutos_tardanza", type=int)
+
+    if clase_id:
+        clase = Clase.query.get(clase_id)
+        if not clase:
+            return jsonify({"error": "Clase no encontrada"}), 404
+    else:
+        if not materia_id:
+            return jsonify({"error": "Debe enviar materia_id o clase_id"}), 400
+
+        fecha = request.args.get("fecha")
+        try:
+            fecha = datetime.strptime(fecha, "%Y-%m-%d").date() if fecha else date.today()
+        except ValueError:
+            return jsonify({"error": "Formato de fecha inválido. Usa YYYY-MM-DD"}), 400
+
+        clase = Clase.query.filter_by(
+            materia_id=materia_id,
+            fecha=fecha
+        ).order_by(Clase.hora_inicio).first()
+
+        if not clase:
+            return jsonify(resumen_vacio()), 200
+
+    return jsonify(resumen_clase(clase, umbral_presente, umbral_tardanza)), 200
+
+
+# ============================================================
+# PORCENTAJES DE ASISTENCIA (ACUMULADOS)
+# ============================================================
+@asistencia_bp.route("/porcentajes", methods=["GET"])
+@jwt_required()
+@docente_required
+def porcentajes_materia():
+    from app.models import AcumuladoAsistencia, Usuario
+    from app.utils import acumulados
 
     materia_id = request.args.get("materia_id", type=int)
     if not materia_id:
         return jsonify({"error": "Debe enviar materia_id"}), 400
 
-    clase = Clase.query.filter_by(
-        materia_id=materia_id,
-        fecha=date.today()
-    ).first()
-
-    if not clase:
-        return jsonify({
-            "resumen": {"presentes": 0, "tardanza": 0, "ausentes": 0},
-            "presentes_detalle": [],
-            "tardanza_detalle": [],
-            "ausentes_detalle": []
-        }), 200
-
-    inscripciones = EstudiantesMaterias.query.filter_by(
-        materia_id=materia_id,
-        estado="activo"
+    acumulados.poner_al_dia()
+    A = AcumuladoAsistencia
+    filas = db.session.execute(
+        db.select(A, Usuario.nombre, Usuario.apellido)
+        .join(Estudiante, Estudiante.id == A.estudiante_id)
+        .join(Usuario, Usuario.id == Estudiante.usuario_id)
+        .join(EstudiantesMaterias, db.and_(
+            EstudiantesMaterias.estudiante_id == A.estudiante_id,
+            EstudiantesMaterias.materia_id == A.materia_id,
+            EstudiantesMaterias.estado == "activo"
+        ))
+        .where(A.materia_id == materia_id)
+        .order_by(Usuario.apellido, Usuario.nombre)
     ).all()
 
-    estudiantes_ids = [i.estudiante_id for i in inscripciones]
-    registros = RegistrosDeAsistencia.query.filter_by(clase_id=clase.id).all()
-
-    presentes = []
-    tardanza = []
-    ausentes = []
+    return jsonify([{
+        "estudiante_id": a.estudiante_id,
+        "nombre": nombre,
+        "apellido": apellido,
+        "clases": a.clases,
+        "presentes": a.presentes,
+        "tardanzas": a.tardanzas,
+        "ausentes": a.ausentes,
+        "porcentaje": acumulados.porcentaje(a)
+    } for a, nombre, apellido in filas]), 200
 
-    hora_inicio = datetime.combine(date.today(), clase.hora_inicio)
 
-    for est_id in estudiantes_ids:
-        est = Estudiante.query.get(est_id)
-        usr = est.usuario
+@asistencia_bp.route("/porcentajes/mios", methods=["GET"])
+@jwt_required()
+@estudiante_required
+def porcentajes_estudiante():
+    from app.models import AcumuladoAsistencia
+    from app.utils import acumulados
 
-        registro = next((r for r in registros if r.estudiante_id == est_id), None)
+    identidad = get_jwt_identity()
+    estudiante = Estudiante.query.filter_by(usuario_id=identidad["id"]).first()
+    if not estudiante:
+        return jsonify({"error": "Estudiante no encontrado"}), 404
 
-        if registro:
-            delta = registro.fecha_hora - hora_inicio
-            minutos = delta.total_seconds() / 60
+    acumulados.poner_al_dia()
+    A = AcumuladoAsistencia
+    filas = db.session.execute(
+        db.select(A, Materia.nombre)
+        .join(Materia, Materia.id == A.materia_id)
+        .where(A.estudiante_id == estudiante.id)
+        .order_by(Materia.nombre)
+    ).all()
 
-            detalle = {
-                "nombre": usr.nombre,
-                "apellido": usr.apellido,
-                "fecha": registro.fecha_hora.strftime("%Y-%m-%d"),
-                "hora": registro.fecha_hora.strftime("%H:%M:%S")
-            }
+    return jsonify([{
+        "materia_id": a.materia_id,
+        "materia_nombre": nombre,
+        "clases": a.clases,
+        "presentes": a.presentes,
+        "tardanzas": a.tardanzas,
+        "ausentes": a.ausentes,
+        "porcentaje": acumulados.porcentaje(a)
+    } for a, nombre in filas]), 200
 
-            if minutos <= 5:
-                presentes.append(detalle)
-            elif minutos <= 30:
-                tardanza.append(detalle)
-            else:
-                ausentes.append(detalle)
 
-        else:
-            ausentes.append({
-                "nombre": usr.nombre,
-                "apellido": usr.apellido,
-                "fecha": date.today().strftime("%Y-%m-%d"),
-                "hora": "--"
-            })
+# ============================================================
+# ANALÍTICA (COORDINACIÓN): CURVAS POR SEMANA / DÍA / HORA
+# ============================================================
+@asistencia_bp.route("/analitica", methods=["GET"])
+@jwt_required()
+@admin_required
+def analitica_asistencia():
+    from app.utils.analitica import analitica_cacheada, AGRUPACIONES
+    from app.utils.periodos import periodo_actual
+
+    agrupacion = request.args.get("agrupar", "materia")
+    if agrupacion not in AGRUPACIONES:
+        return jsonify({"error": "agrupar debe ser materia, curso o carrera"}), 400
+
+    inicio, fin = periodo_actual()
+    try:
+        desde = date.fromisoformat(request.args["desde"]) if request.args.get("desde") else inicio
+        hasta = date.fromisoformat(request.args["hasta"]) if request.args.get("hasta") else fin
+    except ValueError:
+        return jsonify({"error": "Formato de fecha inválido (YYYY-MM-DD)"}), 400
+
+    # Las clases futuras todavía no tienen asistencia
+    hasta = min(hasta, date.today())
+
+    grupos = analitica_cacheada(
+        agrupacion=agrupacion,
+        desde=desde,
+        hasta=hasta,
+        carrera_id=request.args.get("carrera_id", type=int),
+        curso_id=request.args.get("curso_id", type=int),
+        materia_id=request.args.get("materia_id", type=int),
+        bucket_minutos=max(1, request.args.get("bucket_minutos", 5, type=int))
+    )
 
     return jsonify({
-        "resumen": {
-            "presentes": len(presentes),
-            "tardanza": len(tardanza),
-            "ausentes": len(ausentes)
-        },
-        "presentes_detalle": presentes,
-        "tardanza_detalle": tardanza,
-        "ausentes_detalle": ausentes
+        "agrupacion": agrupacion,
+        "desde": desde.isoformat(),
+        "hasta": hasta.isoformat(),
+        "grupos": grupos
     }), 200
@@ -3,6 +3,7 @@ from flask_jwt_extended import jwt_required
 from app import db
 from app.models import Carrera
 from app.utils.security import admin_required
+from app.utils.cache_catalogo import catalogo
 
 carreras_bp = Blueprint("carreras", __name__)
 
@@ -10,12 +11,13 @@ carreras_bp = Blueprint("carreras", __name__)
 @carreras_bp.route("/", methods=["GET"])
 @jwt_required()
 def listar_carreras():
-    carreras = Carrera.query.filter_by(activo=True).all()
-    resultado = [
-        {"id": c.id, "nombre": c.nombre, "descripcion": c.descripcion}
-        for c in carreras
-    ]
-    return jsonify(resultado), 200
+    def generar():
+        carreras = Carrera.query.filter_by(activo=True).all()
+        return [
+            {"id": c.id, "nombre": c.nombre, "descripcion": c.descripcion}
+            for c in carreras
+        ]
+    return catalogo.responder("carreras", ["carreras"], generar)
 
 
 # 📌 Listar todas las carreras (activas e inactivas) → solo admin
@@ -23,17 +25,18 @@ def listar_carreras():
 @jwt_required()
 @admin_required
 def listar_todas_carreras():
-    carreras = Carrera.query.all()
-    resultado = [
-        {
-            "id": c.id,
-            "nombre": c.nombre,
-            "descripcion": c.descripcion,
-            "activo": c.activo,
-        }
-        for c in carreras
-    ]
-    return jsonify(resultado), 200
+    def generar():
+        carreras = Carrera.query.all()
+        return [
+            {
+                "id": c.id,
+                "nombre": c.nombre,
+                "descripcion": c.descripcion,
+                "activo": c.activo,
+            }
+            for c in carreras
+        ]
+    return catalogo.responder("carreras_todas", ["carreras"], generar)
 
 
 # 📌 Crear carrera
@@ -52,6 +55,7 @@ def crear_carrera():
     )
     db.session.add(carrera)
     db.session.commit()
+    catalogo.invalidar("carreras")
 
     return jsonify({"mensaje": "Carrera creada correctamente", "id": carrera.id}), 201
 
@@ -70,6 +74,7 @@ def editar_carrera(id):
     carrera.descripcion = data.get("descripcion", carrera.descripcion)
 
     db.session.commit()
+    catalogo.invalidar("carreras")
     return jsonify({"mensaje": "Carrera actualizada correctamente"}), 200
 
 
@@ -84,6 +89,7 @@ def eliminar_carrera(id):
 
     carrera.activo = False
     db.session.commit()
+    catalogo.invalidar("carreras")
 
     return jsonify({"mensaje": "Carrera dada de baja correctamente"}), 200
 
@@ -101,5 +107,6 @@ def reactivar_carrera(id):
 
     carrera.activo = True
     db.session.commit()
+    catalogo.invalidar("carreras")
     return jsonify({"mensaje": "Carrera reactivada correctamente"}), 200
 
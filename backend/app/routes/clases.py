@@ -1,8 +1,11 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from sqlalchemy.orm import joinedload
-from app.models import db,Clase, Materia, Docente, Usuario
+from app.models import db,Clase, Materia, Docente, Usuario, RegistrosDeAsistencia
 from app.utils.security import rol_requerido,docente_required
+from app.utils.padron import padron
+from app.utils import acumulados
+from app.utils.periodos import periodo_actual
+from app.utils.listado_clases import consulta_clases, fila_a_dict, codificar_cursor, decodificar_cursor
 from datetime import datetime
 
 clases_bp = Blueprint('clases', __name__)
@@ -35,6 +38,7 @@ def crear_clase():
         return jsonify({"error": "No tienes permiso para crear clases en esta materia"}), 403
 
     # Crear la clase con el docente_id correcto
+    acumulados.poner_al_dia()
     clase = Clase(
         materia_id=data['materia_id'],
         docente_id=docente.id,
@@ -43,14 +47,79 @@ def crear_clase():
         hora_fin=hora_fin
     )
     db.session.add(clase)
+    db.session.flush()
+    acumulados.sumar_clase(clase)
     db.session.commit()
     return jsonify({"mensaje": "Clase creada correctamente"}), 201
 
 
+# Crear el cronograma de una o varias materias a partir de una recurrencia
+@clases_bp.route('/recurrentes', methods=['POST'])
+@docente_required
+def crear_clases_recurrentes():
+    from app.utils.clases_recurrentes import (
+        ErrorRecurrencia, leer_pedido, contar, expandir, detectar_conflictos,
+        insertar_clases, docentes_de_materias
+    )
+
+    data = request.get_json(silent=True) or {}
+    try:
+        desde, hasta, feriados, especificaciones = leer_pedido(data)
+    except ErrorRecurrencia as e:
+        return jsonify({"error": str(e)}), 400
+
+    docentes = docentes_de_materias({e[0] for e in especificaciones})
+    faltantes = sorted({e[0] for e in especificaciones} - set(docentes))
+    if faltantes:
+        return jsonify({"error": "Materias no encontradas", "materias": faltantes}), 404
+
+    # Un docente solo arma el cronograma de sus materias; el administrador,
+    # el de cualquiera que tenga docente asignado
+    identidad = get_jwt_identity()
+    if identidad['rol'] == 'docente':
+        docente = Docente.query.filter_by(usuario_id=identidad['id']).first()
+        ajenas = sorted(m for m, d in docentes.items() if not docente or d != docente.id)
+        if ajenas:
+            return jsonify({"error": "No tienes permiso para crear clases en estas materias", "materias": ajenas}), 403
+    sin_docente = sorted(m for m, d in docentes.items() if d is None)
+    if sin_docente:
+        return jsonify({"error": "Materias sin docente asignado", "materias": sin_docente}), 400
+
+    # El máximo se valida antes de expandir (un rango de siglos no llega a armarse)
+    maximo = current_app.config.get("CLASES_RECURRENTES_MAX", 5000)
+    if contar(desde, hasta, feriados, especificaciones) > maximo:
+        return jsonify({"error": f"El cronograma supera el máximo de {maximo} clases"}), 413
+    clases, omitidas = expandir(desde, hasta, feriados, especificaciones, docentes)
+
+    conflictos = detectar_conflictos(clases)
+    detalle = [{
+        "materia_id": clases[i]["materia_id"],
+        "fecha": clases[i]["fecha"].isoformat(),
+        "hora_inicio": clases[i]["hora_inicio"].strftime('%H:%M'),
+        "hora_fin": clases[i]["hora_fin"].strftime('%H:%M'),
+        "motivo": motivo
+    } for i, motivo in sorted(conflictos.items())]
+
+    # Por defecto no se crea nada si hay superposiciones
+    if conflictos and not data.get("omitir_conflictos"):
+        return jsonify({"error": "Hay clases superpuestas", "conflictos": detalle}), 409
+
+    ids = insertar_clases([c for i, c in enumerate(clases) if i not in conflictos])
+    db.session.commit()
+
+    return jsonify({
+        "mensaje": "Cronograma creado correctamente",
+        "creadas": len(ids),
+        "omitidas_por_feriado": omitidas,
+        "conflictos": detalle
+    }), 201
+
+
 # Modificar una clase existente
 @clases_bp.route('/<int:id>', methods=['PUT'])
 @docente_required
 def editar_clase(id):
+    acumulados.poner_al_dia()
     clase = Clase.query.get(id)
     if not clase:
         return jsonify({"error": "Clase no encontrada"}), 404
@@ -66,19 +135,28 @@ def editar_clase(id):
     if 'hora_fin' in data:
         clase.hora_fin = datetime.strptime(data['hora_fin'], '%H:%M').time()
 
+    db.session.flush()
+    acumulados.recalcular(materia_id=clase.materia_id)
     db.session.commit()
+    padron.invalidar_clase(id)
     return jsonify({"mensaje": "Clase actualizada correctamente"}), 200
 
 # Eliminar una clase
 @clases_bp.route('/<int:id>', methods=['DELETE'])
 @docente_required
 def eliminar_clase(id):
+    acumulados.poner_al_dia()
     clase = Clase.query.get(id)
     if not clase:
         return jsonify({"error": "Clase no encontrada"}), 404
 
+    materia_id = clase.materia_id
+    RegistrosDeAsistencia.query.filter_by(clase_id=id).delete()
     db.session.delete(clase)
+    db.session.flush()
+    acumulados.recalcular(materia_id=materia_id)
     db.session.commit()
+    padron.invalidar_clase(id)
     return jsonify({"mensaje": "Clase eliminada correctamente"}), 200
 
 #obtener clases por rol o administrador
@@ -90,67 +168,81 @@ def obtener_clases():
     usuario_id = identidad["id"]
     rol = identidad["rol"]
 
-    # Consulta base con joinedload para traer relaciones
-    query = Clase.query.options(
-        joinedload(Clase.materia).joinedload(Materia.curso),
-        joinedload(Clase.docente).joinedload(Docente.usuario)
-    )
+    # Filtros de fecha: fecha exacta o rango desde/hasta
+    try:
+        fecha = _fecha_param('fecha')
+        desde = _fecha_param('desde')
+        hasta = _fecha_param('hasta')
+    except ValueError:
+        return jsonify({"error": "Formato de fecha inválido. Usa YYYY-MM-DD"}), 400
+
+    # Sin filtros de fecha se muestra el cuatrimestre en curso
+    if not (fecha or desde or hasta):
+        desde, hasta = periodo_actual()
 
-    # Filtro por nombre de materia
-    materia_nombre = request.args.get('materia')
-    if materia_nombre:
-        query = query.join(Materia).filter(Materia.nombre.ilike(f"%{materia_nombre}%"))
+    # Tamaño de página acotado
+    try:
+        limite = int(request.args.get('limite', current_app.config["CLASES_LIMITE"]))
+    except ValueError:
+        return jsonify({"error": "limite debe ser numérico"}), 400
+    limite = max(1, min(limite, current_app.config["CLASES_LIMITE_MAX"]))
 
-    # Filtro por fecha
-    fecha = request.args.get('fecha')
-    if fecha:
+    cursor = request.args.get('cursor')
+    if cursor:
         try:
-            fecha_obj = datetime.strptime(fecha, "%Y-%m-%d").date()
-            query = query.filter(Clase.fecha == fecha_obj)
-        except ValueError:
-            return jsonify({"error": "Formato de fecha inválido. Usa YYYY-MM-DD"}), 400
+            cursor = decodificar_cursor(cursor)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
     # Si es docente, filtra por su ID
     if rol == "docente":
-        docente = Docente.query.filter_by(usuario_id=usuario_id).first()
-        if not docente:
-            return jsonify({"error": "Docente no encontrado"}), 404
-        query = query.filter(Clase.docente_id == docente.id)
+        docente_id = identidad.get("docente_id")
+        if docente_id is None:
+            docente = Docente.query.filter_by(usuario_id=usuario_id).first()
+            if not docente:
+                return jsonify({"error": "Docente no encontrado"}), 404
+            docente_id = docente.id
 
     # Si es admin, puede filtrar por docente_id si lo desea
     elif rol == "administrador":
         docente_id = request.args.get('docente_id')
         if docente_id:
             try:
-                query = query.filter(Clase.docente_id == int(docente_id))
+                docente_id = int(docente_id)
             except ValueError:
                 return jsonify({"error": "docente_id debe ser numérico"}), 400
+        else:
+            docente_id = None
     else:
         return jsonify({"error": "Acceso no autorizado"}), 403
 
-    clases = query.all()
-
-    resultado = []
-    for clase in clases:
-        resultado.append({
-            "id": clase.id,
-            "fecha": clase.fecha.isoformat(),
-            "hora_inicio": clase.hora_inicio.strftime('%H:%M'),
-            "hora_fin": clase.hora_fin.strftime('%H:%M'),
-            "materia_id": clase.materia_id,
-            "materia": {
-                "id": clase.materia.id,
-                "nombre": clase.materia.nombre
-            } if clase.materia else None,
-            "curso": {
-                "id": clase.materia.curso.id,
-                "nombre": clase.materia.curso.nombre
-            } if clase.materia and clase.materia.curso else None,
-            "docente_id": clase.docente_id,
-            "docente": f"{clase.docente.usuario.nombre} {clase.docente.usuario.apellido}" if clase.docente and clase.docente.usuario else None
-        })
-
-    return jsonify(resultado), 200
+    consulta = consulta_clases(
+        docente_id=docente_id, desde=desde, hasta=hasta, fecha=fecha,
+        materia_nombre=request.args.get('materia'), cursor=cursor
+    )
+    filas = db.session.execute(consulta.limit(limite + 1)).all()
+
+    respuesta = jsonify([fila_a_dict(f) for f in filas[:limite]])
+    # La página siguiente se pide con ?cursor=<X-Siguiente-Cursor>
+    if len(filas) > limite:
+        respuesta.headers["X-Siguiente-Cursor"] = codificar_cursor(filas[limite - 1])
+    return respuesta, 200
+
+
+def _fecha_param(nombre):
+    valor = request.args.get(nombre)
+    return datetime.strptime(valor, "%Y-%m-%d").date() if valor else None
+
+def _es_docente_de(docente_id):
+    """El QR de una clase solo lo ven su docente y los administradores."""
+    identidad = get_jwt_identity()
+    if identidad['rol'] == 'administrador':
+        return True
+    propio = identidad.get('docente_id')
+    if propio is None:
+        docente = Docente.query.filter_by(usuario_id=identidad['id']).first()
+        propio = docente.id if docente else None
+    return propio is not None and propio == docente_id
 
 #generacion del QR para un docente
 
@@ -161,10 +253,38 @@ def generar_qr_para_clase(clase_id):
     from app.utils.security import generar_token_asistencia
 
     clase = Clase.query.get_or_404(clase_id)
+    if not _es_docente_de(clase.docente_id):
+        return jsonify({"error": "Acceso no autorizado"}), 403
     token = generar_token_asistencia(clase.id)
 
+    # Precargar el padrón para que los escaneos se validen en memoria
+    padron.calentar(clase.id)
+
     # Podés retornar solo el token o una URL lista para escanear
     return jsonify({
         "token": token,
         "url_qr": f"https://tusitio.com/asistencia/escaneo?token={token}"
     }), 200
+
+
+# Token vigente para la pantalla del docente (se consulta cada pocos segundos):
+# la clase sale del padrón en memoria y el token se firma una vez por ventana.
+@clases_bp.route('/token_qr/<int:clase_id>', methods=['GET'])
+@jwt_required()
+@docente_required
+def token_qr_vigente(clase_id):
+    from app.utils.tokens_qr import tokens_qr
+
+    clase = padron.obtener_clase(clase_id)
+    if not clase:
+        return jsonify({"error": "Clase no encontrada"}), 404
+    if not _es_docente_de(clase["docente_id"]):
+        return jsonify({"error": "Acceso no autorizado"}), 403
+
+    token, expira_en, periodo = tokens_qr.token_actual(clase_id)
+    return jsonify({
+        "token": token,
+        "expira_en": expira_en,
+        "periodo": periodo,
+        "url_qr": f"https://tusitio.com/asistencia/escaneo?token={token}"
+    }), 200
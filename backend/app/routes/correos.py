@@ -0,0 +1,36 @@
+from flask import Blueprint, jsonify
+from flask_jwt_extended import jwt_required
+from app.models import CorreoSaliente
+from app.utils.security import admin_required
+from app.utils.envio_correos import envio_correos
+
+correos_bp = Blueprint("correos", __name__)
+
+# 📌 Estado de la bandeja de salida → solo admin
+@correos_bp.route("/estado", methods=["GET"])
+@jwt_required()
+@admin_required
+def estado_bandeja():
+    return jsonify(envio_correos.estado()), 200
+
+
+# 📌 Estado de un correo puntual → solo admin
+@correos_bp.route("/<int:id>", methods=["GET"])
+@jwt_required()
+@admin_required
+def estado_correo(id):
+    correo = CorreoSaliente.query.get(id)
+    if not correo:
+        return jsonify({"error": "Correo no encontrado"}), 404
+
+    return jsonify({
+        "id": correo.id,
+        "destinatario": correo.destinatario,
+        "asunto": correo.asunto,
+        "estado": correo.estado,
+        "intentos": correo.intentos,
+        "ultimo_error": correo.ultimo_error,
+        "proximo_intento": correo.proximo_intento.isoformat() if correo.estado == "pendiente" else None,
+        "creado_en": correo.creado_en.isoformat(),
+        "enviado_en": correo.enviado_en.isoformat() if correo.enviado_en else None
+    }), 200
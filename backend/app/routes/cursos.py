@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify
 from app.models import Curso, db
 from app.utils.security import rol_requerido, admin_required
+from app.utils.indice_materias import indice_materias
+from app.utils.cache_catalogo import catalogo
 
 cursos_bp = Blueprint('cursos', __name__)
 
@@ -8,15 +10,16 @@ cursos_bp = Blueprint('cursos', __name__)
 @cursos_bp.route('/', methods=['GET'])
 @rol_requerido(['docente', 'administrador'])
 def obtener_cursos():
-    cursos = Curso.query.all()
-    resultado = []
-    for curso in cursos:
-        resultado.append({
-            'id': curso.id,
-            'nombre': curso.nombre,
-            'nivel': curso.nivel
-        })
-    return jsonify(resultado), 200
+    def generar():
+        resultado = []
+        for curso in Curso.query.all():
+            resultado.append({
+                'id': curso.id,
+                'nombre': curso.nombre,
+                'nivel': curso.nivel
+            })
+        return resultado
+    return catalogo.responder("cursos", ["cursos"], generar)
 
 # Crear un nuevo curso (solo administrador)
 @cursos_bp.route('/', methods=['POST'])
@@ -29,6 +32,7 @@ def crear_curso():
     nuevo_curso = Curso(nombre=data['nombre'], nivel=data['nivel'])
     db.session.add(nuevo_curso)
     db.session.commit()
+    catalogo.invalidar("cursos")
     return jsonify({"mensaje": "Curso creado correctamente"}), 201
 
 # Modificar un curso existente (solo administrador)
@@ -45,6 +49,9 @@ def modificar_curso(id):
     if 'nivel' in data:
         curso.nivel = data['nivel']
     db.session.commit()
+    catalogo.invalidar("cursos")
+    if 'nombre' in data:
+        indice_materias.actualizar_curso(id)
     return jsonify({"mensaje": "Curso actualizado correctamente"}), 200
 
 # Eliminar un curso (solo administrador)
@@ -57,4 +64,5 @@ def eliminar_curso(id):
 
     db.session.delete(curso)
     db.session.commit()
+    catalogo.invalidar("cursos")
     return jsonify({"mensaje": "Curso eliminado correctamente"}), 200
@@ -0,0 +1,18 @@
+from flask import Blueprint, jsonify
+from flask_jwt_extended import jwt_required
+from app import db
+from app.models import TrabajoImportacion
+from app.utils.security import admin_required
+from app.utils.importaciones import estado_trabajo
+
+importaciones_bp = Blueprint("importaciones", __name__)
+
+# 📌 Avance de una importación en segundo plano → solo admin
+@importaciones_bp.route("/<int:id>", methods=["GET"])
+@jwt_required()
+@admin_required
+def ver_importacion(id):
+    trabajo = db.session.get(TrabajoImportacion, id)
+    if not trabajo:
+        return jsonify({"error": "Importación no encontrada"}), 404
+    return jsonify(estado_trabajo(trabajo)), 200
@@ -1,7 +1,10 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.models import db, EstudiantesMaterias, Docente, Estudiante
+from app.models import db, EstudiantesMaterias, Docente, Estudiante, Materia, Usuario
 from app.utils.security import rol_requerido
+from app.utils.padron import padron
+from app.utils import acumulados
+from app.utils.serializacion import Forma, fecha_hora
 
 from datetime import datetime
 
@@ -28,33 +31,60 @@ def inscribir_estudiante():
     if ya_inscripto:
         return jsonify({"error": "El estudiante ya está inscrito en esta materia"}), 409
 
+    acumulados.poner_al_dia()
     nueva_inscripcion = EstudiantesMaterias(
         estudiante_id=estudiante.id,
         materia_id=materia_id
     )
 
     db.session.add(nueva_inscripcion)
+    db.session.flush()
+    acumulados.recalcular(estudiante_id=estudiante.id, materia_id=materia_id)
     db.session.commit()
+    padron.invalidar_materia(nueva_inscripcion.materia_id)
 
     return jsonify({"mensaje": "Estudiante inscrito correctamente"}), 201
 
+# Ruta para inscribir en lote: un curso, una carrera o una lista de
+# estudiantes en una o varias materias
+@inscripciones_bp.route('/masiva', methods=['POST'])
+@jwt_required()
+@rol_requerido(['administrador'])
+def inscribir_en_lote():
+    from app.utils.inscripciones_masivas import leer_pedido, inscribir, ErrorInscripcion
+
+    data = request.get_json(silent=True) or {}
+    try:
+        materia_ids, criterio = leer_pedido(data)
+        resultado = inscribir(materia_ids, **criterio)
+    except ErrorInscripcion as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({
+        "mensaje": f"{resultado['inscriptas']} inscripciones creadas",
+        **resultado
+    }), 201
+
 # Ruta para listar las materias en las que está inscrito un estudiante
+INSCRIPCION_DEL_ESTUDIANTE = Forma({
+    "materia_id": Materia.id,
+    "materia_nombre": Materia.nombre,
+    "estado": EstudiantesMaterias.estado,
+    "fecha_alta": (EstudiantesMaterias.fecha_alta, fecha_hora)
+})
+
 @inscripciones_bp.route('/estudiante/<int:estudiante_id>', methods=['GET'])
 @jwt_required()
 @rol_requerido(['administrador', 'docente', 'estudiante'])
 def ver_inscripciones(estudiante_id):
-    inscripciones = EstudiantesMaterias.query.filter_by(estudiante_id=estudiante_id, fecha_baja=None).all()
-
-    resultado = []
-    for insc in inscripciones:
-        resultado.append({
-            "materia_id": insc.materia.id,
-            "materia_nombre": insc.materia.nombre,
-            "estado": insc.estado,
-            "fecha_alta": insc.fecha_alta.strftime('%d-%m-%Y %H:%M:%S')
-        })
-
-    return jsonify(resultado), 200
+    consulta = (
+        INSCRIPCION_DEL_ESTUDIANTE.select()
+        .select_from(EstudiantesMaterias)
+        .join(Materia, Materia.id == EstudiantesMaterias.materia_id)
+        .where(EstudiantesMaterias.estudiante_id == estudiante_id, EstudiantesMaterias.fecha_baja.is_(None))
+        .order_by(EstudiantesMaterias.id)
+    )
+    return jsonify(INSCRIPCION_DEL_ESTUDIANTE.listar(consulta)), 200
 
 # Ruta para dar de baja una inscripción 
 @inscripciones_bp.route('/<int:inscripcion_id>', methods=['DELETE'])
@@ -81,32 +111,129 @@ def dar_baja_inscripcion(inscripcion_id):
     inscripcion.docente_id = docente_id
 
     db.session.commit()
+    padron.invalidar_materia(inscripcion.materia_id)
 
     return jsonify({"mensaje": "Inscripción dada de baja correctamente"}), 200
 
+def _docente_de(identidad):
+    """docente_id del usuario logeado (None para administradores)."""
+    if identidad['rol'] != 'docente':
+        return None
+    if identidad.get('docente_id') is not None:
+        return identidad['docente_id']
+    docente = Docente.query.filter_by(usuario_id=identidad['id']).first()
+    return docente.id if docente else None
+
+# Rutas para dar de baja / reincorporar en lote, por ids o por filtro
+# {"ids": [...]} o {"filtro": {materia_id, estado, fecha_alta_desde, fecha_alta_hasta}}
+@inscripciones_bp.route('/bajas', methods=['POST'])
+@jwt_required()
+@rol_requerido(['docente', 'administrador'])
+def dar_baja_en_lote():
+    from app.utils.inscripciones_masivas import leer_seleccion, dar_baja, ErrorInscripcion
+
+    identidad = get_jwt_identity()
+    docente_id = _docente_de(identidad)
+    if identidad['rol'] == 'docente' and docente_id is None:
+        return jsonify({"error": "Docente no encontrado"}), 404
+
+    data = request.get_json(silent=True) or {}
+    try:
+        afectadas = dar_baja(
+            leer_seleccion(data), docente_id=docente_id,
+            estado=data.get('estado') or 'baja_por_inasistencia'
+        )
+    except ErrorInscripcion as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({
+        "mensaje": f"{len(afectadas)} inscripciones dadas de baja",
+        "inscripciones": afectadas
+    }), 200
+
+@inscripciones_bp.route('/reincorporar', methods=['POST'])
+@jwt_required()
+@rol_requerido(['docente', 'administrador'])
+def reincorporar_en_lote():
+    from app.utils.inscripciones_masivas import leer_seleccion, reincorporar, ErrorInscripcion
+
+    identidad = get_jwt_identity()
+    docente_id = _docente_de(identidad)
+    if identidad['rol'] == 'docente' and docente_id is None:
+        return jsonify({"error": "Docente no encontrado"}), 404
+
+    try:
+        afectadas = reincorporar(leer_seleccion(request.get_json(silent=True) or {}), docente_id=docente_id)
+    except ErrorInscripcion as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({
+        "mensaje": f"{len(afectadas)} inscripciones reincorporadas",
+        "inscripciones": afectadas
+    }), 200
+
 # Ruta para listar todas las inscripciones activas
+INSCRIPCION_ACTIVA = Forma({
+    "id": EstudiantesMaterias.id,
+    "estudiante_id": Estudiante.id,
+    "estudiante_nombre": Usuario.nombre + " " + Usuario.apellido,
+    "materia_id": Materia.id,
+    "materia_nombre": Materia.nombre,
+    "fecha_alta": (EstudiantesMaterias.fecha_alta, fecha_hora)
+})
+
 @inscripciones_bp.route('/', methods=['GET'])
 @jwt_required()
 @rol_requerido(['administrador', 'docente'])
 def listar_todas_inscripciones():
-    inscripciones = EstudiantesMaterias.query.filter_by(estado='activo').all()
-
-    resultado = []
-    for insc in inscripciones:
-        estudiante = insc.estudiante
-        usuario = estudiante.usuario  # relación entre estudiante y usuario
-        materia = insc.materia
+    consulta = (
+        INSCRIPCION_ACTIVA.select()
+        .select_from(EstudiantesMaterias)
+        .join(Estudiante, Estudiante.id == EstudiantesMaterias.estudiante_id)
+        .join(Usuario, Usuario.id == Estudiante.usuario_id)  # relación entre estudiante y usuario
+        .join(Materia, Materia.id == EstudiantesMaterias.materia_id)
+        .where(EstudiantesMaterias.estado == 'activo')
+        .order_by(EstudiantesMaterias.id)
+    )
+    return jsonify(INSCRIPCION_ACTIVA.listar(consulta)), 200
 
-        resultado.append({
-            "id": insc.id,
-            "estudiante_id": estudiante.id,
-            "estudiante_nombre": f"{usuario.nombre} {usuario.apellido}",
-            "materia_id": materia.id,
-            "materia_nombre": materia.nombre,
-            "fecha_alta": insc.fecha_alta.strftime('%d-%m-%Y %H:%M:%S') if insc.fecha_alta else None
-        })
 
-    return jsonify(resultado), 200
 
 
+# Ruta para evaluar (y opcionalmente aplicar) bajas automáticas por inasistencia
+@inscripciones_bp.route('/bajas_automaticas', methods=['POST'])
+@jwt_required()
+@rol_requerido(['administrador'])
+def bajas_automaticas():
+    from app.utils.bajas import evaluar_bajas
+
+    data = request.get_json(silent=True) or {}
+    try:
+        umbrales_carrera = {int(k): float(v) for k, v in (data.get('umbrales_carrera') or {}).items()}
+        umbrales_materia = {int(k): float(v) for k, v in (data.get('umbrales_materia') or {}).items()}
+        umbral = float(data['umbral']) if data.get('umbral') is not None else None
+        minimo_clases = int(data['minimo_clases']) if data.get('minimo_clases') is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "Umbrales inválidos"}), 400
+
+    # Solo un booleano JSON (o su texto): bool("false") sería True y aplicaría las bajas
+    aplicar = data.get('aplicar', False)
+    if isinstance(aplicar, str) and aplicar.strip().lower() in ('true', 'false'):
+        aplicar = aplicar.strip().lower() == 'true'
+    if not isinstance(aplicar, bool):
+        return jsonify({"error": "'aplicar' debe ser true o false"}), 400
+
+    afectadas = evaluar_bajas(
+        umbral=umbral,
+        umbrales_carrera=umbrales_carrera,
+        umbrales_materia=umbrales_materia,
+        minimo_clases=minimo_clases,
+        aplicar=aplicar
+    )
 
+    return jsonify({
+        "mensaje": f"{len(afectadas)} inscripciones dadas de baja" if aplicar
+                   else f"{len(afectadas)} inscripciones superan el umbral (simulación)",
+        "aplicado": aplicar,
+        "inscripciones": afectadas
+    }), 200
@@ -1,10 +1,13 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import func
 from sqlalchemy.orm import joinedload
 from app import db
 from app.models import Materia, Docente, Usuario, Curso
 from app.utils.security import admin_required, rol_requerido, docente_required
-import pandas as pd
+from app.utils.serializacion import Forma
+from app.utils.indice_materias import indice_materias
+from app.utils.cache_catalogo import catalogo
 
 materias_bp = Blueprint("materias", __name__)
 
@@ -16,6 +19,11 @@ materias_bp = Blueprint("materias", __name__)
 @jwt_required()
 @docente_required   # permite docentes y administradores (ya funciona para ambos)
 def listar_materias():
+    # Incluye el nombre del curso: también cambia si se edita un curso
+    return catalogo.responder("materias", ["materias", "cursos", "usuarios"], _listado_materias)
+
+
+def _listado_materias():
     materias = Materia.query.options(
         joinedload(Materia.docente).joinedload(Docente.usuario),
         joinedload(Materia.curso)
@@ -37,7 +45,7 @@ def listar_materias():
             } if m.docente and m.docente.usuario else None
         })
 
-    return jsonify(resultado), 200
+    return resultado
 
 
 
@@ -69,6 +77,8 @@ def crear_materia():
 
     db.session.add(materia)
     db.session.commit()
+    indice_materias.actualizar([materia.id])
+    catalogo.invalidar("materias")
 
     return jsonify({"mensaje": "Materia creada correctamente"}), 201
 
@@ -88,6 +98,8 @@ def editar_materia(id):
     materia.docente_id = data.get("docente_id", materia.docente_id)
 
     db.session.commit()
+    indice_materias.actualizar([id])
+    catalogo.invalidar("materias")
     return jsonify({"mensaje": "Materia actualizada"}), 200
 
 
@@ -102,17 +114,28 @@ def eliminar_materia(id):
     materia = Materia.query.get_or_404(id)
 
     # Antes de borrar, eliminar relaciones para evitar error de integridad:
-    from app.models import Clase, EstudiantesMaterias
+    from app.models import (
+        Clase, EstudiantesMaterias, AcumuladoAsistencia, AcumuladoArchivado, RegistrosDeAsistencia
+    )
 
-    # Eliminar clases relacionadas
+    # Eliminar clases relacionadas y sus registros
+    clases = db.session.query(Clase.id).filter(Clase.materia_id == id)
+    RegistrosDeAsistencia.query.filter(RegistrosDeAsistencia.clase_id.in_(clases)).delete(synchronize_session=False)
     Clase.query.filter_by(materia_id=id).delete()
 
-    # Eliminar inscripciones relacionadas
+    # Eliminar inscripciones relacionadas y sus acumulados (también los congelados al archivar)
     EstudiantesMaterias.query.filter_by(materia_id=id).delete()
+    AcumuladoAsistencia.query.filter_by(materia_id=id).delete()
+    AcumuladoArchivado.query.filter_by(materia_id=id).delete()
 
     db.session.delete(materia)
     db.session.commit()
 
+    from app.utils.padron import padron
+    padron.invalidar_materia(id)
+    indice_materias.quitar(id)
+    catalogo.invalidar("materias")
+
     return jsonify({"mensaje": "Materia eliminada"}), 200
 
 
@@ -128,29 +151,20 @@ def autocompletar_materias():
     if not termino:
         return jsonify([])
 
-    materias = Materia.query.filter(
-        Materia.nombre.ilike(f"%{termino}%")
-    ).limit(10).all()
-
-    resultados = []
-    for m in materias:
-        resultados.append({
-            "id": m.id,
-            "nombre": m.nombre,
-            "curso": m.curso.nombre if m.curso else None,
-            "docente": (
-                f"{m.docente.usuario.nombre} {m.docente.usuario.apellido}"
-                if m.docente and m.docente.usuario else None
-            )
-        })
-
-    return jsonify(resultados), 200
+    # Resuelto en memoria (app/utils/indice_materias.py), sin consultas
+    return jsonify(indice_materias.buscar(termino, limite=10)), 200
 
 
 
 # ================================================================
 # MATERIAS DEL DOCENTE LOGEADO
 # ================================================================
+MATERIA_DEL_DOCENTE = Forma({
+    "id": Materia.id,
+    "nombre": Materia.nombre,
+    "curso": func.coalesce(Curso.nombre, "Sin curso")
+})
+
 @materias_bp.route("/docente", methods=["GET"])
 @jwt_required()
 @docente_required
@@ -161,23 +175,29 @@ def obtener_materias_del_docente():
     if not docente:
         return jsonify({"error": "Docente no encontrado"}), 404
 
-    materias = Materia.query.filter_by(docente_id=docente.id).all()
-
-    resultado = []
-    for m in materias:
-        resultado.append({
-            "id": m.id,
-            "nombre": m.nombre,
-            "curso": m.curso.nombre if m.curso else "Sin curso"
-        })
-
-    return jsonify(resultado), 200
+    consulta = (
+        MATERIA_DEL_DOCENTE.select()
+        .outerjoin(Curso, Curso.id == Materia.curso_id)
+        .where(Materia.docente_id == docente.id)
+        .order_by(Materia.id)
+    )
+    return jsonify(MATERIA_DEL_DOCENTE.listar(consulta)), 200
 
 
 
 # ================================================================
 # MATERIAS DEL ESTUDIANTE (FORMATO QUE USA TU FRONTEND)
 # ================================================================
+MATERIA_DEL_ESTUDIANTE = Forma({
+    "materia_id": Materia.id,
+    "materia_nombre": Materia.nombre,
+    "curso": func.coalesce(Curso.nombre, "Sin curso"),
+    "docente": {
+        "nombre": Usuario.nombre,
+        "apellido": Usuario.apellido
+    }
+})
+
 @materias_bp.route("/estudiante/<int:usuario_id>", methods=["GET"])
 @jwt_required()
 @rol_requerido("estudiante")
@@ -189,32 +209,17 @@ def materias_del_estudiante(usuario_id):
     if not estudiante:
         return jsonify({"error": "Estudiante no encontrado"}), 404
 
-    inscripciones = EstudiantesMaterias.query.filter_by(
-        estudiante_id=estudiante.id,
-        estado="activo"
-    ).all()
-
-    resultado = []
-
-    for insc in inscripciones:
-        materia = insc.materia
-        if materia is None:
-            continue
-
-        resultado.append({
-            "materia_id": materia.id,
-            "materia_nombre": materia.nombre,
-            "curso": materia.curso.nombre if materia.curso else "Sin curso",
-            "docente": {
-                "nombre": materia.docente.usuario.nombre
-                if materia.docente and materia.docente.usuario else None,
-
-                "apellido": materia.docente.usuario.apellido
-                if materia.docente and materia.docente.usuario else None
-            }
-        })
-
-    return jsonify(resultado), 200
+    consulta = (
+        MATERIA_DEL_ESTUDIANTE.select()
+        .select_from(EstudiantesMaterias)
+        .join(Materia, Materia.id == EstudiantesMaterias.materia_id)
+        .outerjoin(Curso, Curso.id == Materia.curso_id)
+        .outerjoin(Docente, Docente.id == Materia.docente_id)
+        .outerjoin(Usuario, Usuario.id == Docente.usuario_id)
+        .where(EstudiantesMaterias.estudiante_id == estudiante.id, EstudiantesMaterias.estado == "activo")
+        .order_by(EstudiantesMaterias.id)
+    )
+    return jsonify(MATERIA_DEL_ESTUDIANTE.listar(consulta)), 200
 
 
 
@@ -225,6 +230,8 @@ def materias_del_estudiante(usuario_id):
 @jwt_required()
 @admin_required
 def importar_excel():
+    from app.utils.importaciones import importaciones, estado_trabajo
+
     if "file" not in request.files:
         return jsonify({"error": "No se envió archivo"}), 400
 
@@ -233,52 +240,10 @@ def importar_excel():
     if not file.filename.endswith((".xlsx", ".csv")):
         return jsonify({"error": "Formato inválido"}), 400
 
+    # Se procesa en segundo plano; el avance se consulta en /importaciones/<id>
     try:
-        df = pd.read_csv(file) if file.filename.endswith(".csv") else pd.read_excel(file)
-
-        columnas_requeridas = {"nombre", "curso_id", "docente_id"}
-        if not columnas_requeridas.issubset(df.columns):
-            return jsonify({"error": "Faltan columnas requeridas"}), 400
-
-        materias_creadas = []
-        errores = []
-
-        for i, row in df.iterrows():
-            try:
-                nombre = str(row["nombre"]).strip()
-                curso_id = int(row["curso_id"])
-                docente_id = int(row["docente_id"])
-
-                curso = Curso.query.get(curso_id)
-                docente = Docente.query.get(docente_id)
-
-                if not curso:
-                    errores.append({"fila": i+2, "error": f"Curso ID {curso_id} no existe"})
-                    continue
-
-                if not docente:
-                    errores.append({"fila": i+2, "error": f"Docente ID {docente_id} no existe"})
-                    continue
-
-                materia = Materia(nombre=nombre, curso_id=curso_id, docente_id=docente_id)
-                db.session.add(materia)
-
-                materias_creadas.append({
-                    "nombre": nombre,
-                    "curso": curso.nombre,
-                    "docente": f"{docente.usuario.nombre} {docente.usuario.apellido}"
-                })
-
-            except Exception as e:
-                errores.append({"fila": i+2, "error": str(e)})
-
-        db.session.commit()
-
-        return jsonify({
-            "mensaje": f"{len(materias_creadas)} materias importadas",
-            "materias": materias_creadas,
-            "errores": errores
-        }), 201
+        trabajo = importaciones.encolar("materias", file, get_jwt_identity()["id"])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    return jsonify(estado_trabajo(trabajo)), 202
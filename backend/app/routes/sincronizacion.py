@@ -0,0 +1,32 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.utils.sincronizacion import sincronizar, completar_identidad, ErrorSincronizacion
+
+sincronizacion_bp = Blueprint("sincronizacion", __name__)
+
+# 📌 Cambios desde la última sincronización del cliente
+# GET /sincronizacion/?marca=<marca anterior>&tablas=clases,materias
+# GET /sincronizacion/?cursor=<cursor>   (continuación mientras completo = false)
+@sincronizacion_bp.route("/", methods=["GET"])
+@jwt_required()
+def obtener_cambios():
+    identidad = completar_identidad(get_jwt_identity())
+    if identidad["rol"] not in ("administrador", "docente", "estudiante"):
+        return jsonify({"error": "Acceso no autorizado"}), 403
+    if identidad["rol"] == "docente" and identidad["docente_id"] is None:
+        return jsonify({"error": "Docente no encontrado"}), 404
+    if identidad["rol"] == "estudiante" and identidad["estudiante_id"] is None:
+        return jsonify({"error": "Estudiante no encontrado"}), 404
+
+    tablas = request.args.get("tablas")
+    try:
+        resultado = sincronizar(
+            identidad,
+            marca=request.args.get("marca"),
+            cursor=request.args.get("cursor"),
+            tablas=[t.strip() for t in tablas.split(",") if t.strip()] if tablas else None
+        )
+    except ErrorSincronizacion as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify(resultado), 200
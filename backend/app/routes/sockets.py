@@ -0,0 +1,72 @@
+from flask import request, session
+from flask_jwt_extended import decode_token
+from flask_socketio import join_room, leave_room, emit
+from app import socketio
+from app.models import Clase
+from app.utils.resumen import resumen_clase
+from app.utils.tiempo_real import emisor_asistencia, sala_clase
+
+
+# ============================================================
+# CONEXIÓN (JWT EN EL HANDSHAKE)
+# ============================================================
+@socketio.on("connect")
+def conectar(auth):
+    token = (auth or {}).get("token") or request.args.get("token")
+    if not token:
+        return False
+
+    try:
+        identidad = decode_token(token)["sub"]
+    except Exception:
+        return False
+
+    if not identidad or identidad.get("rol") not in ("docente", "administrador"):
+        return False
+
+    session["identidad"] = identidad
+    session["clases"] = []
+
+
+@socketio.on("disconnect")
+def desconectar(*args):
+    for clase_id in session.get("clases", []):
+        emisor_asistencia.dejar_clase(clase_id)
+
+
+# ============================================================
+# SALAS POR CLASE
+# ============================================================
+@socketio.on("unirse_clase")
+def unirse_clase(data):
+    clase_id = (data or {}).get("clase_id")
+    clase = Clase.query.get(clase_id) if clase_id else None
+    if not clase:
+        emit("error", {"error": "Clase no encontrada"})
+        return
+
+    identidad = session.get("identidad", {})
+    if identidad.get("rol") == "docente" and clase.docente_id != identidad.get("docente_id"):
+        emit("error", {"error": "Acceso no autorizado"})
+        return
+
+    join_room(sala_clase(clase.id))
+    if clase.id not in session["clases"]:
+        session["clases"] = session["clases"] + [clase.id]
+        resumen = emisor_asistencia.seguir_clase(clase.id, lambda: resumen_clase(clase))
+    else:
+        resumen = resumen_clase(clase)
+
+    # Estado completo al entrar (solo a este socket); luego llegan solo los deltas
+    emit("asistencia_resumen", resumen)
+
+
+@socketio.on("salir_clase")
+def salir_clase(data):
+    clase_id = (data or {}).get("clase_id")
+    if clase_id not in session.get("clases", []):
+        return
+
+    leave_room(sala_clase(clase_id))
+    session["clases"] = [c for c in session["clases"] if c != clase_id]
+    emisor_asistencia.dejar_clase(clase_id)
@@ -1,11 +1,9 @@
-import secrets
-import pandas as pd
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db, bcrypt
 from app.models import Usuario, Docente, Estudiante
 from app.utils.security import admin_required, rol_requerido
-from app.utils.email import send_email
+from app.utils.serializacion import Forma
 
 
 usuarios_bp = Blueprint('usuarios', __name__)
@@ -45,22 +43,24 @@ def listar_usuarios():
         })
     return jsonify(resultado), 200
 
+DOCENTE_COMPLETO = Forma({
+    "id": Docente.id,
+    "nombre": Usuario.nombre,
+    "apellido": Usuario.apellido,
+    "correo": Usuario.correo
+})
+
 @usuarios_bp.route('/docentes_full/', methods=['GET'])
 @jwt_required()
 @rol_requerido(["administrador", "docente"])
 def listar_docentes_completos():
-    docentes = Docente.query.all()
-    resultado = []
-    for d in docentes:
-        usuario = d.usuario
-        if usuario and usuario.activo:  # 👈 filtramos solo usuarios activos
-            resultado.append({
-                "id": d.id,
-                "nombre": usuario.nombre,
-                "apellido": usuario.apellido,
-                "correo": usuario.correo
-            })
-    return jsonify(resultado), 200
+    consulta = (
+        DOCENTE_COMPLETO.select()
+        .join(Usuario, Usuario.id == Docente.usuario_id)
+        .where(Usuario.activo.is_(True))  # 👈 filtramos solo usuarios activos
+        .order_by(Docente.id)
+    )
+    return jsonify(DOCENTE_COMPLETO.listar(consulta)), 200
 
 
 @usuarios_bp.route('/crear', methods=['POST'])
@@ -156,6 +156,8 @@ def cambiar_password():
 @jwt_required()
 @admin_required
 def importar_excel():
+    from app.utils.importaciones import importaciones, estado_trabajo
+
     if 'file' not in request.files:
         return jsonify({"error": "No se envió archivo"}), 400
 
@@ -163,87 +165,10 @@ def importar_excel():
     if not file.filename.endswith(('.xlsx', '.csv')):
         return jsonify({"error": "Formato no permitido (use .xlsx o .csv)"}), 400
 
+    # Se procesa en segundo plano; el avance se consulta en /importaciones/<id>
     try:
-        if file.filename.endswith('.csv'):
-            df = pd.read_csv(file)
-        else:
-            df = pd.read_excel(file)
-
-        columnas_requeridas = {"nombre", "apellido", "correo", "dni", "rol"}
-        if not columnas_requeridas.issubset(set(df.columns)):
-            return jsonify({"error": f"El archivo debe contener: {columnas_requeridas}"}), 400
-
-        usuarios_ok = []
-        errores = []
-
-        for i, row in df.iterrows():
-            try:
-                rol = str(row['rol']).lower().strip()
-                if rol == "administrador":
-                    errores.append({"fila": i+2, "error": "No se permite importar administradores"})
-                    continue
-                if rol not in ["docente", "estudiante"]:
-                    errores.append({"fila": i+2, "error": f"Rol no válido: {rol}"})
-                    continue
-                
-                if Usuario.query.filter((Usuario.correo == row['correo'].strip()) | (Usuario.dni == str(row['dni']).strip())).first():
-                    errores.append({"fila": i+2, "error": "Email o DNI ya registrados"})
-                    continue
-
-                password_plano = secrets.token_urlsafe(8)
-                password_hash = bcrypt.generate_password_hash(password_plano).decode("utf-8")
-
-                usuario = Usuario(
-                    nombre=row['nombre'],
-                    apellido=row['apellido'],
-                    correo=row['correo'].strip(),
-                    dni=str(row['dni']).strip(),
-                    rol=rol,
-                    contraseña=password_hash,
-                    debe_cambiar_password=True
-                )
-                db.session.add(usuario)
-                db.session.flush()
-
-                if rol == 'docente':
-                    db.session.add(Docente(usuario_id=usuario.id))
-                elif rol == 'estudiante':
-                    db.session.add(Estudiante(usuario_id=usuario.id))
-
-                cuerpo = (
-                    f"Hola {row['nombre']} {row['apellido']},\n\n"
-                    f"Se creó tu usuario en el Sistema de Asistencia.\n\n"
-                    f"Correo: {row['correo']}\n"
-                    f"Contraseña temporal: {password_plano}\n\n"
-                    f"Deberás cambiarla al iniciar sesión por primera vez.\n\n"
-                    f"Saludos,\nAdministración"
-                )
-
-                try:
-                    send_email(
-                        to_email=row['correo'],
-                        subject="Credenciales de acceso - Sistema de Asistencia",
-                        body=cuerpo
-                    )
-                    usuarios_ok.append({"fila": i+2, "correo": row['correo'], "estado": "enviado"})
-                except Exception as e_mail:
-                    usuarios_ok.append({"fila": i+2, "correo": row['correo'], "estado": f"correo no enviado: {e_mail}"})
-
-            except Exception as e_row:
-                errores.append({"fila": i+2, "error": str(e_row)})
-
-        db.session.commit()
-
-        return jsonify({
-            "mensaje": "Importación finalizada",
-            "total_importados": len([u for u in usuarios_ok if u["estado"].startswith("enviado") or u["estado"].startswith("correo no enviado")]),
-            "total_errores": len(errores),
-            "detalle": {
-                "usuarios_procesados": usuarios_ok,
-                "errores": errores
-            }
-        }), 201
-
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({"error": f"Error al procesar archivo: {str(e)}"}), 500
+        trabajo = importaciones.encolar("usuarios", file, get_jwt_identity()["id"])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify(estado_trabajo(trabajo)), 202
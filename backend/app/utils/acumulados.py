@@ -0,0 +1,360 @@
+import threading
+from collections import defaultdict
+from datetime import date, datetime
+from sqlalchemy import select, update, delete, func, and_, bindparam, cast, Date, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app import db
+from app.models import (
+    AcumuladoAsistencia,
+    AcumuladoArchivado,
+    EstadoAcumulados,
+    Clase,
+    EstudiantesMaterias,
+    RegistrosDeAsistencia
+)
+from app.utils.resumen import clasificar, obtener_umbrales
+
+# ============================================================
+# ACUMULADOS DE ASISTENCIA POR (ESTUDIANTE, MATERIA)
+# ============================================================
+# Cuentan solo las clases con fecha <= acumulado_hasta (una fila en
+# estado_acumulados) y desde el día de la última fecha_alta del par: las
+# clases y los check-ins anteriores a la inscripción no cuentan. Cada día,
+# el primer uso suma las clases nuevas del período. Se actualizan de forma
+# incremental en cada check-in, alta/edición/baja de clase e inscripción;
+# "flask acumulados reconstruir" los recalcula desde cero.
+#
+# Los contadores guardados no se corrigen solos cuando cambia qué se
+# cuenta: los calculados antes del corte por fecha_alta (un par
+# reinscripto sumaba también las clases previas) quedan así hasta correr
+# "flask acumulados reconstruir" una vez después de actualizar.
+#
+# Las clases anteriores a archivado_hasta tienen sus registros en
+# particiones desenganchadas: sus contadores quedaron congelados en
+# acumulados_archivados (congelar) y se suman en vez de recontarse.
+
+COLUMNAS = ["estudiante_id", "materia_id", "clases", "presentes", "tardanzas", "ausentes"]
+
+_lock = threading.Lock()
+_acumulado_hasta = None
+
+
+def _minutos_desde_inicio():
+    inicio = Clase.fecha + Clase.hora_inicio
+    return func.extract("epoch", RegistrosDeAsistencia.fecha_hora - inicio) / 60
+
+
+def _archivado_hasta():
+    return db.session.execute(
+        select(EstadoAcumulados.archivado_hasta).where(EstadoAcumulados.id == 1)
+    ).scalar()
+
+
+def _conteos(filtro_clases, estudiante_id=None, materia_id=None, solo_con_clases=False,
+             inscripcion_ids=None, con_archivados=False):
+    """
+    SELECT con los contadores de cada par (estudiante, materia) para las
+    clases filtradas. A cada par solo le cuentan las clases desde el día
+    de su última fecha_alta: las anteriores a la inscripción no son
+    inasistencias. Las clases archivadas nunca se recuentan; con
+    con_archivados se suman sus contadores congelados.
+    """
+    umbral_presente, umbral_tardanza = obtener_umbrales()
+    minutos = _minutos_desde_inicio()
+    archivado_hasta = _archivado_hasta()
+    if archivado_hasta:
+        filtro_clases = [*filtro_clases, Clase.fecha >= archivado_hasta]
+
+    pares = select(
+        EstudiantesMaterias.estudiante_id,
+        EstudiantesMaterias.materia_id,
+        cast(func.max(EstudiantesMaterias.fecha_alta), Date).label("alta")
+    ).group_by(EstudiantesMaterias.estudiante_id, EstudiantesMaterias.materia_id)
+    if estudiante_id:
+        pares = pares.where(EstudiantesMaterias.estudiante_id == estudiante_id)
+    if materia_id:
+        pares = pares.where(EstudiantesMaterias.materia_id == materia_id)
+    if inscripcion_ids is not None:
+        pares = pares.where(EstudiantesMaterias.id.in_(inscripcion_ids))
+    pares = pares.subquery()
+
+    def del_par(*condiciones):
+        return and_(Clase.materia_id == pares.c.materia_id, Clase.fecha >= pares.c.alta, *condiciones)
+
+    clases = (
+        select(pares.c.estudiante_id, pares.c.materia_id, func.count().label("n"))
+        .join(Clase, del_par(*filtro_clases))
+        .group_by(pares.c.estudiante_id, pares.c.materia_id)
+        .subquery()
+    )
+    registros = (
+        select(
+            pares.c.estudiante_id,
+            pares.c.materia_id,
+            func.count().filter(minutos <= umbral_presente).label("p"),
+            func.count().filter(and_(
+                minutos > umbral_presente,
+                minutos <= umbral_tardanza
+            )).label("t")
+        )
+        .join(Clase, del_par(*filtro_clases))
+        .join(RegistrosDeAsistencia, and_(
+            RegistrosDeAsistencia.clase_id == Clase.id,
+            RegistrosDeAsistencia.estudiante_id == pares.c.estudiante_id
+        ))
+        .group_by(pares.c.estudiante_id, pares.c.materia_id)
+        .subquery()
+    )
+
+    n = func.coalesce(clases.c.n, 0)
+    p = func.coalesce(registros.c.p, 0)
+    t = func.coalesce(registros.c.t, 0)
+    X = AcumuladoArchivado
+    if con_archivados and archivado_hasta:
+        n = n + func.coalesce(X.clases, 0)
+        p = p + func.coalesce(X.presentes, 0)
+        t = t + func.coalesce(X.tardanzas, 0)
+
+    mismo_par = and_(
+        clases.c.estudiante_id == pares.c.estudiante_id,
+        clases.c.materia_id == pares.c.materia_id
+    )
+    consulta = select(pares.c.estudiante_id, pares.c.materia_id, n, p, t, n - p - t).select_from(pares)
+    if solo_con_clases:
+        consulta = consulta.join(clases, mismo_par)
+    else:
+        consulta = consulta.outerjoin(clases, mismo_par)
+
+    consulta = consulta.outerjoin(registros, and_(
+        registros.c.estudiante_id == pares.c.estudiante_id,
+        registros.c.materia_id == pares.c.materia_id
+    ))
+    if con_archivados and archivado_hasta:
+        # Una reinscripción posterior al archivo empieza de cero
+        consulta = consulta.outerjoin(X, and_(
+            X.estudiante_id == pares.c.estudiante_id,
+            X.materia_id == pares.c.materia_id,
+            pares.c.alta < archivado_hasta
+        ))
+    return consulta
+
+
+def _aplicar(consulta, sumar, modelo=AcumuladoAsistencia):
+    """INSERT ... SELECT con upsert: suma a los contadores o los reemplaza."""
+    A = modelo
+    stmt = pg_insert(A).from_select(COLUMNAS, consulta)
+    if sumar:
+        valores = {c: getattr(A, c) + stmt.excluded[c] for c in COLUMNAS[2:]}
+    else:
+        valores = {c: stmt.excluded[c] for c in COLUMNAS[2:]}
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[A.estudiante_id, A.materia_id],
+        set_=valores
+    ))
+
+
+# ============================================================
+# PUESTA AL DÍA Y RECONSTRUCCIÓN
+# ============================================================
+def poner_al_dia(hoy=None):
+    """
+    Suma las clases con fecha en (acumulado_hasta, hoy] y confirma.
+    Debe llamarse antes de cualquier otra escritura de la transacción.
+    """
+    global _acumulado_hasta
+    hoy = hoy or date.today()
+    if _acumulado_hasta is not None and _acumulado_hasta >= hoy:
+        return _acumulado_hasta
+
+    with _lock:
+        estado = db.session.execute(
+            select(EstadoAcumulados).where(EstadoAcumulados.id == 1).with_for_update()
+        ).scalar()
+
+        if estado is None:
+            db.session.rollback()
+            reconstruir(hoy)
+            return hoy
+
+        if estado.acumulado_hasta < hoy:
+            _aplicar(_conteos(
+                [Clase.fecha > estado.acumulado_hasta, Clase.fecha <= hoy],
+                solo_con_clases=True
+            ), sumar=True)
+            estado.acumulado_hasta = hoy
+
+        corte = estado.acumulado_hasta
+        db.session.commit()
+        _acumulado_hasta = corte
+        return corte
+
+
+def _corte():
+    """
+    acumulado_hasta vigente, sin escribir ni confirmar: lo usan las
+    funciones que corren después de que el llamador ya escribió en la
+    transacción. El llamador debe haber llamado antes a poner_al_dia().
+    """
+    if _acumulado_hasta is not None:
+        return _acumulado_hasta
+    corte = db.session.execute(
+        select(EstadoAcumulados.acumulado_hasta).where(EstadoAcumulados.id == 1)
+    ).scalar()
+    if corte is None:
+        raise RuntimeError("Acumulados sin inicializar: llamar a poner_al_dia() antes de escribir")
+    return corte
+
+
+def reconstruir(hoy=None):
+    """Recalcula todos los acumulados desde los registros."""
+    global _acumulado_hasta
+    hoy = hoy or date.today()
+
+    db.session.execute(delete(AcumuladoAsistencia))
+    _aplicar(_conteos([Clase.fecha <= hoy], con_archivados=True), sumar=False)
+
+    stmt = pg_insert(EstadoAcumulados).values(id=1, acumulado_hasta=hoy)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[EstadoAcumulados.id],
+        set_={"acumulado_hasta": hoy}
+    ))
+    db.session.commit()
+    _acumulado_hasta = hoy
+
+
+def recalcular(estudiante_id=None, materia_id=None):
+    """Reemplaza los contadores de un estudiante y/o una materia (sin confirmar)."""
+    corte = _corte()
+    _aplicar(_conteos([Clase.fecha <= corte], estudiante_id, materia_id, con_archivados=True), sumar=False)
+
+
+def recalcular_inscripciones(inscripcion_ids):
+    """Como recalcular, para los pares (estudiante, materia) de un lote de inscripciones (sin confirmar)."""
+    if not inscripcion_ids:
+        return
+    corte = _corte()
+    _aplicar(_conteos([Clase.fecha <= corte], inscripcion_ids=inscripcion_ids, con_archivados=True), sumar=False)
+
+
+def congelar(hasta):
+    """
+    Guarda en acumulados_archivados los contadores de las clases con fecha
+    anterior a `hasta`, antes de desenganchar sus registros (sin confirmar).
+    """
+    poner_al_dia()
+    estado = db.session.execute(
+        select(EstadoAcumulados).where(EstadoAcumulados.id == 1).with_for_update()
+    ).scalar()
+    if estado.archivado_hasta and estado.archivado_hasta >= hasta:
+        return
+    # _conteos ya excluye lo congelado antes: solo se suma el tramo nuevo
+    _aplicar(_conteos([Clase.fecha < hasta], solo_con_clases=True), sumar=True, modelo=AcumuladoArchivado)
+    estado.archivado_hasta = hasta
+
+
+# ============================================================
+# ACTUALIZACIONES INCREMENTALES
+# ============================================================
+def sumar_clase(clase):
+    """Suma una clase recién creada a todos los inscriptos de su materia (sin confirmar)."""
+    corte = _corte()
+    if clase.fecha > corte:
+        return
+    _aplicar(_conteos(
+        [Clase.id == clase.id],
+        materia_id=clase.materia_id,
+        solo_con_clases=True
+    ), sumar=True)
+
+
+def sumar_clases(clase_ids):
+    """Como sumar_clase, para un lote de clases recién creadas (sin confirmar)."""
+    if not clase_ids:
+        return
+    corte = _corte()
+    _aplicar(_conteos(
+        [Clase.id.in_(clase_ids), Clase.fecha <= corte],
+        solo_con_clases=True
+    ), sumar=True)
+
+
+def registrar_presencias(filas, clases=None):
+    """
+    Suma los check-ins nuevos, filas = [(estudiante_id, clase_id, fecha_hora)].
+    clases: {clase_id: {"materia_id", "fecha", "hora_inicio"}}; las que falten
+    se consultan en una sola query. No confirma la transacción.
+    """
+    if not filas:
+        return
+    corte = _corte()
+    clases = dict(clases or {})
+
+    faltantes = {f[1] for f in filas} - set(clases)
+    if faltantes:
+        for c in db.session.execute(
+            select(Clase.id, Clase.materia_id, Clase.fecha, Clase.hora_inicio)
+            .where(Clase.id.in_(faltantes))
+        ):
+            clases[c.id] = {"materia_id": c.materia_id, "fecha": c.fecha, "hora_inicio": c.hora_inicio}
+
+    # Como en _conteos: solo clases no archivadas y desde la última fecha_alta del par
+    archivado_hasta = _archivado_hasta()
+    contables = [
+        (estudiante_id, clases[clase_id], fecha_hora)
+        for estudiante_id, clase_id, fecha_hora in filas
+        if clase_id in clases and clases[clase_id]["fecha"] <= corte
+        and (archivado_hasta is None or clases[clase_id]["fecha"] >= archivado_hasta)
+    ]
+    if not contables:
+        return
+    pares = {(e, c["materia_id"]) for e, c, _ in contables}
+    altas = dict(
+        ((e, m), alta) for e, m, alta in db.session.execute(
+            select(
+                EstudiantesMaterias.estudiante_id,
+                EstudiantesMaterias.materia_id,
+                cast(func.max(EstudiantesMaterias.fecha_alta), Date)
+            )
+            .where(tuple_(EstudiantesMaterias.estudiante_id, EstudiantesMaterias.materia_id).in_(pares))
+            .group_by(EstudiantesMaterias.estudiante_id, EstudiantesMaterias.materia_id)
+        )
+    )
+
+    umbral_presente, umbral_tardanza = obtener_umbrales()
+    deltas = defaultdict(lambda: [0, 0])
+
+    for estudiante_id, clase, fecha_hora in contables:
+        alta = altas.get((estudiante_id, clase["materia_id"]))
+        if alta is None or clase["fecha"] < alta:
+            continue
+
+        inicio = datetime.combine(clase["fecha"], clase["hora_inicio"])
+        estado = clasificar(fecha_hora, inicio, umbral_presente, umbral_tardanza)
+        if estado == "presente":
+            deltas[(estudiante_id, clase["materia_id"])][0] += 1
+        elif estado == "tardanza":
+            deltas[(estudiante_id, clase["materia_id"])][1] += 1
+
+    if not deltas:
+        return
+
+    tabla = AcumuladoAsistencia.__table__
+    db.session.execute(
+        update(tabla)
+        .where(tabla.c.estudiante_id == bindparam("e"), tabla.c.materia_id == bindparam("m"))
+        .values(
+            presentes=tabla.c.presentes + bindparam("p"),
+            tardanzas=tabla.c.tardanzas + bindparam("t"),
+            ausentes=tabla.c.ausentes - bindparam("p") - bindparam("t")
+        ),
+        [{"e": e, "m": m, "p": p, "t": t} for (e, m), (p, t) in deltas.items()]
+    )
+
+
+# ============================================================
+# LECTURA
+# ============================================================
+def porcentaje(acumulado):
+    if not acumulado.clases:
+        return None
+    return round(100 * (acumulado.presentes + acumulado.tardanzas) / acumulado.clases, 1)
@@ -0,0 +1,239 @@
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from flask import current_app
+from sqlalchemy import select, func, cast, Float
+from app import db
+from app.models import RegistrosDeAsistencia, Clase, Materia, Curso, Carrera, EstudiantesMaterias
+from app.utils.resumen import obtener_umbrales
+
+
+# ============================================================
+# ANALÍTICA DE ASISTENCIA (CURVAS POR SEMANA / DÍA / HORA)
+# ============================================================
+# Dos consultas proyectadas (clases del período y sus registros) se
+# cargan en DataFrames; la clasificación, los buckets y el histograma
+# de tardanzas se calculan de forma vectorizada.
+#
+# La cantidad esperada de asistencias de una clase es la cantidad de
+# inscripciones activas de su materia (el mismo criterio del resumen).
+
+AGRUPACIONES = {
+    "materia": ("materia_id", "materia"),
+    "curso": ("curso_id", "curso"),
+    "carrera": ("carrera_id", "carrera"),
+}
+
+DIAS = ["lunes", "martes", "miércoles", "jueves", "viernes", "sábado", "domingo"]
+
+_cache = OrderedDict()  # clave de filtros -> (vence, resultado), del más viejo al más nuevo
+_lock = threading.Lock()
+
+
+# ============================================================
+# CARGA
+# ============================================================
+def _cargar(consulta, columnas):
+    # Tuplas planas en la misma transacción: sin entidades ORM por fila
+    filas = db.session.execute(consulta).tuples().all()
+    return pd.DataFrame.from_records(filas, columns=columnas)
+
+
+def _cargar_clases(desde, hasta, carrera_id, curso_id, materia_id):
+    inscriptos = (
+        select(EstudiantesMaterias.materia_id, func.count().label("n"))
+        .where(EstudiantesMaterias.estado == "activo")
+        .group_by(EstudiantesMaterias.materia_id)
+        .subquery()
+    )
+    consulta = (
+        select(
+            Clase.id,
+            Clase.fecha,
+            Clase.hora_inicio,
+            Clase.materia_id,
+            Materia.nombre,
+            Materia.curso_id,
+            Curso.nombre,
+            Curso.carrera_id,
+            Carrera.nombre,
+            func.coalesce(inscriptos.c.n, 0)
+        )
+        .join(Materia, Materia.id == Clase.materia_id)
+        .join(Curso, Curso.id == Materia.curso_id)
+        .join(Carrera, Carrera.id == Curso.carrera_id)
+        .outerjoin(inscriptos, inscriptos.c.materia_id == Clase.materia_id)
+        .where(Clase.fecha >= desde, Clase.fecha <= hasta)
+    )
+    if carrera_id:
+        consulta = consulta.where(Curso.carrera_id == carrera_id)
+    if curso_id:
+        consulta = consulta.where(Materia.curso_id == curso_id)
+    if materia_id:
+        consulta = consulta.where(Clase.materia_id == materia_id)
+
+    return _cargar(consulta, [
+        "clase_id", "fecha", "hora_inicio", "materia_id", "materia", "curso_id",
+        "curso", "carrera_id", "carrera", "esperadas"
+    ])
+
+
+def _cargar_registros(desde, hasta, carrera_id, curso_id, materia_id):
+    R = RegistrosDeAsistencia
+    # Minutos desde el inicio como float8: evita armar un datetime por fila
+    minutos = cast(func.extract("epoch", R.fecha_hora - (Clase.fecha + Clase.hora_inicio)) / 60, Float)
+    consulta = (
+        select(R.clase_id, minutos)
+        .join(Clase, Clase.id == R.clase_id)
+        .where(Clase.fecha >= desde, Clase.fecha <= hasta)
+    )
+    if carrera_id or curso_id:
+        consulta = consulta.join(Materia, Materia.id == Clase.materia_id)
+    if carrera_id:
+        consulta = consulta.join(Curso, Curso.id == Materia.curso_id).where(Curso.carrera_id == carrera_id)
+    if curso_id:
+        consulta = consulta.where(Materia.curso_id == curso_id)
+    if materia_id:
+        consulta = consulta.where(Clase.materia_id == materia_id)
+
+    return _cargar(consulta, ["clase_id", "minutos"])
+
+
+# ============================================================
+# CÁLCULO VECTORIZADO
+# ============================================================
+def _clasificar(clases, registros, umbral_presente, umbral_tardanza):
+    """Agrega presentes/tardanzas por clase y devuelve los minutos de cada tardanza."""
+    minutos = registros["minutos"].to_numpy(dtype=float)
+
+    presente = minutos <= umbral_presente
+    tardanza = (minutos > umbral_presente) & (minutos <= umbral_tardanza)
+
+    conteos = pd.DataFrame({
+        "clase_id": registros["clase_id"].to_numpy(),
+        "presentes": presente.astype(np.int64),
+        "tardanzas": tardanza.astype(np.int64)
+    }).groupby("clase_id").sum()
+
+    clases = clases.join(conteos, on="clase_id")
+    clases[["presentes", "tardanzas"]] = clases[["presentes", "tardanzas"]].fillna(0).astype(np.int64)
+
+    tardes = pd.DataFrame({
+        "clase_id": registros["clase_id"].to_numpy()[tardanza],
+        "minutos": minutos[tardanza]
+    })
+    return clases, tardes
+
+
+def _tasas(df, columnas):
+    t = df.groupby(columnas, sort=True).agg(
+        clases=("clase_id", "size"),
+        esperadas=("esperadas", "sum"),
+        presentes=("presentes", "sum"),
+        tardanzas=("tardanzas", "sum")
+    ).reset_index()
+    esperadas = t["esperadas"].to_numpy()
+    asistieron = (t["presentes"] + t["tardanzas"]).to_numpy()
+    t["tasa_asistencia"] = np.round(
+        np.divide(asistieron, esperadas, out=np.zeros(len(t)), where=esperadas > 0) * 100, 1)
+    t["tasa_tardanza"] = np.round(
+        np.divide(t["tardanzas"].to_numpy(), esperadas, out=np.zeros(len(t)), where=esperadas > 0) * 100, 1)
+    return t
+
+
+def _registros(df):
+    return [
+        {k: (v.item() if hasattr(v, "item") else v) for k, v in fila.items()}
+        for fila in df.to_dict(orient="records")
+    ]
+
+
+def calcular_analitica(agrupacion="materia", desde=None, hasta=None,
+                       carrera_id=None, curso_id=None, materia_id=None, bucket_minutos=5):
+    clave_id, clave_nombre = AGRUPACIONES[agrupacion]
+    umbral_presente, umbral_tardanza = obtener_umbrales()
+
+    clases = _cargar_clases(desde, hasta, carrera_id, curso_id, materia_id)
+    if clases.empty:
+        return []
+    registros = _cargar_registros(desde, hasta, carrera_id, curso_id, materia_id)
+    clases, tardes = _clasificar(clases, registros, umbral_presente, umbral_tardanza)
+
+    fechas = pd.to_datetime(clases["fecha"])
+    clases["semana"] = (fechas - pd.to_timedelta(fechas.dt.dayofweek, unit="D")).dt.strftime("%Y-%m-%d")
+    clases["dia_semana"] = fechas.dt.dayofweek
+    clases["hora"] = clases["hora_inicio"].map(lambda h: h.hour)
+    clases = clases.rename(columns={clave_id: "grupo_id", clave_nombre: "grupo"})
+
+    totales = _tasas(clases, ["grupo_id", "grupo"])
+    por_bucket = {}
+    for b in ("semana", "dia_semana", "hora"):
+        por_grupo = por_bucket[b] = {}
+        for fila in _registros(_tasas(clases, ["grupo_id", b])):
+            por_grupo.setdefault(fila.pop("grupo_id"), []).append(fila)
+    for filas in por_bucket["dia_semana"].values():
+        for f in filas:
+            f["dia_semana"] = DIAS[f["dia_semana"]]
+
+    # Histograma de minutos de tardanza por grupo (bins de bucket_minutos)
+    bordes = np.arange(umbral_presente, umbral_tardanza + bucket_minutos, bucket_minutos, dtype=float)
+    bordes[-1] = max(bordes[-1], umbral_tardanza)
+    tardes["grupo_id"] = tardes["clase_id"].map(clases.set_index("clase_id")["grupo_id"])
+    histogramas = {
+        g: np.histogram(t["minutos"].to_numpy(), bins=bordes)[0].tolist()
+        for g, t in tardes.groupby("grupo_id")
+    }
+    vacio = [0] * (len(bordes) - 1)
+
+    resultado = []
+    for fila in _registros(totales):
+        g = fila.pop("grupo_id")
+        resultado.append({
+            "id": g,
+            "nombre": fila.pop("grupo"),
+            **fila,
+            "por_semana": por_bucket["semana"].get(g, []),
+            "por_dia_semana": por_bucket["dia_semana"].get(g, []),
+            "por_hora": por_bucket["hora"].get(g, []),
+            "tardanzas_minutos": {
+                "bordes": bordes.tolist(),
+                "conteos": histogramas.get(g, vacio)
+            }
+        })
+    return resultado
+
+
+# ============================================================
+# CACHE POR CONJUNTO DE FILTROS
+# ============================================================
+# Cada combinación de filtros es una entrada: vencen a los
+# ANALITICA_CACHE_SEGUNDOS y, pasadas ANALITICA_CACHE_MAX, se descarta
+# la calculada hace más tiempo.
+def analitica_cacheada(**filtros):
+    ttl = current_app.config.get("ANALITICA_CACHE_SEGUNDOS", 300)
+    maximo = current_app.config.get("ANALITICA_CACHE_MAX", 64)
+    clave = tuple(sorted(filtros.items())) + obtener_umbrales()
+    ahora = time.monotonic()
+
+    with _lock:
+        cacheado = _cache.get(clave)
+        if cacheado and cacheado[0] > ahora:
+            return cacheado[1]
+
+    resultado = calcular_analitica(**filtros)
+
+    with _lock:
+        for k in [k for k, (vence, _) in _cache.items() if vence <= ahora]:
+            del _cache[k]
+        _cache[clave] = (ahora + ttl, resultado)
+        _cache.move_to_end(clave)
+        while len(_cache) > maximo:
+            _cache.popitem(last=False)
+    return resultado
+
+
+def limpiar_cache():
+    with _lock:
+        _cache.clear()
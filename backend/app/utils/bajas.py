@@ -0,0 +1,103 @@
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from flask import current_app
+from sqlalchemy import select, update, and_
+from app import db
+from app.models import EstudiantesMaterias, Materia, Curso, AcumuladoAsistencia
+from app.utils import acumulados
+from app.utils.padron import padron
+
+
+# ============================================================
+# BAJA AUTOMÁTICA POR INASISTENCIA (EN LOTE)
+# ============================================================
+# Carga las inscripciones activas con sus acumulados en un DataFrame,
+# aplica el umbral de inasistencias (general, por carrera o por materia)
+# de forma vectorizada y da de baja a todas con un único UPDATE.
+
+def _cargar_inscripciones():
+    A = AcumuladoAsistencia
+    filas = db.session.execute(
+        select(
+            EstudiantesMaterias.id,
+            EstudiantesMaterias.estudiante_id,
+            EstudiantesMaterias.materia_id,
+            Curso.carrera_id,
+            A.clases,
+            A.ausentes
+        )
+        .join(Materia, Materia.id == EstudiantesMaterias.materia_id)
+        .join(Curso, Curso.id == Materia.curso_id)
+        .outerjoin(A, and_(
+            A.estudiante_id == EstudiantesMaterias.estudiante_id,
+            A.materia_id == EstudiantesMaterias.materia_id
+        ))
+        .where(EstudiantesMaterias.estado == "activo")
+    ).all()
+
+    df = pd.DataFrame(filas, columns=["id", "estudiante_id", "materia_id", "carrera_id", "clases", "ausentes"])
+    df[["clases", "ausentes"]] = df[["clases", "ausentes"]].fillna(0).astype(np.int64)
+    return df
+
+
+def _umbrales(df, umbral, umbrales_carrera, umbrales_materia):
+    """Umbral por fila: materia > carrera > general."""
+    resultado = pd.Series(float(umbral), index=df.index)
+    if umbrales_carrera:
+        por_carrera = df["carrera_id"].map(umbrales_carrera)
+        resultado = por_carrera.where(por_carrera.notna(), resultado)
+    if umbrales_materia:
+        por_materia = df["materia_id"].map(umbrales_materia)
+        resultado = por_materia.where(por_materia.notna(), resultado)
+    return resultado.astype(float)
+
+
+def evaluar_bajas(umbral=None, umbrales_carrera=None, umbrales_materia=None,
+                  minimo_clases=None, aplicar=False, docente_id=None):
+    """
+    Devuelve la lista de inscripciones que superan el umbral de inasistencias.
+    Con aplicar=True además las da de baja ('baja_por_inasistencia').
+    """
+    config = current_app.config
+    if umbral is None:
+        umbral = config.get("BAJA_MAX_INASISTENCIAS", 0.25)
+    if minimo_clases is None:
+        minimo_clases = config.get("BAJA_MINIMO_CLASES", 4)
+
+    acumulados.poner_al_dia()
+    df = _cargar_inscripciones()
+    if df.empty:
+        return []
+
+    clases = df["clases"].to_numpy()
+    ausentes = df["ausentes"].to_numpy()
+    proporcion = np.divide(ausentes, clases, out=np.zeros(len(df)), where=clases > 0)
+    limite = _umbrales(df, umbral, umbrales_carrera, umbrales_materia).to_numpy()
+
+    mascara = (clases >= minimo_clases) & (proporcion > limite)
+    afectadas = df.loc[mascara, ["id", "estudiante_id", "materia_id", "clases", "ausentes"]].copy()
+    afectadas["porcentaje_inasistencia"] = np.round(proporcion[mascara] * 100, 1)
+
+    if aplicar and not afectadas.empty:
+        db.session.execute(
+            update(EstudiantesMaterias)
+            .where(
+                EstudiantesMaterias.id.in_(afectadas["id"].tolist()),
+                EstudiantesMaterias.estado == "activo"
+            )
+            .values(
+                estado="baja_por_inasistencia",
+                fecha_baja=datetime.now(),
+                docente_id=docente_id
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        for materia_id in afectadas["materia_id"].unique():
+            padron.invalidar_materia(int(materia_id))
+
+    return [
+        {k: (v.item() if hasattr(v, "item") else v) for k, v in fila.items()}
+        for fila in afectadas.to_dict(orient="records")
+    ]
@@ -0,0 +1,104 @@
+import hashlib
+import threading
+from flask import current_app, request
+from sqlalchemy import event, inspect
+from app import db
+from app.models import Usuario
+
+# ============================================================
+# CACHE DEL CATÁLOGO (CARRERAS, CURSOS, MATERIAS) CON ETAG
+# ============================================================
+# Cada entidad tiene un contador de versión que suben los handlers que la
+# modifican (invalidar). Cada listado se guarda ya serializado junto con
+# las versiones de las entidades de las que depende y su ETag (hash del
+# cuerpo): mientras esas versiones no cambien, la respuesta sale de memoria
+# y un If-None-Match que coincide se contesta 304 sin tocar la base.
+#
+# La versión se lee ANTES de consultar la base: si otra petición confirma
+# un cambio mientras se arma el listado, este queda guardado con la
+# versión vieja y la próxima lectura lo vuelve a generar.
+# El cache es por proceso (el servidor corre en un solo proceso con hilos).
+#
+# Los listados que muestran el nombre del docente dependen también de
+# "usuarios": un cambio de nombre o apellido hecho por el ORM la invalida
+# sola al confirmarse (ver el final del archivo), junto con el índice del
+# autocompletado de materias.
+
+
+class CacheCatalogo:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versiones = {}
+        self._listados = {}
+
+    def _version(self, entidades):
+        with self._lock:
+            return tuple(self._versiones.get(e, 0) for e in entidades)
+
+    def invalidar(self, *entidades):
+        """Sube la versión de las entidades modificadas (llamar después del commit)."""
+        with self._lock:
+            for e in entidades:
+                self._versiones[e] = self._versiones.get(e, 0) + 1
+
+    def _respuesta(self, cuerpo, etag):
+        if request.if_none_match.contains(etag):
+            respuesta = current_app.response_class(status=304)
+        else:
+            respuesta = current_app.response_class(cuerpo, mimetype="application/json")
+        respuesta.set_etag(etag)
+        respuesta.headers["Cache-Control"] = "private, no-cache"
+        return respuesta
+
+    def responder(self, clave, entidades, generar):
+        """
+        Respuesta del listado `clave`, que depende de `entidades`.
+        generar() arma los datos (lista/dict) cuando el cache no sirve.
+        """
+        version = self._version(entidades)
+        with self._lock:
+            guardado = self._listados.get(clave)
+        if guardado and guardado[0] == version:
+            return self._respuesta(guardado[1], guardado[2])
+
+        cuerpo = current_app.json.dumps(generar()).encode("utf-8")
+        etag = hashlib.sha256(cuerpo).hexdigest()[:32]
+        with self._lock:
+            self._listados[clave] = (version, cuerpo, etag)
+        return self._respuesta(cuerpo, etag)
+
+    def limpiar(self):
+        with self._lock:
+            self._versiones.clear()
+            self._listados.clear()
+
+
+catalogo = CacheCatalogo()
+
+
+# ============================================================
+# CAMBIOS DE NOMBRE DE USUARIOS
+# ============================================================
+def _renombrado(usuario):
+    estado = inspect(usuario)
+    return any(estado.attrs[a].history.has_changes() for a in ("nombre", "apellido"))
+
+
+@event.listens_for(db.session, "before_flush")
+def _detectar_renombrados(session, flush_context, instancias):
+    if any(isinstance(o, Usuario) and _renombrado(o) for o in session.dirty):
+        session.info["usuarios_renombrados"] = True
+
+
+@event.listens_for(db.session, "after_commit")
+def _invalidar_renombrados(session):
+    if session.info.pop("usuarios_renombrados", False):
+        from app.utils.indice_materias import indice_materias
+
+        catalogo.invalidar("usuarios")
+        indice_materias.limpiar()  # se reconstruye en la próxima búsqueda
+
+
+@event.listens_for(db.session, "after_rollback")
+def _descartar_renombrados(session):
+    session.info.pop("usuarios_renombrados", None)
@@ -0,0 +1,208 @@
+import unicodedata
+from datetime import datetime, timedelta
+from sqlalchemy import select, insert, and_, values, column, Integer, Date, Time
+from app import db
+from app.models import Clase, Materia
+from app.utils import acumulados
+
+# ============================================================
+# CRONOGRAMA DE CLASES RECURRENTES
+# ============================================================
+# 1. Se expande la recurrencia (días de la semana entre desde y hasta,
+#    sin feriados) para cada materia, después de validar el total contra
+#    CLASES_RECURRENTES_MAX con una cuenta aritmética.
+# 2. Los solapamientos con clases existentes del mismo docente se
+#    detectan en una sola consulta (VALUES JOIN clases).
+# 3. Todas las clases se insertan con un único INSERT multi-fila.
+
+DIAS = {
+    "lunes": 0, "martes": 1, "miercoles": 2, "jueves": 3,
+    "viernes": 4, "sabado": 5, "domingo": 6
+}
+
+
+class ErrorRecurrencia(ValueError):
+    pass
+
+
+def _sin_acentos(texto):
+    return "".join(
+        c for c in unicodedata.normalize("NFD", texto.lower())
+        if unicodedata.category(c) != "Mn"
+    )
+
+
+def _dia(valor):
+    if isinstance(valor, int) and 0 <= valor <= 6:
+        return valor
+    if isinstance(valor, str) and _sin_acentos(valor.strip()) in DIAS:
+        return DIAS[_sin_acentos(valor.strip())]
+    raise ErrorRecurrencia(f"Día inválido: {valor}")
+
+
+def _hora(valor):
+    try:
+        return datetime.strptime(valor, "%H:%M").time()
+    except (TypeError, ValueError):
+        raise ErrorRecurrencia(f"Hora inválida: {valor}")
+
+
+def _fecha(valor):
+    try:
+        return datetime.strptime(valor, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        raise ErrorRecurrencia(f"Fecha inválida: {valor}")
+
+
+def leer_pedido(data):
+    """
+    Normaliza el cuerpo del pedido. Cada entrada de "materias" puede ser
+    un id o un objeto {materia_id, dias?, hora_inicio?, hora_fin?} que
+    pisa los valores generales.
+    Devuelve (desde, hasta, feriados, [(materia_id, dias, hora_inicio, hora_fin)]).
+    """
+    desde = _fecha(data.get("desde"))
+    hasta = _fecha(data.get("hasta"))
+    if hasta < desde:
+        raise ErrorRecurrencia("'hasta' debe ser posterior a 'desde'")
+    feriados = {_fecha(f) for f in data.get("feriados") or []}
+
+    materias = data.get("materias") or []
+    if not isinstance(materias, list) or not materias:
+        raise ErrorRecurrencia("Indicá al menos una materia")
+
+    especificaciones = []
+    for m in materias:
+        m = m if isinstance(m, dict) else {"materia_id": m}
+        try:
+            materia_id = int(m.get("materia_id"))
+        except (TypeError, ValueError):
+            raise ErrorRecurrencia("materia_id inválido")
+
+        dias = m.get("dias", data.get("dias")) or []
+        dias = {_dia(d) for d in dias}
+        if not dias:
+            raise ErrorRecurrencia(f"Sin días para la materia {materia_id}")
+
+        hora_inicio = _hora(m.get("hora_inicio", data.get("hora_inicio")))
+        hora_fin = _hora(m.get("hora_fin", data.get("hora_fin")))
+        if hora_fin <= hora_inicio:
+            raise ErrorRecurrencia("hora_fin debe ser posterior a hora_inicio")
+
+        especificaciones.append((materia_id, dias, hora_inicio, hora_fin))
+
+    return desde, hasta, feriados, especificaciones
+
+
+def _ocurrencias(desde, hasta, dia):
+    """Cuántas fechas entre desde y hasta (inclusive) caen en ese día de la semana."""
+    primera = desde + timedelta(days=(dia - desde.weekday()) % 7)
+    return 0 if primera > hasta else (hasta - primera).days // 7 + 1
+
+
+def contar(desde, hasta, feriados, especificaciones):
+    """Clases que crearía expandir(), sin armar las fechas (para validar el máximo antes)."""
+    total = 0
+    for _, dias, _, _ in especificaciones:
+        total += sum(_ocurrencias(desde, hasta, d) for d in dias)
+        total -= sum(1 for f in feriados if desde <= f <= hasta and f.weekday() in dias)
+    return total
+
+
+def expandir(desde, hasta, feriados, especificaciones, docentes):
+    """
+    Lista de clases a crear, una por fecha; docentes = {materia_id: docente_id}.
+    Devuelve (clases, omitidas_por_feriado).
+    """
+    fechas = [desde + timedelta(days=i) for i in range((hasta - desde).days + 1)]
+    clases = []
+    omitidas = 0
+    for materia_id, dias, hora_inicio, hora_fin in especificaciones:
+        for fecha in fechas:
+            if fecha.weekday() not in dias:
+                continue
+            if fecha in feriados:
+                omitidas += 1
+                continue
+            clases.append({
+                "materia_id": materia_id,
+                "docente_id": docentes[materia_id],
+                "fecha": fecha,
+                "hora_inicio": hora_inicio,
+                "hora_fin": hora_fin
+            })
+    return clases, omitidas
+
+
+# ============================================================
+# CONFLICTOS (UNA CONSULTA + EL PROPIO LOTE)
+# ============================================================
+def _solapan(a, b):
+    return a["hora_inicio"] < b["hora_fin"] and b["hora_inicio"] < a["hora_fin"]
+
+
+def detectar_conflictos(clases):
+    """Devuelve {índice: motivo} de las clases que se pisan con otras del mismo docente."""
+    conflictos = {}
+    if not clases:
+        return conflictos
+
+    candidatas = values(
+        column("indice", Integer),
+        column("docente_id", Integer),
+        column("fecha", Date),
+        column("hora_inicio", Time),
+        column("hora_fin", Time),
+        name="candidatas"
+    ).data([
+        (i, c["docente_id"], c["fecha"], c["hora_inicio"], c["hora_fin"])
+        for i, c in enumerate(clases)
+    ])
+
+    filas = db.session.execute(
+        select(candidatas.c.indice, Clase.id, Clase.materia_id)
+        .join(Clase, and_(
+            Clase.docente_id == candidatas.c.docente_id,
+            Clase.fecha == candidatas.c.fecha,
+            Clase.hora_inicio < candidatas.c.hora_fin,
+            Clase.hora_fin > candidatas.c.hora_inicio
+        ))
+    )
+    for indice, clase_id, materia_id in filas:
+        conflictos.setdefault(indice, f"Se superpone con la clase {clase_id} (materia {materia_id})")
+
+    # Solapamientos dentro del mismo lote (dos materias del mismo docente)
+    por_dia = {}
+    for i, c in enumerate(clases):
+        por_dia.setdefault((c["docente_id"], c["fecha"]), []).append(i)
+    for indices in por_dia.values():
+        indices.sort(key=lambda i: clases[i]["hora_inicio"])
+        ultima = indices[0]  # la que termina más tarde hasta ahora
+        for actual in indices[1:]:
+            if _solapan(clases[ultima], clases[actual]):
+                conflictos.setdefault(
+                    actual, f"Se superpone con otra clase del pedido (materia {clases[ultima]['materia_id']})"
+                )
+            if clases[actual]["hora_fin"] > clases[ultima]["hora_fin"]:
+                ultima = actual
+    return conflictos
+
+
+def insertar_clases(clases):
+    """INSERT multi-fila y suma a los acumulados las clases ya alcanzadas (sin confirmar)."""
+    if not clases:
+        return []
+    acumulados.poner_al_dia()
+    ids = db.session.execute(insert(Clase).returning(Clase.id), clases).scalars().all()
+    acumulados.sumar_clases(ids)
+    return ids
+
+
+def docentes_de_materias(materia_ids):
+    """{materia_id: docente_id} de las materias pedidas (una consulta)."""
+    return {
+        m.id: m.docente_id
+        for m in db.session.execute(
+            select(Materia.id, Materia.docente_id).where(Materia.id.in_(materia_ids))
+        )
+    }
@@ -0,0 +1,332 @@
+import atexit
+import glob
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from sqlalchemy.exc import OperationalError, InterfaceError
+from app import db
+from app.utils import acumulados
+
+log = logging.getLogger(__name__)
+
+
+# ============================================================
+# COLA WRITE-BEHIND DE REGISTROS DE ASISTENCIA
+# ============================================================
+# Con ASISTENCIA_WRITE_BEHIND activo, los check-ins se encolan y un hilo
+# en segundo plano los inserta en un único INSERT multi-fila cada
+# ASISTENCIA_FLUSH_MS milisegundos o cada ASISTENCIA_FLUSH_FILAS filas.
+#
+# Cada fila se escribe (con fsync) en un diario en disco antes de
+# responder: el check-in confirmado sobrevive a una caída. El diario va en
+# ASISTENCIA_DIARIO_DIR (por defecto <instance>/diario_asistencia) y lo usa
+# un solo proceso, que lo bloquea al iniciar. La cola no arranca en
+# create_app sino con iniciar() (run.py), que antes reinserta los diarios
+# que quedaron sin volcar; `flask asistencia recuperar-diario` hace solo
+# esa recuperación.
+#
+# Si el INSERT del lote falla por los datos (p. ej. la clase se borró),
+# el lote se reintenta fila por fila, con espera creciente: las que fallan
+# ASISTENCIA_MAX_REINTENTOS veces se descartan a un registro de rechazos
+# (log y, si hay diario, rechazados.jsonl) para no bloquear al resto.
+# Los errores de conexión no cuentan como intento: el lote espera entero,
+# también con espera creciente.
+
+
+def _bloquear(archivo):
+    """Bloqueo exclusivo sin esperar; False si otro proceso lo tiene."""
+    try:
+        if os.name == "nt":
+            import msvcrt
+            msvcrt.locking(archivo.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(archivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return False
+    return True
+
+class ColaRegistros:
+    def __init__(self):
+        self._cola = queue.Queue()
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo = None
+        self._app = None
+        self._pendientes = []
+        self._diario = None
+        self._diario_dir = None
+        self._bloqueo = None
+        self._intentos = {}
+        self._sin_conexion = 0
+        self.intervalo = 0.2
+        self.max_filas = 500
+        self.max_reintentos = 10
+
+    @property
+    def activa(self):
+        return self._hilo is not None and self._hilo.is_alive()
+
+    def init_app(self, app):
+        self._app = app
+        self.intervalo = app.config.get("ASISTENCIA_FLUSH_MS", 200) / 1000
+        self.max_filas = app.config.get("ASISTENCIA_FLUSH_FILAS", 500)
+        self.max_reintentos = app.config.get("ASISTENCIA_MAX_REINTENTOS", 10)
+        self._diario_dir = app.config.get("ASISTENCIA_DIARIO_DIR") or os.path.join(app.instance_path, "diario_asistencia")
+
+    def iniciar(self):
+        """
+        Recupera los diarios pendientes y arranca el hilo (si
+        ASISTENCIA_WRITE_BEHIND está activo). Lanza RuntimeError si otro
+        proceso ya usa el diario.
+        """
+        if self.activa or not self._app.config.get("ASISTENCIA_WRITE_BEHIND"):
+            return
+        self._tomar_diario()
+        self._pendientes = self._recuperar_diarios()
+        self._abrir_diario()
+
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._trabajar, name="cola-registros", daemon=True)
+        self._hilo.start()
+        atexit.register(self.detener)
+
+    # --------------------------------------------------------
+    # Encolado (hilo de la petición)
+    # --------------------------------------------------------
+    def encolar(self, estudiante_id, clase_id, fecha_hora, metodo):
+        fila = {
+            "estudiante_id": estudiante_id,
+            "clase_id": clase_id,
+            "fecha_hora": fecha_hora,
+            "método_registro": metodo
+        }
+        linea = json.dumps({**fila, "fecha_hora": fecha_hora.isoformat()}, ensure_ascii=False)
+        with self._lock:
+            self._diario.write(linea + "\n")
+            self._diario.flush()
+            os.fsync(self._diario.fileno())
+            self._cola.put(fila)
+
+    # --------------------------------------------------------
+    # Volcado (hilo de fondo)
+    # --------------------------------------------------------
+    def _trabajar(self):
+        while not self._detener.is_set():
+            self._tomar_lote(self.intervalo)
+            self._volcar()
+
+    def _tomar_lote(self, espera):
+        limite = time.monotonic() + espera
+        while len(self._pendientes) < self.max_filas:
+            restante = limite - time.monotonic()
+            try:
+                if restante > 0:
+                    fila = self._cola.get(timeout=restante)
+                else:
+                    fila = self._cola.get_nowait()
+            except queue.Empty:
+                break
+            self._pendientes.append(fila)
+
+    def _drenar(self):
+        while True:
+            try:
+                self._pendientes.append(self._cola.get_nowait())
+            except queue.Empty:
+                return
+
+    def _volcar(self):
+        if not self._pendientes:
+            return
+
+        # Rotar el diario: las filas nuevas van a un archivo nuevo y el
+        # actual se borra recién cuando el lote quedó resuelto.
+        cerrado = self._rotar_diario()
+
+        with self._app.app_context():
+            try:
+                self._pendientes = self._insertar(self._pendientes)
+            finally:
+                db.session.remove()
+
+        if self._pendientes:
+            # Espera creciente mientras haya filas que vienen fallando o no haya conexión
+            fallos = max([self._sin_conexion, *self._intentos.values()])
+            time.sleep(min(self.intervalo * 2 ** fallos, 60))
+            return
+        if cerrado:
+            for ruta in cerrado:
+                os.remove(ruta)
+
+    def _insertar(self, filas):
+        """
+        Inserta y confirma las filas. Devuelve las que quedan para
+        reintentar (vacío si todas se insertaron o se descartaron).
+        """
+        try:
+            acumulados.poner_al_dia()
+            self.insertar_lote(filas)
+            db.session.commit()
+            self._sin_conexion = 0
+            return []
+        except (OperationalError, InterfaceError):
+            db.session.rollback()
+            self._sin_conexion += 1
+            log.exception("Sin conexión para volcar %d registros; se reintenta", len(filas))
+            return filas
+        except Exception:
+            db.session.rollback()
+            log.exception("Falló el lote de %d registros; se reintenta fila por fila", len(filas))
+
+        pendientes = []
+        for fila in filas:
+            try:
+                self.insertar_lote([fila])
+                db.session.commit()
+                self._intentos.pop(self._clave(fila), None)
+            except (OperationalError, InterfaceError):
+                db.session.rollback()
+                pendientes.append(fila)
+            except Exception as e:
+                db.session.rollback()
+                clave = self._clave(fila)
+                self._intentos[clave] = self._intentos.get(clave, 0) + 1
+                if self._intentos[clave] >= self.max_reintentos:
+                    self._intentos.pop(clave)
+                    self._descartar(fila, e)
+                else:
+                    pendientes.append(fila)
+        return pendientes
+
+    @staticmethod
+    def _clave(fila):
+        return fila["estudiante_id"], fila["clase_id"]
+
+    def _descartar(self, fila, error):
+        log.error("Registro de asistencia descartado tras %d intentos: %s (%s)",
+                  self.max_reintentos, fila, error)
+        linea = json.dumps({
+            **fila,
+            "fecha_hora": fila["fecha_hora"].isoformat(),
+            "error": str(error).splitlines()[0],
+            "descartado_en": datetime.now().isoformat()
+        }, ensure_ascii=False)
+        with open(os.path.join(self._diario_dir, "rechazados.jsonl"), "a", encoding="utf-8") as f:
+            f.write(linea + "\n")
+
+    def insertar_lote(self, filas):
+        # Los pares ya registrados se descartan: reinsertar un diario ya volcado no duplica
+        from app.utils.registro_asistencia import insertar_registros
+
+        acumulados.registrar_presencias(insertar_registros(filas))
+
+    def vaciar(self):
+        """Vuelca todo lo encolado de forma sincrónica."""
+        while True:
+            self._tomar_lote(0)
+            if not self._pendientes:
+                return
+            self._volcar()
+            if self._pendientes:
+                return
+
+    def detener(self):
+        if not self._hilo:
+            return
+        self._detener.set()
+        self._hilo.join()
+        self._hilo = None
+        self.vaciar()
+        if self._diario:
+            self._diario.close()
+            self._diario = None
+        self._soltar_diario()
+
+    # --------------------------------------------------------
+    # Diario en disco
+    # --------------------------------------------------------
+    def _ruta_activa(self):
+        return os.path.join(self._diario_dir, "registros.jsonl")
+
+    def _abrir_diario(self):
+        self._diario = open(self._ruta_activa(), "a", encoding="utf-8")
+
+    def _rotar_diario(self):
+        if not self._diario:
+            return None
+        with self._lock:
+            # Todo lo escrito en el diario que se rota pasa a este lote
+            self._drenar()
+            self._diario.close()
+            destino = os.path.join(self._diario_dir, f"registros.{time.time_ns()}.volcando")
+            os.replace(self._ruta_activa(), destino)
+            self._abrir_diario()
+        return sorted(glob.glob(os.path.join(self._diario_dir, "*.volcando")))
+
+    def _tomar_diario(self):
+        os.makedirs(self._diario_dir, exist_ok=True)
+        bloqueo = open(os.path.join(self._diario_dir, "diario.lock"), "a+")
+        if not _bloquear(bloqueo):
+            bloqueo.close()
+            raise RuntimeError(f"Otro proceso usa el diario de asistencias en {self._diario_dir}")
+        self._bloqueo = bloqueo
+
+    def _soltar_diario(self):
+        if self._bloqueo:
+            self._bloqueo.close()  # cerrar el archivo libera el bloqueo
+            self._bloqueo = None
+
+    def recuperar(self):
+        """
+        Solo la recuperación (sin arrancar el hilo), para
+        `flask asistencia recuperar-diario` con el servidor detenido.
+        Devuelve las filas que no se pudieron volcar.
+        """
+        self._tomar_diario()
+        try:
+            pendientes = self._recuperar_diarios()
+        finally:
+            self._soltar_diario()
+        return pendientes
+
+    def _recuperar_diarios(self):
+        """
+        Un intento de reinsertar los diarios sin volcar. Devuelve las filas
+        que quedan (sin conexión): el hilo las reintenta con espera
+        creciente y sus archivos se borran cuando se vuelcan.
+        """
+        rutas = sorted(glob.glob(os.path.join(self._diario_dir, "*.volcando")))
+        if os.path.exists(self._ruta_activa()):
+            rutas.append(self._ruta_activa())
+
+        filas = []
+        for ruta in rutas:
+            with open(ruta, encoding="utf-8") as f:
+                for linea in f:
+                    if linea.strip():
+                        fila = json.loads(linea)
+                        fila["fecha_hora"] = datetime.fromisoformat(fila["fecha_hora"])
+                        filas.append(fila)
+        if not filas:
+            return []
+
+        # Mismo camino que el volcado: una fila inválida no impide arrancar
+        with self._app.app_context():
+            try:
+                pendientes = self._insertar(filas)
+            finally:
+                db.session.remove()
+        if pendientes:
+            log.warning("%d registros del diario quedan pendientes de volcar", len(pendientes))
+            return pendientes
+        for ruta in rutas:
+            os.remove(ruta)
+        log.info("Recuperados %d registros de asistencia del diario", len(filas))
+        return []
+
+cola_registros = ColaRegistros()
@@ -1,13 +1,31 @@
-from flask_mail import Message
-from flask import current_app
+from sqlalchemy import insert
+from app import db
+from app.models import CorreoSaliente
+
+# Los correos se guardan en la bandeja de salida (correos_salientes) dentro
+# de la transacción de quien los pide: solo salen si esa transacción se
+# confirma. Los envía el hilo de app/utils/envio_correos.py.
 
 def send_email(to_email, subject, body):
-    from app import mail  # ⬅️ import diferido para evitar error circular
-
-    msg = Message(
-        subject,
-        recipients=[to_email],
-        body=body,
-        sender=(current_app.config.get("MAIL_DEFAULT_NAME", "Sistema"), current_app.config.get("MAIL_DEFAULT_EMAIL"))
-    )
-    mail.send(msg)
+    """Encola un correo (sin confirmar) y devuelve su id."""
+    from app.utils.envio_correos import envio_correos
+
+    correo = CorreoSaliente(destinatario=to_email, asunto=subject, cuerpo=body)
+    db.session.add(correo)
+    db.session.flush()
+    envio_correos.avisar()
+    return correo.id
+
+
+def send_emails(correos):
+    """Encola varios correos [(to_email, subject, body)] con un solo INSERT; devuelve los ids."""
+    from app.utils.envio_correos import envio_correos
+
+    if not correos:
+        return []
+    ids = db.session.execute(
+        insert(CorreoSaliente).returning(CorreoSaliente.id, sort_by_parameter_order=True),
+        [{"destinatario": d, "asunto": a, "cuerpo": c} for d, a, c in correos]
+    ).scalars().all()
+    envio_correos.avisar()
+    return ids
@@ -0,0 +1,216 @@
+import atexit
+import logging
+import smtplib
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from flask_mail import Message
+from sqlalchemy import select, update, func
+from app import db, mail
+from app.models import CorreoSaliente
+
+log = logging.getLogger(__name__)
+
+
+# ============================================================
+# ENVÍO DE LA BANDEJA DE SALIDA
+# ============================================================
+# Un hilo en segundo plano toma lotes de correos pendientes cada
+# CORREOS_INTERVALO_SEGUNDOS (o apenas se encola uno) y los envía por una
+# sola conexión SMTP. Cada lote se reserva corriendo proximo_intento
+# CORREOS_BLOQUEO_SEGUNDOS hacia adelante (FOR UPDATE SKIP LOCKED): otro
+# proceso no lo toma, y si este se cae el lote vuelve a quedar disponible.
+# Un envío fallido se reintenta con espera exponencial hasta
+# CORREOS_MAX_INTENTOS; después queda 'fallido'.
+# El cuerpo (que puede llevar una contraseña temporal) se borra apenas el
+# correo sale o queda 'fallido': la bandeja conserva solo los metadatos.
+
+# Rechazos de un mensaje puntual (destinatario, remitente, contenido). Van
+# antes que OSError: las excepciones de smtplib heredan de OSError, y
+# cualquier otro OSError significa que se perdió la conexión.
+ERRORES_DEL_MENSAJE = (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException)
+
+
+class EnvioCorreos:
+    def __init__(self):
+        self._hay_trabajo = threading.Event()
+        self._detener = threading.Event()
+        self._hilo = None
+        self._app = None
+
+    @property
+    def activo(self):
+        return self._hilo is not None and self._hilo.is_alive()
+
+    def init_app(self, app):
+        self._app = app
+        if not app.config.get("CORREOS_WORKER"):
+            return
+
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._trabajar, name="envio-correos", daemon=True)
+        self._hilo.start()
+        atexit.register(self.detener)
+
+    def avisar(self):
+        self._hay_trabajo.set()
+
+    def detener(self):
+        if not self._hilo:
+            return
+        self._detener.set()
+        self._hay_trabajo.set()
+        self._hilo.join()
+        self._hilo = None
+
+    # --------------------------------------------------------
+    # Hilo de fondo
+    # --------------------------------------------------------
+    def _trabajar(self):
+        intervalo = self._app.config["CORREOS_INTERVALO_SEGUNDOS"]
+        while not self._detener.is_set():
+            self._hay_trabajo.wait(intervalo)
+            self._hay_trabajo.clear()
+            with self._app.app_context():
+                try:
+                    # Lotes seguidos mientras haya pendientes
+                    while not self._detener.is_set() and self.enviar_pendientes():
+                        pass
+                except Exception:
+                    db.session.rollback()
+                    log.exception("Falló el envío de la bandeja de salida")
+                finally:
+                    db.session.remove()
+
+    # --------------------------------------------------------
+    # Envío de un lote (también lo usa "flask correos enviar")
+    # --------------------------------------------------------
+    def _reservar(self, config):
+        ahora = datetime.now()
+        elegibles = (
+            select(CorreoSaliente.id)
+            .where(CorreoSaliente.estado == "pendiente", CorreoSaliente.proximo_intento <= ahora)
+            .order_by(CorreoSaliente.proximo_intento, CorreoSaliente.id)
+            .limit(config["CORREOS_LOTE"])
+            .with_for_update(skip_locked=True)
+        )
+        lote = db.session.execute(
+            update(CorreoSaliente)
+            .where(CorreoSaliente.id.in_(elegibles.scalar_subquery()))
+            .values(proximo_intento=ahora + timedelta(seconds=config["CORREOS_BLOQUEO_SEGUNDOS"]))
+            .returning(CorreoSaliente.id, CorreoSaliente.destinatario, CorreoSaliente.asunto,
+                       CorreoSaliente.cuerpo, CorreoSaliente.intentos)
+        ).all()
+        db.session.commit()
+        return sorted(lote)
+
+    def enviar_pendientes(self):
+        """
+        Envía un lote por una sola conexión SMTP. Devuelve cuántos correos
+        se intentaron (0 si no había o si no se pudo conectar).
+        """
+        config = current_app.config
+        lote = self._reservar(config)
+        if not lote:
+            return 0
+
+        errores = {}  # id -> mensaje de error
+        enviados = []
+        restantes = list(lote)
+        try:
+            with mail.connect() as conexion:
+                while restantes:
+                    correo = restantes[0]
+                    # Sin sender: Flask-Mail usa MAIL_DEFAULT_SENDER
+                    mensaje = Message(correo.asunto, recipients=[correo.destinatario], body=correo.cuerpo)
+                    try:
+                        conexion.send(mensaje)
+                        enviados.append(correo.id)
+                    except ERRORES_DEL_MENSAJE as e:
+                        errores[correo.id] = str(e)
+                    except OSError:
+                        raise
+                    except Exception as e:
+                        errores[correo.id] = str(e) or type(e).__name__
+                    restantes.pop(0)
+        except OSError as e:
+            # Sin conexión: el lote que no salió espera CORREOS_REINTENTO_SEGUNDOS
+            # sin gastar intentos (así el hilo no insiste contra un servidor caído)
+            log.warning("Error de conexión SMTP (%s); %d correos vuelven a la cola", e, len(restantes))
+
+        self._registrar(lote, enviados, errores, [c.id for c in restantes], config)
+        return len(enviados) + len(errores)
+
+    def _espera(self, intentos, config):
+        return timedelta(seconds=config["CORREOS_REINTENTO_SEGUNDOS"] * 2 ** (intentos - 1))
+
+    def _registrar(self, lote, enviados, errores, sin_enviar, config):
+        ahora = datetime.now()
+        if enviados:
+            db.session.execute(
+                update(CorreoSaliente).where(CorreoSaliente.id.in_(enviados))
+                .values(estado="enviado", enviado_en=ahora, intentos=CorreoSaliente.intentos + 1,
+                        ultimo_error=None, cuerpo=None)
+            )
+        if sin_enviar:
+            db.session.execute(
+                update(CorreoSaliente).where(CorreoSaliente.id.in_(sin_enviar))
+                .values(proximo_intento=ahora + self._espera(1, config))
+            )
+
+        maximo = config["CORREOS_MAX_INTENTOS"]
+        for correo in lote:
+            if correo.id not in errores:
+                continue
+            intentos = correo.intentos + 1
+            fallido = intentos >= maximo
+            valores = dict(
+                intentos=intentos,
+                ultimo_error=errores[correo.id],
+                estado="fallido" if fallido else "pendiente",
+                proximo_intento=ahora + self._espera(intentos, config)
+            )
+            if fallido:
+                valores["cuerpo"] = None
+            db.session.execute(
+                update(CorreoSaliente).where(CorreoSaliente.id == correo.id).values(**valores)
+            )
+            log.warning("No se pudo enviar el correo %d a %s (intento %d): %s",
+                        correo.id, correo.destinatario, intentos, errores[correo.id])
+        db.session.commit()
+
+    # --------------------------------------------------------
+    # Estado de la bandeja
+    # --------------------------------------------------------
+    def estado(self):
+        por_estado = dict(db.session.execute(
+            select(CorreoSaliente.estado, func.count()).group_by(CorreoSaliente.estado)
+        ).all())
+        mas_viejo = db.session.execute(
+            select(func.min(CorreoSaliente.creado_en)).where(CorreoSaliente.estado == "pendiente")
+        ).scalar()
+        fallidos = db.session.execute(
+            select(CorreoSaliente.id, CorreoSaliente.destinatario, CorreoSaliente.intentos,
+                   CorreoSaliente.ultimo_error, CorreoSaliente.proximo_intento, CorreoSaliente.estado)
+            .where(CorreoSaliente.ultimo_error.isnot(None))
+            .order_by(CorreoSaliente.proximo_intento.desc())
+            .limit(20)
+        ).all()
+        return {
+            "worker_activo": self.activo,
+            "pendientes": por_estado.get("pendiente", 0),
+            "enviados": por_estado.get("enviado", 0),
+            "fallidos": por_estado.get("fallido", 0),
+            "pendiente_mas_antiguo": mas_viejo.isoformat() if mas_viejo else None,
+            "ultimos_errores": [
+                {
+                    "id": f.id, "destinatario": f.destinatario, "intentos": f.intentos,
+                    "error": f.ultimo_error, "estado": f.estado,
+                    "proximo_intento": f.proximo_intento.isoformat()
+                }
+                for f in fallidos
+            ]
+        }
+
+
+envio_correos = EnvioCorreos()
@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, insert, func
+from app import db
+from app.models import Materia, Docente, Curso
+from app.utils.indice_materias import indice_materias
+from app.utils.cache_catalogo import catalogo
+
+# ============================================================
+# IMPORTACIÓN DE MATERIAS (EXCEL / CSV)
+# ============================================================
+# Corre como trabajo en segundo plano, por bloques (app/utils/importaciones.py).
+# Por bloque:
+# 1. Los curso_id / docente_id referenciados se resuelven con dos
+#    consultas IN y las materias ya cargadas en esos cursos con una
+#    tercera (clave: curso_id + nombre en minúsculas).
+# 2. La validación son joins de pandas contra esos resultados.
+# 3. Las materias válidas se insertan con un único INSERT multi-fila.
+
+COLUMNAS = ["nombre", "curso_id", "docente_id"]
+LARGO_NOMBRE = Materia.__table__.c.nombre.type.length
+
+
+def _existentes(modelo, ids):
+    if not ids:
+        return pd.DataFrame({"id": pd.Series(dtype="int64")})
+    return pd.DataFrame(
+        {"id": db.session.execute(select(modelo.id).where(modelo.id.in_(ids))).scalars().all()},
+        dtype="int64"
+    )
+
+
+def _cargadas(curso_ids):
+    """DataFrame (curso_id, clave) de las materias ya existentes en esos cursos."""
+    filas = db.session.execute(
+        select(Materia.curso_id, func.lower(func.trim(Materia.nombre)))
+        .where(Materia.curso_id.in_(curso_ids))
+    ).all() if curso_ids else []
+    return pd.DataFrame(filas, columns=["curso_id", "clave"]).astype({"curso_id": "int64"})
+
+
+def _marcar(df, otra, izquierda, derecha, columna):
+    """Agrega `columna` (bool): si la fila tiene pareja en `otra` (left join)."""
+    otra = otra[derecha].drop_duplicates().assign(**{columna: True})
+    unido = df[izquierda].merge(otra, how="left", left_on=izquierda, right_on=derecha)
+    df[columna] = unido[columna].fillna(False).astype(bool).to_numpy()
+    return df
+
+
+def validar(df, fila_inicial=2):
+    """
+    Normaliza el DataFrame y agrega "fila" y "error" (None si la fila es
+    válida). Las materias de bloques anteriores ya están en la sesión, así
+    que cuentan como cargadas.
+    """
+    df = df[COLUMNAS].fillna("").astype(str).apply(lambda c: c.str.strip())
+    df.insert(0, "fila", np.arange(len(df)) + fila_inicial)
+    df["clave"] = df["nombre"].str.lower()
+
+    curso = pd.to_numeric(df["curso_id"], errors="coerce")
+    docente = pd.to_numeric(df["docente_id"], errors="coerce")
+    ids_validos = curso.notna() & (curso % 1 == 0) & docente.notna() & (docente % 1 == 0)
+    df["curso_id"] = curso.where(ids_validos, -1).astype("int64")
+    df["docente_id"] = docente.where(ids_validos, -1).astype("int64")
+
+    curso_ids = sorted(set(df.loc[ids_validos, "curso_id"].tolist()))
+    docente_ids = sorted(set(df.loc[ids_validos, "docente_id"].tolist()))
+    cargadas = _cargadas(curso_ids)
+
+    df = _marcar(df, _existentes(Curso, curso_ids), ["curso_id"], ["id"], "curso_existe")
+    df = _marcar(df, _existentes(Docente, docente_ids), ["docente_id"], ["id"], "docente_existe")
+    df = _marcar(df, cargadas, ["curso_id", "clave"], ["curso_id", "clave"], "ya_cargada")
+
+    # El primer error de cada fila, en este orden
+    condiciones = [
+        (df[COLUMNAS] == "").any(axis=1),
+        ~ids_validos,
+        df["nombre"].str.len() > LARGO_NOMBRE,
+        ~df["curso_existe"],
+        ~df["docente_existe"],
+        df.duplicated(["curso_id", "clave"]),
+        df["ya_cargada"],
+    ]
+    mensajes = [
+        "Faltan datos obligatorios",
+        "curso_id y docente_id deben ser números enteros",
+        f"El nombre supera los {LARGO_NOMBRE} caracteres",
+        "Curso ID " + df["curso_id"].astype(str) + " no existe",
+        "Docente ID " + df["docente_id"].astype(str) + " no existe",
+        "Materia repetida en el archivo para ese curso",
+        "La materia ya existe en ese curso",
+    ]
+    df["error"] = np.select(condiciones, mensajes, default="")
+    df["error"] = df["error"].replace("", None)
+    return df.drop(columns=["curso_existe", "docente_existe", "ya_cargada"])
+
+
+def insertar(validos):
+    """INSERT multi-fila de las materias válidas (sin confirmar); devuelve los ids."""
+    if validos.empty:
+        return []
+    filas = validos[["nombre", "curso_id", "docente_id"]].to_dict("records")
+    for f in filas:
+        f["curso_id"] = int(f["curso_id"])
+        f["docente_id"] = int(f["docente_id"])
+    return db.session.execute(insert(Materia).returning(Materia.id), filas).scalars().all()
+
+
+class ProcesadorMaterias:
+    """Un bloque del archivo: valida e inserta las materias (sin confirmar)."""
+    columnas = COLUMNAS
+
+    def __init__(self):
+        self._nuevas = []
+
+    def procesar(self, df, fila_inicial):
+        df = validar(df, fila_inicial)
+        errores = df.loc[df["error"].notna(), ["fila", "error"]].to_dict("records")
+        self._nuevas = insertar(df[df["error"].isna()])
+        return len(self._nuevas), errores
+
+    def confirmado(self):
+        # Las materias del bloque entran al autocompletado y al listado recién confirmadas
+        indice_materias.actualizar(self._nuevas)
+        if self._nuevas:
+            catalogo.invalidar("materias")
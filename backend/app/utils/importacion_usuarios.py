@@ -0,0 +1,187 @@
+import os
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt as _bcrypt
+import numpy as np
+from flask import current_app
+from sqlalchemy import select, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app import db
+from app.models import Usuario, Docente, Estudiante
+from app.utils.email import send_emails
+
+# ============================================================
+# IMPORTACIÓN MASIVA DE USUARIOS (EXCEL / CSV)
+# ============================================================
+# Corre como trabajo en segundo plano, por bloques (app/utils/importaciones.py).
+# 1. Se validan todas las filas del bloque a la vez con pandas (campos
+#    vacíos, rol, formato de correo y DNI, repetidos en el archivo y ya
+#    registrados, estos últimos contra sets precargados con una sola
+#    consulta al empezar el trabajo).
+# 2. Los hashes bcrypt (lo más caro: cientos de ms cada uno) se calculan
+#    en paralelo. bcrypt libera el GIL mientras hashea, así que un pool de
+#    hilos usa todos los núcleos sin hacer fork del servidor (que tiene
+#    hilos de Socket.IO) ni volver a ejecutar run.py en procesos nuevos.
+# 3. Usuarios y sus filas de Docente / Estudiante se insertan con dos
+#    INSERT multi-fila.
+
+COLUMNAS = ["nombre", "apellido", "correo", "dni", "rol"]
+ROLES = ["docente", "estudiante"]
+FORMATO_CORREO = r"[^@\s]+@[^@\s]+\.[^@\s]+"
+FORMATO_DNI = r"\d{6,10}"
+
+_pool = None
+
+
+def _hashear(password, rondas):
+    return _bcrypt.hashpw(password.encode("utf-8"), _bcrypt.gensalt(rondas)).decode("utf-8")
+
+
+def _pool_hash():
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(
+            max_workers=current_app.config["USUARIOS_HASH_HILOS"] or os.cpu_count(),
+            thread_name_prefix="bcrypt"
+        )
+    return _pool
+
+
+def hashear_passwords(passwords):
+    """Hashes bcrypt compatibles con Flask-Bcrypt, en paralelo."""
+    rondas = current_app.config.get("BCRYPT_LOG_ROUNDS", 12)
+    return list(_pool_hash().map(_hashear, passwords, [rondas] * len(passwords)))
+
+
+def existentes():
+    """(correos en minúscula, dnis) ya registrados, en una consulta."""
+    correos, dnis = set(), set()
+    for correo, dni in db.session.execute(select(Usuario.correo, Usuario.dni)):
+        if correo:
+            correos.add(correo.strip().lower())
+        if dni:
+            dnis.add(dni.strip())
+    return correos, dnis
+
+
+def validar(df, registrados, fila_inicial=2):
+    """
+    Normaliza el DataFrame y agrega las columnas "fila" (número en el
+    archivo; la primera fila de datos es la 2) y "error" (None si la fila
+    es válida). registrados = existentes().
+    """
+    df = df[COLUMNAS].fillna("").astype(str).apply(lambda c: c.str.strip())
+    df["rol"] = df["rol"].str.lower()
+    df["dni"] = df["dni"].str.replace(".", "", regex=False)
+    df.insert(0, "fila", np.arange(len(df)) + fila_inicial)
+
+    correo_clave = df["correo"].str.lower()
+    correos, dnis = registrados
+
+    # El primer error de cada fila, en este orden
+    condiciones = [
+        (df[COLUMNAS] == "").any(axis=1),
+        df["rol"] == "administrador",
+        ~df["rol"].isin(ROLES),
+        ~df["correo"].str.fullmatch(FORMATO_CORREO),
+        ~df["dni"].str.fullmatch(FORMATO_DNI),
+        correo_clave.duplicated(),
+        df["dni"].duplicated(),
+        correo_clave.isin(correos) | df["dni"].isin(dnis),
+    ]
+    mensajes = [
+        "Faltan datos obligatorios",
+        "No se permite importar administradores",
+        "Rol no válido: " + df["rol"],
+        "Correo inválido",
+        "DNI inválido",
+        "Correo repetido en el archivo",
+        "DNI repetido en el archivo",
+        "Email o DNI ya registrados",
+    ]
+    df["error"] = np.select(condiciones, mensajes, default="")
+    df["error"] = df["error"].replace("", None)
+    return df
+
+
+def insertar(validos):
+    """
+    Inserta los usuarios válidos con sus contraseñas temporales (sin
+    confirmar). Devuelve (insertados, rechazados): los rechazados son los
+    que otra petición registró entre la validación y el INSERT.
+    """
+    if validos.empty:
+        return [], []
+
+    passwords = [secrets.token_urlsafe(8) for _ in range(len(validos))]
+    hashes = hashear_passwords(passwords)
+
+    filas = [
+        {
+            "nombre": v.nombre, "apellido": v.apellido, "correo": v.correo,
+            "dni": v.dni, "rol": v.rol, "contraseña": h, "debe_cambiar_password": True
+        }
+        for v, h in zip(validos.itertuples(index=False), hashes)
+    ]
+    ids = dict(db.session.execute(
+        pg_insert(Usuario).on_conflict_do_nothing().returning(Usuario.correo, Usuario.id),
+        filas
+    ).all())
+
+    docentes, estudiantes, insertados, rechazados = [], [], [], []
+    for v, password in zip(validos.itertuples(index=False), passwords):
+        usuario_id = ids.get(v.correo)
+        if usuario_id is None:
+            rechazados.append({"fila": int(v.fila), "error": "Email o DNI ya registrados"})
+            continue
+        (docentes if v.rol == "docente" else estudiantes).append({"usuario_id": usuario_id})
+        insertados.append({
+            "fila": int(v.fila), "nombre": v.nombre, "apellido": v.apellido,
+            "correo": v.correo, "dni": v.dni, "password": password
+        })
+
+    if docentes:
+        db.session.execute(insert(Docente), docentes)
+    if estudiantes:
+        db.session.execute(insert(Estudiante), estudiantes)
+    return insertados, rechazados
+
+
+def _correo_credenciales(u):
+    return (
+        u['correo'],
+        "Credenciales de acceso - Sistema de Asistencia",
+        f"Hola {u['nombre']} {u['apellido']},\n\n"
+        f"Se creó tu usuario en el Sistema de Asistencia.\n\n"
+        f"Correo: {u['correo']}\n"
+        f"Contraseña temporal: {u['password']}\n\n"
+        f"Deberás cambiarla al iniciar sesión por primera vez.\n\n"
+        f"Saludos,\nAdministración"
+    )
+
+
+class ProcesadorUsuarios:
+    """Un bloque del archivo: valida, inserta y encola las credenciales (sin confirmar)."""
+    columnas = COLUMNAS
+
+    def __init__(self):
+        self._registrados = None
+
+    def procesar(self, df, fila_inicial):
+        if self._registrados is None:
+            self._registrados = existentes()
+
+        df = validar(df, self._registrados, fila_inicial)
+        errores = df.loc[df["error"].notna(), ["fila", "error"]].to_dict("records")
+        insertados, rechazados = insertar(df[df["error"].isna()])
+
+        # Las credenciales van a la bandeja de salida en la misma transacción
+        send_emails([_correo_credenciales(u) for u in insertados])
+
+        # Los bloques siguientes ven a estos como ya registrados
+        correos, dnis = self._registrados
+        for u in insertados:
+            correos.add(u["correo"].lower())
+            dnis.add(u["dni"])
+
+        return len(insertados), sorted(errores + rechazados, key=lambda e: e["fila"])
@@ -0,0 +1,281 @@
+import logging
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import pandas as pd
+from openpyxl import load_workbook
+from sqlalchemy import select, update, func
+from app import db
+from app.models import TrabajoImportacion
+
+log = logging.getLogger(__name__)
+
+
+# ============================================================
+# IMPORTACIONES EN SEGUNDO PLANO, POR BLOQUES
+# ============================================================
+# La petición solo guarda el archivo en IMPORTACIONES_DIR, crea el
+# trabajo y responde 202. Un hilo lo procesa de a IMPORTACION_BLOQUE
+# filas (read_csv con chunksize, openpyxl en modo read_only para xlsx)
+# y confirma cada bloque junto con el avance del trabajo: un bloque queda
+# entero o no queda, y un trabajo interrumpido se retoma desde la fila
+# siguiente al último bloque confirmado (ver reanudar()).
+#
+# Un trabajo lo procesa un solo hilo aunque haya varios procesos: quien
+# lo toma guarda un advisory lock de PostgreSQL en una conexión propia
+# mientras dura (se libera solo si el proceso muere) y lo pasa a
+# 'procesando' con un UPDATE condicionado a que siga sin terminar.
+
+# Primera mitad de la clave de pg_advisory_lock(int, int); la segunda es el id
+BLOQUEO_IMPORTACIONES = 7407
+
+def _texto(valor):
+    if valor is None:
+        return ""
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))  # DNI / ids numéricos en Excel
+    return str(valor)
+
+
+def leer_encabezado(ruta):
+    if ruta.endswith(".csv"):
+        return list(pd.read_csv(ruta, nrows=0).columns)
+    libro = load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        primera = next(libro.active.iter_rows(max_row=1, values_only=True), ())
+        return [_texto(c).strip() for c in primera]
+    finally:
+        libro.close()
+
+
+def leer_por_bloques(ruta, tamaño):
+    """DataFrames de hasta `tamaño` filas, todo como texto."""
+    if ruta.endswith(".csv"):
+        yield from pd.read_csv(ruta, chunksize=tamaño, dtype=str, keep_default_na=False)
+        return
+
+    libro = load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        filas = libro.active.iter_rows(values_only=True)
+        columnas = [_texto(c).strip() for c in next(filas, ())]
+        bloque = []
+        for fila in filas:
+            bloque.append([_texto(v) for v in fila])
+            if len(bloque) == tamaño:
+                yield pd.DataFrame(bloque, columns=columnas)
+                bloque = []
+        if bloque:
+            yield pd.DataFrame(bloque, columns=columnas)
+    finally:
+        libro.close()
+
+
+class ServicioImportaciones:
+    def __init__(self):
+        self._app = None
+        self._pool = None
+        self._procesadores = {}
+
+    def init_app(self, app):
+        self._app = app
+
+    def registrar(self, tipo, procesador):
+        """
+        procesador(): objeto con `columnas` y
+        `procesar(df, fila_inicial) -> (importadas, errores)`; se crea uno
+        por trabajo, así puede guardar estado entre bloques. Si además
+        tiene `confirmado()`, se llama después de confirmar cada bloque.
+        """
+        self._procesadores[tipo] = procesador
+
+    def _directorio(self):
+        directorio = self._app.config.get("IMPORTACIONES_DIR") or os.path.join(self._app.instance_path, "importaciones")
+        os.makedirs(directorio, exist_ok=True)
+        return directorio
+
+    def _enviar(self, trabajo_id):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self._app.config["IMPORTACIONES_HILOS"], thread_name_prefix="importacion"
+            )
+        self._pool.submit(self._ejecutar, trabajo_id)
+
+    # --------------------------------------------------------
+    # Alta del trabajo (hilo de la petición)
+    # --------------------------------------------------------
+    def encolar(self, tipo, archivo, usuario_id):
+        """
+        Guarda el archivo subido y crea el trabajo. Devuelve el trabajo o
+        lanza ValueError si el archivo no se puede leer o faltan columnas.
+        """
+        extension = os.path.splitext(archivo.filename)[1].lower()
+        ruta = os.path.join(self._directorio(), f"{uuid.uuid4().hex}{extension}")
+        archivo.save(ruta)
+
+        try:
+            encabezado = leer_encabezado(ruta)
+        except Exception as e:
+            # openpyxl / pandas lanzan de todo ante un archivo dañado
+            # (BadZipFile, KeyError, InvalidFileException, ParserError...)
+            os.remove(ruta)
+            raise ValueError(f"No se pudo leer el archivo: {type(e).__name__}")
+
+        faltantes = set(self._procesadores[tipo].columnas) - set(encabezado)
+        if faltantes:
+            os.remove(ruta)
+            raise ValueError(f"Faltan columnas requeridas: {', '.join(sorted(faltantes))}")
+
+        trabajo = TrabajoImportacion(
+            tipo=tipo, archivo=ruta, nombre_archivo=archivo.filename, creado_por=usuario_id
+        )
+        db.session.add(trabajo)
+        db.session.commit()
+        self._enviar(trabajo.id)
+        return trabajo
+
+    def reanudar(self):
+        """
+        Vuelve a encolar los trabajos que quedaron sin terminar (al iniciar).
+        Si otro proceso ya tiene alguno, el hilo que lo recibe no lo toma.
+        """
+        ids = [
+            t.id for t in TrabajoImportacion.query
+            .filter(TrabajoImportacion.estado.in_(["pendiente", "procesando"]))
+            .order_by(TrabajoImportacion.id)
+        ]
+        for trabajo_id in ids:
+            self._enviar(trabajo_id)
+        return ids
+
+    # --------------------------------------------------------
+    # Procesamiento (hilo de fondo)
+    # --------------------------------------------------------
+    def _tomar(self, trabajo_id):
+        """
+        Reserva el trabajo para este hilo. Devuelve la conexión que guarda el
+        advisory lock, o None si otro lo está procesando o ya terminó.
+        """
+        conexion = db.engine.connect()
+        try:
+            if conexion.execute(
+                select(func.pg_try_advisory_lock(BLOQUEO_IMPORTACIONES, trabajo_id))
+            ).scalar():
+                conexion.commit()  # el lock es de sesión: no hace falta la transacción abierta
+                T = TrabajoImportacion
+                tomado = db.session.execute(
+                    update(T)
+                    .where(T.id == trabajo_id, T.estado.in_(["pendiente", "procesando"]))
+                    .values(estado="procesando", iniciado_en=func.coalesce(T.iniciado_en, datetime.now()))
+                    .returning(T.id)
+                ).scalar()
+                db.session.commit()
+                if tomado:
+                    return conexion
+                self._soltar(conexion, trabajo_id)
+                return None
+        except Exception:
+            # Cerrar la conexión descartada también libera el lock
+            db.session.rollback()
+            conexion.invalidate()
+            conexion.close()
+            log.exception("No se pudo tomar la importación %d", trabajo_id)
+            return None
+        conexion.close()
+        return None
+
+    def _soltar(self, conexion, trabajo_id):
+        try:
+            conexion.execute(select(func.pg_advisory_unlock(BLOQUEO_IMPORTACIONES, trabajo_id)))
+            conexion.rollback()
+        except Exception:
+            # Sin poder liberar, la conexión no vuelve al pool con el lock tomado
+            conexion.invalidate()
+        finally:
+            conexion.close()
+
+    def _ejecutar(self, trabajo_id):
+        with self._app.app_context():
+            bloqueo = self._tomar(trabajo_id)
+            if bloqueo is None:
+                log.info("La importación %d no se toma: otro proceso la tiene o ya terminó", trabajo_id)
+                db.session.remove()
+                return
+            try:
+                self._procesar(trabajo_id)
+            except Exception as e:
+                db.session.rollback()
+                log.exception("Falló la importación %d", trabajo_id)
+                trabajo = db.session.get(TrabajoImportacion, trabajo_id)
+                trabajo.estado = "fallido"
+                trabajo.mensaje_error = str(e)
+                trabajo.terminado_en = datetime.now()
+                db.session.commit()
+                self._borrar_archivo(trabajo)
+            finally:
+                self._soltar(bloqueo, trabajo_id)
+                db.session.remove()
+
+    def _procesar(self, trabajo_id):
+        config = self._app.config
+        trabajo = db.session.get(TrabajoImportacion, trabajo_id)
+
+        procesador = self._procesadores[trabajo.tipo]()
+        tamaño = config["IMPORTACION_BLOQUE"]
+        max_errores = config["IMPORTACION_MAX_ERRORES"]
+        ya_procesadas = trabajo.filas_procesadas
+        leidas = 0
+
+        for df in leer_por_bloques(trabajo.archivo, tamaño):
+            inicio = leidas
+            leidas += len(df)
+            if leidas <= ya_procesadas:
+                continue  # bloque confirmado antes de una interrupción
+            if inicio < ya_procesadas:
+                df = df.iloc[ya_procesadas - inicio:]
+                inicio = ya_procesadas
+
+            importadas, errores = procesador.procesar(df.reset_index(drop=True), fila_inicial=inicio + 2)
+
+            trabajo.filas_procesadas = leidas
+            trabajo.filas_importadas += importadas
+            trabajo.total_errores += len(errores)
+            if errores and len(trabajo.errores) < max_errores:
+                trabajo.errores = trabajo.errores + errores[:max_errores - len(trabajo.errores)]
+            db.session.commit()
+            if hasattr(procesador, "confirmado"):
+                procesador.confirmado()
+
+        trabajo.estado = "terminado"
+        trabajo.terminado_en = datetime.now()
+        db.session.commit()
+        self._borrar_archivo(trabajo)
+
+    def _borrar_archivo(self, trabajo):
+        try:
+            os.remove(trabajo.archivo)
+        except OSError:
+            pass
+
+
+def estado_trabajo(trabajo):
+    fin = trabajo.terminado_en or datetime.now()
+    segundos = (fin - trabajo.iniciado_en).total_seconds() if trabajo.iniciado_en else 0
+    return {
+        "id": trabajo.id,
+        "tipo": trabajo.tipo,
+        "estado": trabajo.estado,
+        "archivo": trabajo.nombre_archivo,
+        "filas_procesadas": trabajo.filas_procesadas,
+        "filas_importadas": trabajo.filas_importadas,
+        "total_errores": trabajo.total_errores,
+        "errores": trabajo.errores,
+        "mensaje_error": trabajo.mensaje_error,
+        "filas_por_segundo": round(trabajo.filas_procesadas / segundos, 1) if segundos > 0 else None,
+        "creado_en": trabajo.creado_en.isoformat(),
+        "iniciado_en": trabajo.iniciado_en.isoformat() if trabajo.iniciado_en else None,
+        "terminado_en": trabajo.terminado_en.isoformat() if trabajo.terminado_en else None
+    }
+
+
+importaciones = ServicioImportaciones()
@@ -0,0 +1,151 @@
+import threading
+import unicodedata
+from sqlalchemy import select
+from app import db
+from app.models import Materia, Curso, Docente, Usuario
+
+# ============================================================
+# ÍNDICE EN MEMORIA PARA EL AUTOCOMPLETADO DE MATERIAS
+# ============================================================
+# materia_id -> (nombre, nombre plegado, curso, "Nombre Apellido" del docente)
+# n-grama    -> set de materia_id cuyo nombre plegado lo contiene
+#
+# Los nombres se pliegan (minúsculas, sin acentos, espacios simples) y se
+# indexan sus n-gramas de 1 a 3 caracteres: una búsqueda interseca los
+# conjuntos de los trigramas del término (o del término entero si es más
+# corto) y confirma la subcadena sobre esos pocos candidatos.
+# Se construye al iniciar con una sola consulta y se actualiza al crear,
+# editar, borrar o importar materias y al renombrar un curso.
+
+N_MAXIMO = 3
+
+
+def plegar(texto):
+    texto = unicodedata.normalize("NFD", (texto or "").lower())
+    return " ".join("".join(c for c in texto if unicodedata.category(c) != "Mn").split())
+
+
+def _ngramas(texto, n):
+    return {texto[i:i + n] for i in range(len(texto) - n + 1)}
+
+
+def _rango(plegado, termino):
+    """Menor es mejor: igual, empieza con, una palabra empieza con, contiene."""
+    if plegado == termino:
+        return 0
+    if plegado.startswith(termino):
+        return 1
+    if f" {termino}" in plegado:
+        return 2
+    return 3
+
+
+class IndiceMaterias:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._materias = {}
+        self._ngramas = {}
+        self._cargado = False
+
+    # --------------------------------------------------------
+    # Carga desde la base
+    # --------------------------------------------------------
+    def _consulta(self):
+        return (
+            select(Materia.id, Materia.nombre, Curso.nombre, Usuario.nombre, Usuario.apellido)
+            .outerjoin(Curso, Curso.id == Materia.curso_id)
+            .outerjoin(Docente, Docente.id == Materia.docente_id)
+            .outerjoin(Usuario, Usuario.id == Docente.usuario_id)
+        )
+
+    def _agregar(self, materia_id, nombre, curso, nombre_docente, apellido_docente):
+        plegado = plegar(nombre)
+        docente = f"{nombre_docente} {apellido_docente}" if nombre_docente is not None else None
+        self._materias[materia_id] = (nombre, plegado, curso, docente)
+        for n in range(1, N_MAXIMO + 1):
+            for g in _ngramas(plegado, n):
+                self._ngramas.setdefault(g, set()).add(materia_id)
+
+    def _quitar(self, materia_id):
+        previa = self._materias.pop(materia_id, None)
+        if previa is None:
+            return
+        for n in range(1, N_MAXIMO + 1):
+            for g in _ngramas(previa[1], n):
+                ids = self._ngramas.get(g)
+                if ids is not None:
+                    ids.discard(materia_id)
+                    if not ids:
+                        del self._ngramas[g]
+
+    def cargar(self):
+        """(Re)construye el índice completo con una consulta."""
+        filas = db.session.execute(self._consulta()).all()
+        with self._lock:
+            self._materias.clear()
+            self._ngramas.clear()
+            for f in filas:
+                self._agregar(*f)
+            self._cargado = True
+        return len(filas)
+
+    # --------------------------------------------------------
+    # API pública
+    # --------------------------------------------------------
+    def actualizar(self, materia_ids):
+        """Vuelve a leer las materias indicadas (las que ya no existen se quitan)."""
+        materia_ids = list(materia_ids)
+        if not materia_ids or not self._cargado:
+            return
+        filas = db.session.execute(self._consulta().where(Materia.id.in_(materia_ids))).all()
+        with self._lock:
+            for materia_id in materia_ids:
+                self._quitar(materia_id)
+            for f in filas:
+                self._agregar(*f)
+
+    def actualizar_curso(self, curso_id):
+        """Refresca las materias del curso (p. ej. si cambió su nombre)."""
+        if not self._cargado:
+            return
+        self.actualizar(db.session.execute(
+            select(Materia.id).where(Materia.curso_id == curso_id)
+        ).scalars().all())
+
+    def quitar(self, materia_id):
+        with self._lock:
+            self._quitar(materia_id)
+
+    def buscar(self, termino, limite=10):
+        termino = plegar(termino)
+        if not termino:
+            return []
+        if not self._cargado:
+            self.cargar()
+
+        n = min(len(termino), N_MAXIMO)
+        with self._lock:
+            conjuntos = sorted(
+                (self._ngramas.get(g, set()) for g in _ngramas(termino, n)), key=len
+            )
+            candidatos = set(conjuntos[0]).intersection(*conjuntos[1:]) if conjuntos else set()
+            encontrados = [
+                (materia_id, self._materias[materia_id])
+                for materia_id in candidatos
+                if termino in self._materias[materia_id][1]
+            ]
+
+        encontrados.sort(key=lambda e: (_rango(e[1][1], termino), len(e[1][1]), e[1][1], e[0]))
+        return [
+            {"id": materia_id, "nombre": nombre, "curso": curso, "docente": docente}
+            for materia_id, (nombre, _, curso, docente) in encontrados[:limite]
+        ]
+
+    def limpiar(self):
+        with self._lock:
+            self._materias.clear()
+            self._ngramas.clear()
+            self._cargado = False
+
+
+indice_materias = IndiceMaterias()
@@ -0,0 +1,238 @@
+from datetime import datetime, timedelta
+from sqlalchemy import select, insert, update, func, and_, literal
+from sqlalchemy.orm import aliased
+from app import db
+from app.models import EstudiantesMaterias, Estudiante, Materia, Curso
+from app.utils import acumulados
+from app.utils.padron import padron
+
+# ============================================================
+# INSCRIPCIÓN, BAJA Y REINCORPORACIÓN MASIVAS
+# ============================================================
+# El producto estudiantes x materias se inscribe con un único
+# INSERT ... SELECT que descarta los pares con inscripción activa.
+# Los acumulados de los pares nuevos se recalculan en la misma
+# transacción y el padrón de cada materia se invalida al confirmar.
+
+
+ESTADOS_BAJA = ("baja", "baja_por_inasistencia")
+
+
+class ErrorInscripcion(ValueError):
+    pass
+
+
+def _enteros(valores, nombre):
+    if not isinstance(valores, list) or not valores:
+        raise ErrorInscripcion(f"'{nombre}' debe ser una lista no vacía")
+    try:
+        return sorted({int(v) for v in valores})
+    except (TypeError, ValueError):
+        raise ErrorInscripcion(f"'{nombre}' debe contener ids numéricos")
+
+
+def leer_pedido(data):
+    """
+    Normaliza el cuerpo: materia_id o materia_ids, y exactamente uno de
+    curso_id, carrera_id o estudiante_ids (ids de la tabla estudiantes).
+    Devuelve (materia_ids, {criterio: valor}).
+    """
+    if data.get("materia_ids") is not None:
+        materia_ids = _enteros(data["materia_ids"], "materia_ids")
+    else:
+        materia_ids = _enteros([data.get("materia_id")], "materia_id")
+
+    criterios = [c for c in ("curso_id", "carrera_id", "estudiante_ids") if data.get(c) is not None]
+    if len(criterios) != 1:
+        raise ErrorInscripcion("Indicá uno (y solo uno) de curso_id, carrera_id o estudiante_ids")
+    criterio = criterios[0]
+
+    if criterio == "estudiante_ids":
+        return materia_ids, {criterio: _enteros(data[criterio], criterio)}
+    try:
+        return materia_ids, {criterio: int(data[criterio])}
+    except (TypeError, ValueError):
+        raise ErrorInscripcion(f"'{criterio}' inválido")
+
+
+def _candidatos(materia_ids, curso_id=None, carrera_id=None, estudiante_ids=None):
+    """SELECT (estudiante_id, materia_id) de todos los pares pedidos."""
+    consulta = (
+        select(Estudiante.id.label("estudiante_id"), Materia.id.label("materia_id"))
+        .select_from(Estudiante)
+        .join(Materia, Materia.id.in_(materia_ids))
+    )
+    if curso_id is not None:
+        consulta = consulta.where(Estudiante.curso_id == curso_id)
+    elif carrera_id is not None:
+        consulta = consulta.join(Curso, Curso.id == Estudiante.curso_id).where(Curso.carrera_id == carrera_id)
+    else:
+        consulta = consulta.where(Estudiante.id.in_(estudiante_ids))
+    return consulta
+
+
+def inscribir(materia_ids, **criterio):
+    """
+    Inscribe y confirma. Devuelve {"inscriptas", "ya_inscriptas",
+    "inscripciones": [{id, estudiante_id, materia_id}]}; lanza
+    ErrorInscripcion si alguna materia no existe.
+    """
+    existentes = set(db.session.execute(
+        select(Materia.id).where(Materia.id.in_(materia_ids))
+    ).scalars())
+    faltantes = [m for m in materia_ids if m not in existentes]
+    if faltantes:
+        raise ErrorInscripcion(f"Materias inexistentes: {', '.join(map(str, faltantes))}")
+
+    acumulados.poner_al_dia()
+
+    candidatos = _candidatos(materia_ids, **criterio).subquery()
+    activa = aliased(EstudiantesMaterias)
+    nuevos = (
+        select(candidatos.c.estudiante_id, candidatos.c.materia_id, literal(datetime.now()), literal("activo"))
+        .where(~select(activa.id).where(and_(
+            activa.estudiante_id == candidatos.c.estudiante_id,
+            activa.materia_id == candidatos.c.materia_id,
+            activa.estado == "activo"
+        )).exists())
+    )
+
+    total = db.session.execute(select(func.count()).select_from(candidatos)).scalar()
+    filas = db.session.execute(
+        insert(EstudiantesMaterias)
+        .from_select(["estudiante_id", "materia_id", "fecha_alta", "estado"], nuevos)
+        .returning(EstudiantesMaterias.id, EstudiantesMaterias.estudiante_id, EstudiantesMaterias.materia_id)
+    ).all()
+
+    acumulados.recalcular_inscripciones([f.id for f in filas])
+    db.session.commit()
+    for materia_id in {f.materia_id for f in filas}:
+        padron.invalidar_materia(materia_id)
+
+    return {
+        "inscriptas": len(filas),
+        "ya_inscriptas": total - len(filas),
+        "inscripciones": [
+            {"id": f.id, "estudiante_id": f.estudiante_id, "materia_id": f.materia_id} for f in filas
+        ]
+    }
+
+
+# ============================================================
+# BAJA Y REINCORPORACIÓN EN LOTE
+# ============================================================
+# Un único UPDATE ... RETURNING sobre las inscripciones elegidas por ids
+# o por filtro (materia, estado, rango de fecha_alta). Un docente solo
+# alcanza las inscripciones de sus materias.
+
+def _fecha(valor, nombre):
+    try:
+        return datetime.fromisoformat(valor)
+    except (TypeError, ValueError):
+        raise ErrorInscripcion(f"'{nombre}' inválida (use AAAA-MM-DD)")
+
+
+def leer_seleccion(data):
+    """
+    Condiciones WHERE a partir de "ids" o de "filtro" {materia_id, estado,
+    fecha_alta_desde, fecha_alta_hasta}. Lanza ErrorInscripcion si no hay
+    ninguna (nunca se toca la tabla entera).
+    """
+    EM = EstudiantesMaterias
+    if data.get("ids") is not None:
+        return [EM.id.in_(_enteros(data["ids"], "ids"))]
+
+    filtro = data.get("filtro") or {}
+    if not isinstance(filtro, dict):
+        raise ErrorInscripcion("'filtro' debe ser un objeto")
+    condiciones = []
+    if filtro.get("materia_id") is not None:
+        try:
+            condiciones.append(EM.materia_id == int(filtro["materia_id"]))
+        except (TypeError, ValueError):
+            raise ErrorInscripcion("'materia_id' inválido")
+    if filtro.get("estado"):
+        if filtro["estado"] not in ("activo", *ESTADOS_BAJA):
+            raise ErrorInscripcion(f"'estado' inválido: {filtro['estado']}")
+        condiciones.append(EM.estado == filtro["estado"])
+    if filtro.get("fecha_alta_desde"):
+        condiciones.append(EM.fecha_alta >= _fecha(filtro["fecha_alta_desde"], "fecha_alta_desde"))
+    if filtro.get("fecha_alta_hasta"):
+        texto = filtro["fecha_alta_hasta"]
+        hasta = _fecha(texto, "fecha_alta_hasta")
+        if len(texto) == 10:  # solo fecha: incluye el día completo
+            condiciones.append(EM.fecha_alta < hasta + timedelta(days=1))
+        else:
+            condiciones.append(EM.fecha_alta <= hasta)
+    if not condiciones:
+        raise ErrorInscripcion("Indicá 'ids' o al menos un criterio en 'filtro'")
+    return condiciones
+
+
+def _alcance(docente_id):
+    if docente_id is None:
+        return []
+    return [EstudiantesMaterias.materia_id.in_(
+        select(Materia.id).where(Materia.docente_id == docente_id)
+    )]
+
+
+def _actualizar(condiciones, valores):
+    """UPDATE ... RETURNING, confirma e invalida el padrón de las materias tocadas."""
+    EM = EstudiantesMaterias
+    filas = db.session.execute(
+        update(EM)
+        .where(*condiciones)
+        .values(**valores)
+        .returning(EM.id, EM.estudiante_id, EM.materia_id, EM.estado, EM.fecha_baja)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.session.commit()
+    for materia_id in {f.materia_id for f in filas}:
+        padron.invalidar_materia(materia_id)
+
+    return [
+        {
+            "id": f.id,
+            "estudiante_id": f.estudiante_id,
+            "materia_id": f.materia_id,
+            "estado": f.estado,
+            "fecha_baja": f.fecha_baja.strftime('%d-%m-%Y %H:%M:%S') if f.fecha_baja else None
+        }
+        for f in filas
+    ]
+
+
+def dar_baja(condiciones, docente_id=None, estado="baja_por_inasistencia"):
+    """Da de baja las inscripciones activas seleccionadas; devuelve las afectadas."""
+    if estado not in ESTADOS_BAJA:
+        raise ErrorInscripcion(f"Estado de baja inválido (use {' o '.join(ESTADOS_BAJA)})")
+    return _actualizar(
+        condiciones + _alcance(docente_id) + [EstudiantesMaterias.estado == "activo"],
+        {"estado": estado, "fecha_baja": datetime.now(), "docente_id": docente_id}
+    )
+
+
+def reincorporar(condiciones, docente_id=None):
+    """
+    Vuelve a activar las inscripciones dadas de baja seleccionadas. Por
+    cada par (estudiante, materia) se reactiva solo la más reciente, y no
+    si el par ya tiene otra inscripción activa.
+    """
+    EM = EstudiantesMaterias
+    activa = aliased(EstudiantesMaterias)
+    ultimas = (
+        select(EM.id)
+        .where(*condiciones, *_alcance(docente_id), EM.estado != "activo")
+        .where(~select(activa.id).where(and_(
+            activa.estudiante_id == EM.estudiante_id,
+            activa.materia_id == EM.materia_id,
+            activa.estado == "activo"
+        )).exists())
+        .distinct(EM.estudiante_id, EM.materia_id)
+        .order_by(EM.estudiante_id, EM.materia_id, EM.id.desc())
+    )
+    return _actualizar(
+        [EM.id.in_(ultimas)],
+        {"estado": "activo", "fecha_baja": None, "docente_id": None}
+    )
@@ -0,0 +1,79 @@
+import base64
+from datetime import date, time
+from sqlalchemy import select, tuple_
+from app.models import Clase, Materia, Curso, Docente, Usuario
+
+# ============================================================
+# LISTADO DE CLASES: PROYECCIÓN + KEYSET (fecha, hora_inicio, id)
+# ============================================================
+
+def escapar_like(texto):
+    """Escapa los comodines de LIKE para buscar el texto literal."""
+    return texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def consulta_clases(docente_id=None, desde=None, hasta=None, fecha=None, materia_nombre=None, cursor=None):
+    consulta = (
+        select(
+            Clase.id,
+            Clase.fecha,
+            Clase.hora_inicio,
+            Clase.hora_fin,
+            Clase.materia_id,
+            Materia.nombre,
+            Curso.id,
+            Curso.nombre,
+            Clase.docente_id,
+            Usuario.nombre,
+            Usuario.apellido
+        )
+        .outerjoin(Materia, Materia.id == Clase.materia_id)
+        .outerjoin(Curso, Curso.id == Materia.curso_id)
+        .outerjoin(Docente, Docente.id == Clase.docente_id)
+        .outerjoin(Usuario, Usuario.id == Docente.usuario_id)
+        .order_by(Clase.fecha, Clase.hora_inicio, Clase.id)
+    )
+
+    if docente_id is not None:
+        consulta = consulta.where(Clase.docente_id == docente_id)
+    if fecha:
+        consulta = consulta.where(Clase.fecha == fecha)
+    if desde:
+        consulta = consulta.where(Clase.fecha >= desde)
+    if hasta:
+        consulta = consulta.where(Clase.fecha <= hasta)
+    if materia_nombre:
+        # Resuelto por el índice trigram ix_materias_nombre_trgm
+        consulta = consulta.where(Materia.nombre.ilike(f"%{escapar_like(materia_nombre)}%", escape="\\"))
+    if cursor:
+        consulta = consulta.where(tuple_(Clase.fecha, Clase.hora_inicio, Clase.id) > tuple_(*cursor))
+
+    return consulta
+
+
+def fila_a_dict(f):
+    return {
+        "id": f[0],
+        "fecha": f[1].isoformat(),
+        "hora_inicio": f[2].strftime('%H:%M'),
+        "hora_fin": f[3].strftime('%H:%M'),
+        "materia_id": f[4],
+        "materia": {"id": f[4], "nombre": f[5]} if f[5] is not None else None,
+        "curso": {"id": f[6], "nombre": f[7]} if f[6] is not None else None,
+        "docente_id": f[8],
+        "docente": f"{f[9]} {f[10]}" if f[9] is not None else None
+    }
+
+
+def codificar_cursor(fila):
+    crudo = f"{fila[1].isoformat()}|{fila[2].isoformat()}|{fila[0]}".encode()
+    return base64.urlsafe_b64encode(crudo).decode()
+
+
+def decodificar_cursor(cursor):
+    """Devuelve (fecha, hora_inicio, id) o lanza ValueError."""
+    try:
+        fecha, hora, id_ = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return date.fromisoformat(fecha), time.fromisoformat(hora), int(id_)
+    except Exception:
+        raise ValueError("Cursor inválido")
@@ -0,0 +1,135 @@
+from datetime import datetime
+from sqlalchemy import select, and_
+from app import db
+from app.models import Clase, EstudiantesMaterias
+from app.utils import acumulados
+from app.utils.registro_asistencia import insertar_registros
+from app.utils.padron import padron
+from app.utils.tiempo_real import emisor_asistencia
+
+
+# ============================================================
+# SINCRONIZACIÓN DE ASISTENCIAS EN LOTE (OFFLINE / LECTORA)
+# ============================================================
+# 1. Validación de formato registro por registro.
+# 2. Una sola consulta: clases del lote LEFT JOIN inscripciones activas
+#    de los estudiantes del lote.
+# 3. Un INSERT multi-fila (insertar_registros) que separa los registros
+#    nuevos de los que ya existían, en cualquier mes.
+
+def _normalizar(indice, registro, ahora):
+    try:
+        estudiante_id = int(registro["estudiante_id"])
+        clase_id = int(registro["clase_id"])
+        metodo = str(registro.get("metodo") or "manual")[:20]
+        fecha_hora = registro.get("fecha_hora")
+        fecha_hora = datetime.fromisoformat(fecha_hora) if fecha_hora else ahora
+        if fecha_hora.tzinfo is not None:
+            # Con zona ("Z", "+00:00"): se pasa a la hora local, como las clases
+            fecha_hora = fecha_hora.astimezone().replace(tzinfo=None)
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return None
+    return {
+        "indice": indice,
+        "estudiante_id": estudiante_id,
+        "clase_id": clase_id,
+        "método_registro": metodo,
+        "fecha_hora": fecha_hora
+    }
+
+
+def _cargar_validacion(clase_ids, estudiante_ids):
+    """{clase_id: (datos_clase, set de estudiantes inscriptos)} en una consulta."""
+    filas = db.session.execute(
+        select(
+            Clase.id,
+            Clase.materia_id,
+            Clase.docente_id,
+            Clase.fecha,
+            Clase.hora_inicio,
+            EstudiantesMaterias.estudiante_id
+        )
+        .outerjoin(EstudiantesMaterias, and_(
+            EstudiantesMaterias.materia_id == Clase.materia_id,
+            EstudiantesMaterias.estado == "activo",
+            EstudiantesMaterias.estudiante_id.in_(estudiante_ids)
+        ))
+        .where(Clase.id.in_(clase_ids))
+    )
+
+    clases = {}
+    for f in filas:
+        datos, inscriptos = clases.setdefault(f.id, ({
+            "id": f.id,
+            "materia_id": f.materia_id,
+            "docente_id": f.docente_id,
+            "fecha": f.fecha,
+            "hora_inicio": f.hora_inicio
+        }, set()))
+        if f.estudiante_id is not None:
+            inscriptos.add(f.estudiante_id)
+    return clases
+
+
+def registrar_lote(registros, docente_id=None):
+    """
+    registros: lista de {estudiante_id, clase_id, metodo, fecha_hora?}.
+    docente_id: si se indica, solo se aceptan clases de ese docente.
+    Devuelve la lista de resultados por registro, en el orden recibido.
+    """
+    ahora = datetime.now()
+    resultados = [None] * len(registros)
+    candidatos = []
+
+    for i, registro in enumerate(registros):
+        fila = _normalizar(i, registro, ahora) if isinstance(registro, dict) else None
+        if fila is None:
+            resultados[i] = {"indice": i, "estado": "invalido", "error": "Registro con formato inválido"}
+        else:
+            candidatos.append(fila)
+
+    if not candidatos:
+        return resultados
+
+    clases = _cargar_validacion(
+        {f["clase_id"] for f in candidatos},
+        {f["estudiante_id"] for f in candidatos}
+    )
+
+    validos = {}
+    for f in candidatos:
+        i = f["indice"]
+        clase = clases.get(f["clase_id"])
+        if not clase:
+            resultados[i] = {"indice": i, "estado": "rechazado", "error": "Clase no encontrada"}
+        elif docente_id is not None and clase[0]["docente_id"] != docente_id:
+            resultados[i] = {"indice": i, "estado": "rechazado", "error": "La clase no pertenece al docente"}
+        elif f["estudiante_id"] not in clase[1]:
+            resultados[i] = {"indice": i, "estado": "rechazado", "error": "Estudiante no inscripto en la materia"}
+        elif (f["estudiante_id"], f["clase_id"]) in validos:
+            resultados[i] = {"indice": i, "estado": "duplicado_en_lote"}
+        else:
+            validos[(f["estudiante_id"], f["clase_id"])] = f
+
+    if validos:
+        acumulados.poner_al_dia()
+        nuevos = {(e, c) for e, c, _ in insertar_registros(
+            [{k: v for k, v in f.items() if k != "indice"} for f in validos.values()]
+        )}
+
+        acumulados.registrar_presencias(
+            [(e, c, validos[(e, c)]["fecha_hora"]) for e, c in nuevos],
+            {clase_id: datos for clase_id, (datos, _) in clases.items()}
+        )
+        db.session.commit()
+
+        for (e, c), f in validos.items():
+            i = f["indice"]
+            if (e, c) in nuevos:
+                resultados[i] = {"indice": i, "estado": "registrado"}
+                padron.reservar_registro(c, e, f["fecha_hora"], f["método_registro"])
+                emisor_asistencia.notificar(clases[c][0], e, f["fecha_hora"])
+            else:
+                resultados[i] = {"indice": i, "estado": "ya_registrado"}
+
+    return resultados
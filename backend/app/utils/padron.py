@@ -0,0 +1,174 @@
+import threading
+from collections import OrderedDict
+from sqlalchemy import select
+from app import db
+from app.models import Clase, Materia, Usuario, Estudiante, EstudiantesMaterias, RegistrosDeAsistencia
+
+
+# ============================================================
+# CACHE EN MEMORIA DEL PADRÓN DE CADA CLASE
+# ============================================================
+# clase_id    -> datos de la clase (materia, fecha, horario)
+# materia_id  -> set de estudiante_id con inscripción activa
+# usuario_id  -> estudiante_id
+# estudiante_id -> (nombre, apellido) para las notificaciones en vivo
+# clase_id    -> {estudiante_id: (fecha_hora, metodo)} ya registrados
+#
+# Se calienta al generar el QR de una clase y se invalida cuando
+# cambian las inscripciones o la clase.
+
+class CachePadron:
+    def __init__(self, max_clases=512):
+        self.max_clases = max_clases
+        self._lock = threading.Lock()
+        self._clases = OrderedDict()
+        self._materias = {}
+        self._usuarios = {}
+        self._nombres = {}
+        self._registrados = {}
+
+    # --------------------------------------------------------
+    # Carga desde la base
+    # --------------------------------------------------------
+    def _cargar_clase(self, clase_id):
+        fila = db.session.execute(
+            select(Clase.id, Clase.materia_id, Clase.docente_id, Clase.fecha, Clase.hora_inicio, Materia.nombre)
+            .join(Materia, Materia.id == Clase.materia_id)
+            .where(Clase.id == clase_id)
+        ).first()
+        if not fila:
+            return None
+
+        clase = {
+            "id": fila.id,
+            "materia_id": fila.materia_id,
+            "docente_id": fila.docente_id,
+            "materia_nombre": fila.nombre,
+            "fecha": fila.fecha,
+            "hora_inicio": fila.hora_inicio
+        }
+        registrados = {
+            r.estudiante_id: (r.fecha_hora, r.método_registro)
+            for r in db.session.execute(
+                select(
+                    RegistrosDeAsistencia.estudiante_id,
+                    RegistrosDeAsistencia.fecha_hora,
+                    RegistrosDeAsistencia.método_registro
+                ).where(RegistrosDeAsistencia.clase_id == clase_id)
+            )
+        }
+
+        with self._lock:
+            self._clases[clase_id] = clase
+            self._clases.move_to_end(clase_id)
+            self._registrados[clase_id] = registrados
+            while len(self._clases) > self.max_clases:
+                viejo, _ = self._clases.popitem(last=False)
+                self._registrados.pop(viejo, None)
+        return clase
+
+    def _cargar_materia(self, materia_id):
+        filas = db.session.execute(
+            select(
+                EstudiantesMaterias.estudiante_id,
+                Estudiante.usuario_id,
+                Usuario.nombre,
+                Usuario.apellido
+            )
+            .join(Estudiante, Estudiante.id == EstudiantesMaterias.estudiante_id)
+            .outerjoin(Usuario, Usuario.id == Estudiante.usuario_id)
+            .where(
+                EstudiantesMaterias.materia_id == materia_id,
+                EstudiantesMaterias.estado == "activo"
+            )
+        ).all()
+
+        inscriptos = {f.estudiante_id for f in filas}
+        with self._lock:
+            self._materias[materia_id] = inscriptos
+            for f in filas:
+                if f.usuario_id is not None:
+                    self._usuarios[f.usuario_id] = f.estudiante_id
+                self._nombres[f.estudiante_id] = (f.nombre, f.apellido)
+        return inscriptos
+
+    # --------------------------------------------------------
+    # API pública
+    # --------------------------------------------------------
+    def calentar(self, clase_id):
+        """Carga (o recarga) la clase, su padrón y sus registros."""
+        clase = self._cargar_clase(clase_id)
+        if clase:
+            self._cargar_materia(clase["materia_id"])
+        return clase
+
+    def obtener_clase(self, clase_id):
+        with self._lock:
+            clase = self._clases.get(clase_id)
+            if clase:
+                self._clases.move_to_end(clase_id)
+                return clase
+        return self._cargar_clase(clase_id)
+
+    def inscriptos(self, materia_id):
+        with self._lock:
+            inscriptos = self._materias.get(materia_id)
+        if inscriptos is None:
+            inscriptos = self._cargar_materia(materia_id)
+        return inscriptos
+
+    def estudiante_de_usuario(self, usuario_id):
+        with self._lock:
+            estudiante_id = self._usuarios.get(usuario_id)
+        if estudiante_id is not None:
+            return estudiante_id
+
+        estudiante_id = db.session.execute(
+            select(Estudiante.id).where(Estudiante.usuario_id == usuario_id)
+        ).scalar()
+        if estudiante_id is not None:
+            with self._lock:
+                self._usuarios[usuario_id] = estudiante_id
+        return estudiante_id
+
+    def nombre_de(self, estudiante_id):
+        with self._lock:
+            return self._nombres.get(estudiante_id, (None, None))
+
+    def reservar_registro(self, clase_id, estudiante_id, fecha_hora, metodo):
+        """
+        Marca al estudiante como registrado en la clase.
+        Devuelve None si la reserva es nueva, o (fecha_hora, metodo)
+        del registro previo si ya estaba.
+        """
+        with self._lock:
+            registrados = self._registrados.setdefault(clase_id, {})
+            previo = registrados.get(estudiante_id)
+            if previo:
+                return previo
+            registrados[estudiante_id] = (fecha_hora, metodo)
+            return None
+
+    def liberar_registro(self, clase_id, estudiante_id):
+        with self._lock:
+            self._registrados.get(clase_id, {}).pop(estudiante_id, None)
+
+    def invalidar_materia(self, materia_id):
+        with self._lock:
+            self._materias.pop(materia_id, None)
+
+    def invalidar_clase(self, clase_id):
+        with self._lock:
+            self._clases.pop(clase_id, None)
+            self._registrados.pop(clase_id, None)
+
+    def limpiar(self):
+        with self._lock:
+            self._clases.clear()
+            self._materias.clear()
+            self._usuarios.clear()
+            self._nombres.clear()
+            self._registrados.clear()
+
+
+padron = CachePadron()
@@ -0,0 +1,215 @@
+import re
+from datetime import date, timedelta
+from flask import current_app
+from sqlalchemy import text, select, func
+from app import db
+from app.models import RegistrosDeAsistencia, Clase
+from app.utils.periodos import periodo_actual, periodo_anterior
+
+# ============================================================
+# PARTICIONES MENSUALES DE registros_de_asistencia
+# ============================================================
+# - Una partición por mes: registros_de_asistencia_AAAA_MM, con su
+#   índice único (estudiante_id, clase_id) para los registros del mes.
+# - Una partición DEFAULT recibe lo que caiga fuera de los meses
+#   creados; al crear el mes, sus filas se mueven a la partición nueva.
+# - archivar() desengancha (DETACH) los cuatrimestres viejos: las
+#   tablas siguen existiendo, pero dejan de participar en las consultas.
+#   Antes congela los acumulados de esas clases (acumulados.congelar).
+# - El registro único (estudiante, clase) entre meses lo garantiza la
+#   tabla registros_unicos, que no se particiona ni se archiva.
+
+TABLA = RegistrosDeAsistencia.__tablename__
+DEFAULT = f"{TABLA}_default"
+_PATRON = re.compile(rf"^{TABLA}_(\d{{4}})_(\d{{2}})$")
+
+
+def _nombre(anio, mes):
+    return f"{TABLA}_{anio}_{mes:02d}"
+
+
+def _mes_siguiente(anio, mes):
+    return (anio + 1, 1) if mes == 12 else (anio, mes + 1)
+
+
+def _existe(nombre):
+    return db.session.execute(
+        text("SELECT to_regclass(:nombre) IS NOT NULL"), {"nombre": nombre}
+    ).scalar()
+
+
+def es_particionada():
+    return db.session.execute(text(
+        "SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(:tabla)"
+    ), {"tabla": TABLA}).scalar() or False
+
+
+def particiones():
+    """[(nombre, anio, mes)] de las particiones mensuales enganchadas."""
+    nombres = db.session.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:tabla)"
+    ), {"tabla": TABLA}).scalars()
+
+    resultado = []
+    for nombre in nombres:
+        m = _PATRON.match(nombre)
+        if m:
+            resultado.append((nombre, int(m.group(1)), int(m.group(2))))
+    return sorted(resultado, key=lambda p: (p[1], p[2]))
+
+
+# ============================================================
+# CREACIÓN
+# ============================================================
+def _crear_default():
+    if _existe(DEFAULT):
+        return False
+    db.session.execute(text(f"CREATE TABLE {DEFAULT} PARTITION OF {TABLA} DEFAULT"))
+    db.session.execute(text(
+        f"CREATE UNIQUE INDEX uq_{DEFAULT} ON {DEFAULT} (estudiante_id, clase_id)"
+    ))
+    return True
+
+
+def _crear_mes(anio, mes):
+    nombre = _nombre(anio, mes)
+    if _existe(nombre):
+        return False
+
+    desde = date(anio, mes, 1)
+    hasta = date(*_mes_siguiente(anio, mes), 1)
+
+    db.session.execute(text(f"CREATE TABLE {nombre} (LIKE {TABLA} INCLUDING DEFAULTS)"))
+    if _existe(DEFAULT):
+        # Las filas del mes que hayan caído en DEFAULT pasan a la partición nueva
+        db.session.execute(text(
+            f"WITH movidas AS ("
+            f"  DELETE FROM {DEFAULT} WHERE fecha_hora >= :desde AND fecha_hora < :hasta RETURNING *"
+            f") INSERT INTO {nombre} SELECT * FROM movidas"
+        ), {"desde": desde, "hasta": hasta})
+    db.session.execute(text(
+        f"CREATE UNIQUE INDEX uq_{nombre} ON {nombre} (estudiante_id, clase_id)"
+    ))
+    db.session.execute(text(
+        f"ALTER TABLE {TABLA} ATTACH PARTITION {nombre} "
+        f"FOR VALUES FROM ('{desde.isoformat()}') TO ('{hasta.isoformat()}')"
+    ))
+    return True
+
+
+def crear_particiones_futuras(meses=None, hoy=None, desde=None, confirmar=True):
+    """
+    Crea la partición DEFAULT y las mensuales desde `desde` (por defecto el
+    mes actual) hasta `meses` meses hacia adelante.
+    """
+    if meses is None:
+        meses = current_app.config.get("REGISTROS_PARTICIONES_FUTURAS", 3)
+    hoy = hoy or date.today()
+    anio, mes = (desde.year, desde.month) if desde else (hoy.year, hoy.month)
+    fin = (hoy.year * 12 + hoy.month - 1) + meses
+
+    creadas = []
+    if _crear_default():
+        creadas.append(DEFAULT)
+    while anio * 12 + mes - 1 <= fin:
+        if _crear_mes(anio, mes):
+            creadas.append(_nombre(anio, mes))
+        anio, mes = _mes_siguiente(anio, mes)
+
+    if confirmar:
+        db.session.commit()
+    return creadas
+
+
+# ============================================================
+# CONVERSIÓN DE UNA TABLA COMÚN EXISTENTE
+# ============================================================
+def convertir():
+    """
+    Pasa registros_de_asistencia de tabla común a particionada, copiando
+    los datos. Devuelve False si ya estaba particionada.
+    """
+    if es_particionada():
+        return False
+
+    legado = f"{TABLA}_legado"
+    for sentencia in (
+        f"ALTER TABLE {TABLA} RENAME TO {legado}",
+        f"ALTER TABLE {legado} RENAME CONSTRAINT {TABLA}_pkey TO {legado}_pkey",
+        f"ALTER TABLE {legado} DROP CONSTRAINT IF EXISTS uq_registro_estudiante_clase",
+        f"ALTER SEQUENCE {TABLA}_id_seq RENAME TO {legado}_id_seq",
+        # La columna de partición no admite nulos
+        f"UPDATE {legado} r SET fecha_hora = c.fecha + c.hora_inicio "
+        f"FROM clases c WHERE c.id = r.clase_id AND r.fecha_hora IS NULL",
+    ):
+        db.session.execute(text(sentencia))
+
+    RegistrosDeAsistencia.__table__.create(bind=db.session.connection())
+
+    primera = db.session.execute(text(f"SELECT min(fecha_hora) FROM {legado}")).scalar()
+    crear_particiones_futuras(desde=primera.date() if primera else None, confirmar=False)
+
+    # Un registro por (estudiante, clase): se conserva el primero
+    db.session.execute(text(
+        f'INSERT INTO {TABLA} (id, estudiante_id, clase_id, "método_registro", fecha_hora) '
+        f'SELECT DISTINCT ON (estudiante_id, clase_id) id, estudiante_id, clase_id, "método_registro", fecha_hora '
+        f"FROM {legado} ORDER BY estudiante_id, clase_id, fecha_hora, id"
+    ))
+    db.session.execute(text(
+        f"SELECT setval('{TABLA}_id_seq', coalesce((SELECT max(id) FROM {TABLA}), 0) + 1, false)"
+    ))
+    db.session.execute(text(f"DROP TABLE {legado}"))
+    db.session.commit()
+    return True
+
+
+# ============================================================
+# ARCHIVO DE CUATRIMESTRES VIEJOS
+# ============================================================
+def archivar(semestres=2, esquema=None, hoy=None):
+    """
+    Desengancha las particiones anteriores a los últimos `semestres`
+    cuatrimestres (contando el actual), después de congelar los
+    acumulados de sus clases. Con `esquema`, además las mueve a ese
+    esquema. Devuelve los nombres archivados.
+    """
+    from app.utils import acumulados
+
+    corte, _ = periodo_actual(hoy)
+    for _ in range(max(semestres, 1) - 1):
+        corte = periodo_anterior(corte)
+
+    viejas = [p for p in particiones() if date(*_mes_siguiente(p[1], p[2]), 1) <= corte]
+    if not viejas:
+        return []
+    _, anio, mes = viejas[-1]
+    hasta = date(*_mes_siguiente(anio, mes), 1)
+
+    # Las particiones se cortan por fecha_hora y los acumulados por fecha
+    # de la clase: se congela hasta cubrir toda clase con registros en las
+    # particiones que se desenganchan (registros con hora anterior a la clase)
+    R = RegistrosDeAsistencia
+    ultima = db.session.execute(
+        select(func.max(Clase.fecha)).join(R, R.clase_id == Clase.id).where(R.fecha_hora < hasta)
+    ).scalar()
+    if ultima and ultima >= hasta:
+        hasta = ultima + timedelta(days=1)
+    if hasta > corte:
+        raise RuntimeError(
+            f"Hay registros archivables de clases del {ultima}, dentro de los cuatrimestres que se conservan"
+        )
+    acumulados.congelar(hasta)
+
+    archivadas = []
+    if esquema:
+        db.session.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{esquema}"'))
+
+    for nombre, anio, mes in viejas:
+        db.session.execute(text(f"ALTER TABLE {TABLA} DETACH PARTITION {nombre}"))
+        if esquema:
+            db.session.execute(text(f'ALTER TABLE {nombre} SET SCHEMA "{esquema}"'))
+        archivadas.append(nombre)
+
+    db.session.commit()
+    return archivadas
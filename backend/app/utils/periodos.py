@@ -0,0 +1,22 @@
+from datetime import date
+
+
+# ============================================================
+# PERÍODOS LECTIVOS (CUATRIMESTRES ENE-JUL / AGO-DIC)
+# ============================================================
+def periodo_de(fecha):
+    """(desde, hasta) del cuatrimestre que contiene la fecha."""
+    if fecha.month <= 7:
+        return date(fecha.year, 1, 1), date(fecha.year, 7, 31)
+    return date(fecha.year, 8, 1), date(fecha.year, 12, 31)
+
+
+def periodo_actual(hoy=None):
+    return periodo_de(hoy or date.today())
+
+
+def periodo_anterior(desde):
+    """Inicio del cuatrimestre previo al que empieza en `desde`."""
+    if desde.month == 8:
+        return date(desde.year, 1, 1)
+    return date(desde.year - 1, 8, 1)
@@ -0,0 +1,77 @@
+import json
+from sqlalchemy import text
+from app import db
+
+# ============================================================
+# VERIFICACIÓN DE PLANES (EXPLAIN) DE LAS CONSULTAS FRECUENTES
+# ============================================================
+# Cada consulta se planifica con enable_seqscan = off: si aun así el
+# plan recorre la tabla entera, no hay un índice que la sirva. Así el
+# resultado no depende de cuántas filas tenga la base. Que el
+# planificador además los elija por costo lo comprueba
+# tests/test_planes.py, sobre una base poblada y sin tocar la configuración.
+
+CONSULTAS = [
+    ("estudiante por usuario", "estudiantes",
+     "SELECT id FROM estudiantes WHERE usuario_id = 1"),
+    ("docente por usuario", "docentes",
+     "SELECT id FROM docentes WHERE usuario_id = 1"),
+    ("padrón activo de una materia", "estudiantes_materias",
+     "SELECT estudiante_id FROM estudiantes_materias WHERE materia_id = 1 AND estado = 'activo'"),
+    ("materias de un estudiante", "estudiantes_materias",
+     "SELECT materia_id, estado FROM estudiantes_materias WHERE estudiante_id = 1"),
+    ("registros de una clase", "registros_de_asistencia",
+     "SELECT estudiante_id, fecha_hora FROM registros_de_asistencia WHERE clase_id = 1"),
+    ("reporte por fecha (keyset)", "registros_de_asistencia",
+     "SELECT id FROM registros_de_asistencia WHERE fecha_hora >= now() - interval '7 days' "
+     "ORDER BY fecha_hora, id LIMIT 100"),
+    ("clases de una materia por fecha", "clases",
+     "SELECT id FROM clases WHERE materia_id = 1 AND fecha = current_date"),
+    ("clases de un docente", "clases",
+     "SELECT id FROM clases WHERE docente_id = 1 ORDER BY fecha"),
+    ("clases por rango de fechas", "clases",
+     "SELECT id FROM clases WHERE fecha > current_date - 30 AND fecha <= current_date"),
+    ("materias de un docente", "materias",
+     "SELECT id FROM materias WHERE docente_id = 1"),
+    ("materias por nombre (trigram)", "materias",
+     "SELECT id FROM materias WHERE nombre ILIKE '%matem%'"),
+    ("materias de un curso", "materias",
+     "SELECT id FROM materias WHERE curso_id = 1"),
+    ("cursos de una carrera", "cursos",
+     "SELECT id FROM cursos WHERE carrera_id = 1"),
+    ("clases cambiadas desde una marca", "clases",
+     "SELECT id FROM clases WHERE transaccion_id >= pg_snapshot_xmin(pg_current_snapshot())::text::bigint - 1000 "
+     "ORDER BY transaccion_id, id LIMIT 1000"),
+    ("lápidas desde una marca", "eliminaciones",
+     "SELECT tabla, registro_id FROM eliminaciones "
+     "WHERE transaccion_id >= pg_snapshot_xmin(pg_current_snapshot())::text::bigint - 1000"),
+    ("acumulados de una materia", "acumulados_asistencia",
+     "SELECT estudiante_id FROM acumulados_asistencia WHERE materia_id = 1"),
+]
+
+
+def _recorridos_secuenciales(nodo, tabla):
+    """Nombres de las relaciones de `tabla` (o sus particiones) leídas con Seq Scan."""
+    encontrados = []
+    relacion = nodo.get("Relation Name", "")
+    if nodo.get("Node Type") == "Seq Scan" and (relacion == tabla or relacion.startswith(f"{tabla}_")):
+        encontrados.append(relacion)
+    for hijo in nodo.get("Plans", []):
+        encontrados.extend(_recorridos_secuenciales(hijo, tabla))
+    return encontrados
+
+
+def verificar_planes():
+    """Devuelve [(nombre, tabla, ok, relaciones_con_seq_scan)]."""
+    resultados = []
+    try:
+        db.session.execute(text("SET LOCAL enable_seqscan = off"))
+        for nombre, tabla, sql in CONSULTAS:
+            plan = db.session.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            secuenciales = _recorridos_secuenciales(plan[0]["Plan"], tabla)
+            resultados.append((nombre, tabla, not secuenciales, secuenciales))
+    finally:
+        db.session.rollback()
+    return resultados
@@ -0,0 +1,166 @@
+from datetime import datetime
+from sqlalchemy import select, insert, literal, exists
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app import db
+from app.models import RegistrosDeAsistencia, RegistroUnico
+from app.utils.padron import padron
+from app.utils.cola_registros import cola_registros
+from app.utils.tiempo_real import emisor_asistencia
+from app.utils import acumulados
+
+
+# ============================================================
+# INSERT IDEMPOTENTE (UNA SOLA SENTENCIA)
+# ============================================================
+# La tabla está particionada por mes y el índice único (estudiante, clase)
+# es de cada partición: el par se toma antes en registros_unicos (no
+# particionada) y solo se inserta el registro si se pudo tomar. Si otra
+# transacción tiene el mismo par sin confirmar, el INSERT espera a que
+# termine en lugar de duplicar en otro mes.
+
+def insertar_registro(estudiante_id, clase_id, fecha_hora, metodo):
+    """
+    INSERT ... ON CONFLICT DO NOTHING RETURNING, unido al registro previo
+    cuando hay conflicto. Devuelve (nuevo, fecha_hora, metodo); fecha_hora
+    y metodo son None si el registro previo ya está archivado.
+    """
+    R = RegistrosDeAsistencia
+    U = RegistroUnico
+
+    guarda = (
+        pg_insert(U)
+        .values(estudiante_id=estudiante_id, clase_id=clase_id)
+        .on_conflict_do_nothing()
+        .returning(U.clase_id)
+        .cte("guarda")
+    )
+
+    nuevo = (
+        insert(R)
+        .from_select(
+            ["estudiante_id", "clase_id", "fecha_hora", "método_registro"],
+            select(
+                literal(estudiante_id),
+                literal(clase_id),
+                literal(fecha_hora),
+                literal(metodo)
+            ).where(exists(select(guarda.c.clase_id)))
+        )
+        .returning(R.fecha_hora, R.método_registro)
+        .cte("nuevo")
+    )
+
+    previo = select(R.fecha_hora, R.método_registro, literal(False)).where(
+        R.estudiante_id == estudiante_id,
+        R.clase_id == clase_id,
+        ~exists(select(guarda.c.clase_id))
+    )
+
+    fila = db.session.execute(
+        select(nuevo.c.fecha_hora, nuevo.c.método_registro, literal(True)).union_all(previo)
+    ).first()
+
+    if fila is None:
+        # El registro en conflicto lo confirmó otra transacción después de
+        # que esta sentencia tomó su snapshot: se lee una única vez.
+        fila = db.session.execute(
+            select(R.fecha_hora, R.método_registro, literal(False)).where(
+                R.estudiante_id == estudiante_id,
+                R.clase_id == clase_id
+            )
+        ).first()
+
+    if fila is None:
+        return False, None, None
+    return fila[2], fila[0], fila[1]
+
+
+def insertar_registros(filas):
+    """
+    INSERT de varias filas {estudiante_id, clase_id, fecha_hora,
+    método_registro}; las de pares ya registrados (o repetidos en `filas`)
+    se descartan. Devuelve [(estudiante_id, clase_id, fecha_hora)] de las
+    insertadas, sin confirmar.
+    """
+    unicas = {}
+    for f in filas:
+        unicas.setdefault((f["estudiante_id"], f["clase_id"]), f)
+    if not unicas:
+        return []
+
+    U = RegistroUnico
+    tomados = {tuple(t) for t in db.session.execute(
+        pg_insert(U).on_conflict_do_nothing().returning(U.estudiante_id, U.clase_id),
+        [{"estudiante_id": e, "clase_id": c} for e, c in unicas]
+    )}
+    nuevas = [f for par, f in unicas.items() if par in tomados]
+    if nuevas:
+        db.session.execute(insert(RegistrosDeAsistencia), nuevas)
+    return [(f["estudiante_id"], f["clase_id"], f["fecha_hora"]) for f in nuevas]
+
+
+# ============================================================
+# CHECK-IN RÁPIDO POR QR
+# ============================================================
+# Toda la validación (estudiante, clase, inscripción, registro previo)
+# se resuelve contra el padrón en memoria; a la base solo va el INSERT.
+
+def _ya_registrado(clase, fecha_hora, metodo):
+    # Sin fecha_hora si el registro previo quedó en una partición archivada
+    return {
+        "mensaje": "Ya registraste asistencia",
+        "materia": clase["materia_nombre"],
+        "fecha": fecha_hora.strftime("%Y-%m-%d") if fecha_hora else None,
+        "hora": fecha_hora.strftime("%H:%M:%S") if fecha_hora else None,
+        "metodo": metodo
+    }, 200
+
+
+def registrar_asistencia_qr(usuario_id, clase_id, metodo="QR"):
+    """Devuelve (cuerpo, status) con las mismas respuestas del endpoint por clase."""
+    estudiante_id = padron.estudiante_de_usuario(usuario_id)
+    if estudiante_id is None:
+        return {"error": "Estudiante no encontrado"}, 404
+
+    clase = padron.obtener_clase(clase_id)
+    if not clase:
+        return {"error": "Clase no encontrada"}, 404
+
+    if estudiante_id not in padron.inscriptos(clase["materia_id"]):
+        return {"error": "No estás inscripto en esta materia"}, 403
+
+    ahora = datetime.now()
+    previo = padron.reservar_registro(clase_id, estudiante_id, ahora, metodo)
+
+    if previo:
+        return _ya_registrado(clase, *previo)
+
+    try:
+        if cola_registros.activa:
+            # Write-behind: se confirma al quedar encolado
+            cola_registros.encolar(estudiante_id, clase_id, ahora, metodo)
+        else:
+            acumulados.poner_al_dia()
+            nuevo, fecha_hora, metodo_registrado = insertar_registro(estudiante_id, clase_id, ahora, metodo)
+            if nuevo:
+                acumulados.registrar_presencias([(estudiante_id, clase_id, ahora)], {clase_id: clase})
+            db.session.commit()
+
+            if not nuevo:
+                # Lo registró otro proceso: el padrón pasa a reflejar el registro real
+                padron.liberar_registro(clase_id, estudiante_id)
+                padron.reservar_registro(clase_id, estudiante_id, fecha_hora, metodo_registrado)
+                return _ya_registrado(clase, fecha_hora, metodo_registrado)
+    except Exception:
+        db.session.rollback()
+        padron.liberar_registro(clase_id, estudiante_id)
+        raise
+
+    emisor_asistencia.notificar(clase, estudiante_id, ahora)
+
+    return {
+        "mensaje": "Asistencia registrada",
+        "materia": clase["materia_nombre"],
+        "fecha": ahora.strftime("%Y-%m-%d"),
+        "hora": ahora.strftime("%H:%M:%S")
+    }, 201
@@ -0,0 +1,107 @@
+import base64
+import csv
+import io
+import json
+from datetime import datetime
+from sqlalchemy import select, tuple_
+from app import db
+from app.models import RegistrosDeAsistencia, Clase
+
+COLUMNAS = ["id", "estudiante_id", "clase_id", "materia_id", "fecha_hora", "metodo"]
+
+
+# ============================================================
+# CONSULTA PROYECTADA (SIN HIDRATAR OBJETOS DEL ORM)
+# ============================================================
+def consulta_reporte(estudiante_id=None, materia_id=None, desde=None, hasta=None, cursor=None):
+    R = RegistrosDeAsistencia
+
+    consulta = (
+        select(
+            R.id,
+            R.estudiante_id,
+            R.clase_id,
+            Clase.materia_id,
+            R.fecha_hora,
+            R.método_registro
+        )
+        .join(Clase, Clase.id == R.clase_id)
+        .order_by(R.fecha_hora, R.id)
+    )
+
+    if estudiante_id:
+        consulta = consulta.where(R.estudiante_id == estudiante_id)
+    if materia_id:
+        consulta = consulta.where(Clase.materia_id == materia_id)
+    if desde:
+        consulta = consulta.where(R.fecha_hora >= desde)
+    if hasta:
+        consulta = consulta.where(R.fecha_hora <= hasta)
+    if cursor:
+        consulta = consulta.where(tuple_(R.fecha_hora, R.id) > tuple_(*cursor))
+
+    return consulta
+
+
+def fila_a_dict(fila):
+    return {
+        "id": fila[0],
+        "estudiante_id": fila[1],
+        "clase_id": fila[2],
+        "materia_id": fila[3],
+        "fecha_hora": fila[4].isoformat(),
+        "metodo": fila[5]
+    }
+
+
+# ============================================================
+# CURSOR (fecha_hora, id) OPACO
+# ============================================================
+def codificar_cursor(fila):
+    crudo = f"{fila[4].isoformat()}|{fila[0]}".encode()
+    return base64.urlsafe_b64encode(crudo).decode()
+
+
+def decodificar_cursor(cursor):
+    """Devuelve (fecha_hora, id) o lanza ValueError."""
+    try:
+        fecha, id_ = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(fecha), int(id_)
+    except Exception:
+        raise ValueError("Cursor inválido")
+
+
+def pagina(consulta, limite):
+    filas = db.session.execute(consulta.limit(limite + 1)).all()
+    siguiente = codificar_cursor(filas[limite - 1]) if len(filas) > limite else None
+    return [fila_a_dict(f) for f in filas[:limite]], siguiente
+
+
+# ============================================================
+# STREAMING CSV / NDJSON (CURSOR DEL LADO DEL SERVIDOR)
+# ============================================================
+def _filas_en_stream(consulta, tamanio_lote):
+    resultado = db.session.execute(
+        consulta.execution_options(stream_results=True, yield_per=tamanio_lote)
+    )
+    for lote in resultado.partitions():
+        yield lote
+
+
+def stream_csv(consulta, tamanio_lote=2000):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+
+    escritor.writerow(COLUMNAS)
+    for lote in _filas_en_stream(consulta, tamanio_lote):
+        for f in lote:
+            escritor.writerow([f[0], f[1], f[2], f[3], f[4].isoformat(), f[5]])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    yield buffer.getvalue()
+
+
+def stream_ndjson(consulta, tamanio_lote=2000):
+    for lote in _filas_en_stream(consulta, tamanio_lote):
+        yield "".join(json.dumps(fila_a_dict(f), ensure_ascii=False) + "\n" for f in lote)
@@ -0,0 +1,109 @@
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import select, func, and_
+from app import db
+from app.models import EstudiantesMaterias, Estudiante, Usuario, RegistrosDeAsistencia
+
+
+# ============================================================
+# CLASIFICACIÓN PRESENTE / TARDANZA / AUSENTE
+# ============================================================
+def obtener_umbrales():
+    """Devuelve (minutos_presente, minutos_tardanza) desde la configuración."""
+    return (
+        current_app.config.get("ASISTENCIA_MINUTOS_PRESENTE", 5),
+        current_app.config.get("ASISTENCIA_MINUTOS_TARDANZA", 30),
+    )
+
+
+def clasificar(fecha_hora, inicio_clase, umbral_presente, umbral_tardanza):
+    minutos = (fecha_hora - inicio_clase).total_seconds() / 60
+
+    if minutos <= umbral_presente:
+        return "presente"
+    if minutos <= umbral_tardanza:
+        return "tardanza"
+    return "ausente"
+
+
+# ============================================================
+# RESUMEN DE UNA CLASE (UNA SOLA CONSULTA)
+# ============================================================
+def resumen_clase(clase, umbral_presente=None, umbral_tardanza=None):
+    """
+    Calcula presentes / tardanza / ausentes de una clase con una única
+    consulta: inscripciones activas LEFT JOIN registros JOIN usuarios,
+    agrupada por estudiante (se toma el primer registro de cada uno).
+    """
+    por_defecto = obtener_umbrales()
+    if umbral_presente is None:
+        umbral_presente = por_defecto[0]
+    if umbral_tardanza is None:
+        umbral_tardanza = por_defecto[1]
+
+    consulta = (
+        select(
+            EstudiantesMaterias.estudiante_id,
+            Usuario.nombre,
+            Usuario.apellido,
+            func.min(RegistrosDeAsistencia.fecha_hora).label("fecha_hora")
+        )
+        .select_from(EstudiantesMaterias)
+        .join(Estudiante, Estudiante.id == EstudiantesMaterias.estudiante_id)
+        .join(Usuario, Usuario.id == Estudiante.usuario_id)
+        .outerjoin(RegistrosDeAsistencia, and_(
+            RegistrosDeAsistencia.estudiante_id == EstudiantesMaterias.estudiante_id,
+            RegistrosDeAsistencia.clase_id == clase.id
+        ))
+        .where(
+            EstudiantesMaterias.materia_id == clase.materia_id,
+            EstudiantesMaterias.estado == "activo"
+        )
+        .group_by(EstudiantesMaterias.estudiante_id, Usuario.nombre, Usuario.apellido)
+        .order_by(Usuario.apellido, Usuario.nombre)
+    )
+
+    inicio = datetime.combine(clase.fecha, clase.hora_inicio)
+    detalle = {"presente": [], "tardanza": [], "ausente": []}
+
+    for estudiante_id, nombre, apellido, fecha_hora in db.session.execute(consulta):
+        if fecha_hora is None:
+            detalle["ausente"].append({
+                "estudiante_id": estudiante_id,
+                "nombre": nombre,
+                "apellido": apellido,
+                "fecha": clase.fecha.strftime("%Y-%m-%d"),
+                "hora": "--"
+            })
+            continue
+
+        estado = clasificar(fecha_hora, inicio, umbral_presente, umbral_tardanza)
+        detalle[estado].append({
+            "estudiante_id": estudiante_id,
+            "nombre": nombre,
+            "apellido": apellido,
+            "fecha": fecha_hora.strftime("%Y-%m-%d"),
+            "hora": fecha_hora.strftime("%H:%M:%S")
+        })
+
+    return {
+        "clase_id": clase.id,
+        "resumen": {
+            "presentes": len(detalle["presente"]),
+            "tardanza": len(detalle["tardanza"]),
+            "ausentes": len(detalle["ausente"])
+        },
+        "presentes_detalle": detalle["presente"],
+        "tardanza_detalle": detalle["tardanza"],
+        "ausentes_detalle": detalle["ausente"]
+    }
+
+
+def resumen_vacio():
+    return {
+        "clase_id": None,
+        "resumen": {"presentes": 0, "tardanza": 0, "ausentes": 0},
+        "presentes_detalle": [],
+        "tardanza_detalle": [],
+        "ausentes_detalle": []
+    }
@@ -1,7 +1,6 @@
 from flask_jwt_extended import get_jwt_identity, jwt_required
 from functools import wraps
-from flask import jsonify, current_app
-from itsdangerous import URLSafeTimedSerializer
+from flask import jsonify
 
 def rol_requerido(roles):
     # Convertir un solo rol en lista si hace falta
@@ -33,15 +32,13 @@ def estudiante_required(func):
     return rol_requerido("estudiante")(func)
 
 # validacion del token QR
+# (firma cacheada y tokens rotativos: ver app/utils/tokens_qr.py)
 
 def generar_token_asistencia(clase_id):
-    s = URLSafeTimedSerializer(current_app.config['SECRET_KEY'])
-    return s.dumps({"clase_id": clase_id})
-
-def verificar_token_asistencia(token, max_age=300):  # 5 minutos por defecto
-    s = URLSafeTimedSerializer(current_app.config['SECRET_KEY'])
-    try:
-        data = s.loads(token, max_age=max_age)
-        return data  # debería ser {"clase_id": X}
-    except Exception:
-        return None
+    from app.utils.tokens_qr import tokens_qr
+    token, _, _ = tokens_qr.token_actual(clase_id)
+    return token
+
+def verificar_token_asistencia(token, max_age=None):  # por defecto QR_VALIDEZ_SEGUNDOS
+    from app.utils.tokens_qr import tokens_qr
+    return tokens_qr.verificar(token, max_age)  # debería ser {"clase_id": X, "v": ventana}
@@ -0,0 +1,48 @@
+from sqlalchemy import select
+from app import db
+
+# ============================================================
+# SERIALIZACIÓN DE LISTADOS SIN N+1
+# ============================================================
+# Cada listado declara su forma de salida como un dict
+# {clave: columna | (columna, formato) | {forma anidada}}. La forma se
+# traduce en un único SELECT con exactamente esas columnas (los joins los
+# pone el endpoint) y cada fila se arma por posición, sin cargar objetos
+# del ORM ni recorrer relaciones: una consulta por listado, sin importar
+# cuántas filas devuelva.
+
+def fecha_hora(valor):
+    return valor.strftime('%d-%m-%Y %H:%M:%S') if valor is not None else None
+
+
+class Forma:
+    def __init__(self, campos):
+        self.columnas = []
+        self._plantilla = self._compilar(campos)
+
+    def _compilar(self, campos):
+        plantilla = []
+        for clave, valor in campos.items():
+            if isinstance(valor, dict):
+                plantilla.append((clave, None, self._compilar(valor)))
+                continue
+            columna, formato = valor if isinstance(valor, tuple) else (valor, None)
+            plantilla.append((clave, len(self.columnas), formato))
+            self.columnas.append(columna)
+        return plantilla
+
+    def select(self):
+        """SELECT de las columnas de la forma; el endpoint agrega joins y filtros."""
+        return select(*self.columnas)
+
+    def _armar(self, fila, plantilla):
+        resultado = {}
+        for clave, posicion, extra in plantilla:
+            if posicion is None:
+                resultado[clave] = self._armar(fila, extra)
+            else:
+                resultado[clave] = extra(fila[posicion]) if extra else fila[posicion]
+        return resultado
+
+    def listar(self, consulta):
+        return [self._armar(fila, self._plantilla) for fila in db.session.execute(consulta)]
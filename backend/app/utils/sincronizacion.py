@@ -0,0 +1,318 @@
+import base64
+import json
+from datetime import date, time, datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, func, tuple_, delete, and_, or_, cast, Text, BigInteger
+from app import db
+from app.models import (
+    Carrera, Curso, Materia, Clase, EstudiantesMaterias, Docente, Estudiante, Eliminacion, CambioAlcance
+)
+
+# ============================================================
+# SINCRONIZACIÓN INCREMENTAL (DELTAS DESDE UNA MARCA DE AGUA)
+# ============================================================
+# - Cada tabla sincronizada tiene transaccion_id: el xid de la transacción
+#   que escribió la fila (default en el INSERT y un trigger BEFORE UPDATE).
+#   Los DELETE dejan una lápida en eliminaciones con el mismo dato.
+# - La marca es el xmin de la instantánea al empezar a leer: toda
+#   transacción con xid menor ya terminó y la lectura la vio, así que la
+#   próxima vez alcanza con pedir transaccion_id >= marca. Una transacción
+#   que estaba en curso (y confirma después) tiene xid >= marca y entra en
+#   la próxima sincronización, tarde lo que tarde. El cliente puede recibir
+#   filas repetidas, que aplica por id.
+# - La marca lleva también la hora, para saber si es más vieja que la
+#   retención de lápidas (en ese caso se devuelve todo con reiniciar).
+# - Cada tabla se pagina por (transaccion_id, id); el cursor guarda la
+#   posición de las tablas que quedaron incompletas.
+# - Quién ve una materia cambia sin que cambien sus clases o inscripciones
+#   (reasignación de docente, alta o baja de un estudiante): los triggers lo
+#   anotan en cambios_alcance y la primera página reenvía la materia y sus
+#   filas dependientes a quien la ganó y se las quita a quien la perdió.
+# - Las lápidas van solo a quien podía ver la fila borrada.
+
+TABLAS = {
+    "carreras": Carrera,
+    "cursos": Curso,
+    "materias": Materia,
+    "clases": Clase,
+    "estudiantes_materias": EstudiantesMaterias,
+}
+
+
+class ErrorSincronizacion(ValueError):
+    pass
+
+
+def _valor(v):
+    if isinstance(v, datetime):
+        return v.isoformat()
+    if isinstance(v, time):
+        return v.strftime('%H:%M')
+    if isinstance(v, date):
+        return v.isoformat()
+    return v
+
+
+def _materias_visibles(identidad):
+    """SELECT de los ids de materia que ve un docente o un estudiante."""
+    if identidad["rol"] == "docente":
+        return select(Materia.id).where(Materia.docente_id == identidad["docente_id"])
+    return select(EstudiantesMaterias.materia_id).where(
+        EstudiantesMaterias.estudiante_id == identidad["estudiante_id"],
+        EstudiantesMaterias.estado == "activo"
+    )
+
+
+def _alcance(modelo, identidad):
+    """Condiciones que limitan las filas visibles para el usuario."""
+    rol = identidad["rol"]
+    if rol == "administrador" or modelo in (Carrera, Curso):
+        return []
+
+    materias = _materias_visibles(identidad)
+    if modelo is Materia:
+        return [Materia.id.in_(materias)]
+    if rol == "docente":
+        if modelo is Clase:
+            return [Clase.docente_id == identidad["docente_id"]]
+        return [EstudiantesMaterias.materia_id.in_(materias)]
+
+    if modelo is Clase:
+        return [Clase.materia_id.in_(materias)]
+    return [EstudiantesMaterias.estudiante_id == identidad["estudiante_id"]]
+
+
+def completar_identidad(identidad):
+    """Agrega docente_id / estudiante_id si el token no los trae."""
+    identidad = dict(identidad)
+    if identidad["rol"] == "docente" and identidad.get("docente_id") is None:
+        identidad["docente_id"] = db.session.execute(
+            select(Docente.id).where(Docente.usuario_id == identidad["id"])
+        ).scalar()
+    elif identidad["rol"] == "estudiante":
+        identidad["estudiante_id"] = db.session.execute(
+            select(Estudiante.id).where(Estudiante.usuario_id == identidad["id"])
+        ).scalar()
+    return identidad
+
+
+def _leer_marca(marca):
+    """(xid, hora) de una marca "<xid>@<hora ISO>"; None si es del formato anterior."""
+    xid, separador, hora = marca.partition("@")
+    try:
+        if not separador:
+            datetime.fromisoformat(marca)  # marca por hora (versión anterior): se reinicia
+            return None
+        return int(xid), datetime.fromisoformat(hora)
+    except (TypeError, ValueError):
+        raise ErrorSincronizacion(f"Marca inválida: {marca}")
+
+
+def _codificar_cursor(estado):
+    return base64.urlsafe_b64encode(json.dumps(estado).encode()).decode()
+
+
+def _decodificar_cursor(cursor):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ErrorSincronizacion("Cursor inválido")
+
+
+def _cambios(modelo, identidad, desde, posicion, limite):
+    """Filas de la tabla escritas desde la transacción `desde` (o todas), a partir de `posicion`."""
+    tabla = modelo.__table__
+    consulta = select(tabla).where(*_alcance(modelo, identidad))
+    if desde is not None:
+        consulta = consulta.where(tabla.c.transaccion_id >= desde)
+    if posicion is not None:
+        consulta = consulta.where(tuple_(tabla.c.transaccion_id, tabla.c.id) > tuple_(*posicion))
+    consulta = consulta.order_by(tabla.c.transaccion_id, tabla.c.id).limit(limite + 1)
+    filas = [dict(f._mapping) for f in db.session.execute(consulta)]
+
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        ultima = filas[-1]
+        siguiente = [ultima["transaccion_id"], ultima["id"]]
+    return [_fila(f) for f in filas], siguiente
+
+
+def _fila(fila):
+    return {k: _valor(v) for k, v in fila.items()}
+
+
+# ------------------------------------------------------------
+# Cambios de alcance y lápidas (solo en la primera página)
+# ------------------------------------------------------------
+def _materias_tocadas(identidad, desde):
+    """Materias cuyo alcance cambió para el usuario desde la marca."""
+    if identidad["rol"] == "docente":
+        condicion = CambioAlcance.docente_id == identidad["docente_id"]
+    else:
+        condicion = CambioAlcance.estudiante_id == identidad["estudiante_id"]
+    return set(db.session.execute(
+        select(CambioAlcance.materia_id).where(condicion, CambioAlcance.transaccion_id >= desde)
+    ).scalars())
+
+
+def _dependientes(identidad):
+    """La tabla cuyas filas se ven a través de la materia (además de la materia)."""
+    return EstudiantesMaterias if identidad["rol"] == "docente" else Clase
+
+
+def _cambios_de_alcance(identidad, tablas, tocadas, visibles):
+    """
+    Filas a reenviar (materias ganadas) y ids a quitar (materias perdidas),
+    por tabla: la materia y sus clases (estudiante) o sus inscripciones
+    (docente).
+    """
+    ganadas = sorted(tocadas & visibles)
+    perdidas = sorted(tocadas - visibles)
+    reenviar, quitar = {}, {}
+    dependiente = _dependientes(identidad)
+    for modelo, columna in ((Materia, Materia.id), (dependiente, dependiente.materia_id)):
+        nombre = modelo.__tablename__
+        if nombre not in tablas:
+            continue
+        if ganadas:
+            reenviar[nombre] = [
+                _fila(dict(f._mapping)) for f in db.session.execute(
+                    select(modelo.__table__).where(columna.in_(ganadas), *_alcance(modelo, identidad))
+                    .order_by(modelo.id)
+                )
+            ]
+        if perdidas:
+            quitar[nombre] = db.session.execute(
+                select(modelo.id).where(columna.in_(perdidas)).order_by(modelo.id)
+            ).scalars().all()
+    return reenviar, quitar
+
+
+def _eliminados(identidad, tablas, desde, conocidas):
+    """
+    Lápidas desde la marca que le corresponden al usuario: carreras y
+    cursos para todos; materias, clases e inscripciones solo si eran suyas.
+    `conocidas` son las materias que ve o que vio desde la marca.
+    """
+    E = Eliminacion
+    consulta = select(E.tabla, E.registro_id).where(E.tabla.in_(tablas), E.transaccion_id >= desde)
+    rol = identidad["rol"]
+    if rol != "administrador":
+        de_materia = E.materia_id.in_(conocidas)
+        if rol == "docente":
+            docente_id = identidad["docente_id"]
+            propias = or_(
+                and_(E.tabla == "materias", or_(E.docente_id == docente_id, de_materia)),
+                and_(E.tabla == "clases", E.docente_id == docente_id),
+                and_(E.tabla == "estudiantes_materias", de_materia),
+            )
+        else:
+            propias = or_(
+                and_(E.tabla.in_(["materias", "clases"]), de_materia),
+                and_(E.tabla == "estudiantes_materias", E.estudiante_id == identidad["estudiante_id"]),
+            )
+        consulta = consulta.where(or_(E.tabla.in_(["carreras", "cursos"]), propias))
+
+    eliminados = {t: [] for t in tablas}
+    for tabla, registro_id in db.session.execute(consulta.order_by(E.id)):
+        eliminados[tabla].append(registro_id)
+    return eliminados
+
+
+def _novedades(identidad, tablas, desde):
+    """(filas a reenviar, ids eliminados o fuera de alcance) por tabla."""
+    if identidad["rol"] == "administrador":
+        return {}, _eliminados(identidad, tablas, desde, [])
+
+    visibles = set(db.session.execute(_materias_visibles(identidad)).scalars())
+    tocadas = _materias_tocadas(identidad, desde)
+    if identidad["rol"] == "docente":
+        # Las materias propias borradas desde la marca (con sus inscripciones)
+        tocadas |= set(db.session.execute(
+            select(Eliminacion.materia_id).where(
+                Eliminacion.tabla == "materias",
+                Eliminacion.docente_id == identidad["docente_id"],
+                Eliminacion.transaccion_id >= desde
+            )
+        ).scalars())
+
+    reenviar, quitar = _cambios_de_alcance(identidad, tablas, tocadas, visibles)
+    eliminados = _eliminados(identidad, tablas, desde, sorted(visibles | tocadas))
+    for tabla, ids in quitar.items():
+        eliminados[tabla] = sorted(set(eliminados[tabla]) | set(ids))
+    return reenviar, eliminados
+
+
+def _agregar(filas, extra):
+    """Suma a `filas` las de `extra` que no estén (por id)."""
+    ids = {f["id"] for f in filas}
+    return filas + [f for f in extra if f["id"] not in ids]
+
+
+def sincronizar(identidad, marca=None, cursor=None, tablas=None):
+    """
+    Deltas para el cliente. Sin marca (o con una más vieja que la retención
+    de lápidas) devuelve todo con "reiniciar": true. Mientras "completo" sea
+    false el cliente pide la continuación con el cursor; cuando es true
+    guarda "marca" para la próxima vez.
+    """
+    config = current_app.config
+    limite = config["SINCRONIZACION_LIMITE"]
+
+    if cursor:
+        estado = _decodificar_cursor(cursor)
+        if not isinstance(estado, dict) or not isinstance(estado.get("desde"), (int, type(None))):
+            raise ErrorSincronizacion("Cursor inválido")
+    else:
+        tablas = tablas or list(TABLAS)
+        desconocidas = [t for t in tablas if t not in TABLAS]
+        if desconocidas:
+            raise ErrorSincronizacion(f"Tablas desconocidas: {', '.join(desconocidas)}")
+
+        # xmin antes de leer: lo que confirme durante la lectura se repite la próxima vez
+        xmin, ahora = db.session.execute(select(
+            cast(cast(func.pg_snapshot_xmin(func.pg_current_snapshot()), Text), BigInteger),
+            func.localtimestamp()
+        )).one()
+        desde = None
+        anterior = _leer_marca(marca) if marca else None
+        if anterior and anterior[1] >= ahora - timedelta(days=config["SINCRONIZACION_RETENCION_DIAS"]):
+            desde = anterior[0]
+        estado = {
+            "desde": desde,
+            "marca": f"{xmin}@{ahora.isoformat()}",
+            "tablas": {t: None for t in tablas},
+        }
+
+    desde = estado["desde"]
+    respuesta = {"marca": estado["marca"], "reiniciar": desde is None, "cambios": {}}
+    pendientes = {}
+    for nombre, posicion in estado["tablas"].items():
+        if nombre not in TABLAS:
+            raise ErrorSincronizacion("Cursor inválido")
+        filas, siguiente = _cambios(TABLAS[nombre], identidad, desde, posicion, limite)
+        respuesta["cambios"][nombre] = filas
+        if siguiente:
+            pendientes[nombre] = siguiente
+
+    if not cursor and desde is not None:
+        reenviar, respuesta["eliminados"] = _novedades(identidad, list(estado["tablas"]), desde)
+        for nombre, filas in reenviar.items():
+            respuesta["cambios"][nombre] = _agregar(respuesta["cambios"][nombre], filas)
+
+    respuesta["completo"] = not pendientes
+    if pendientes:
+        respuesta["cursor"] = _codificar_cursor({**estado, "tablas": pendientes})
+    return respuesta
+
+
+def purgar_eliminaciones(dias=None):
+    """Borra las lápidas y cambios de alcance más viejos que la retención; devuelve cuántas lápidas."""
+    if dias is None:
+        dias = current_app.config["SINCRONIZACION_RETENCION_DIAS"]
+    limite = func.localtimestamp() - timedelta(days=dias)
+    resultado = db.session.execute(delete(Eliminacion).where(Eliminacion.eliminado_en < limite))
+    db.session.execute(delete(CambioAlcance).where(CambioAlcance.creado_en < limite))
+    db.session.commit()
+    return resultado.rowcount
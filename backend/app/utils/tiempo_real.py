@@ -0,0 +1,153 @@
+import threading
+from datetime import datetime
+from flask import current_app
+from app import socketio
+from app.utils.padron import padron
+from app.utils.resumen import clasificar, obtener_umbrales
+
+
+def sala_clase(clase_id):
+    return f"clase_{clase_id}"
+
+
+# ============================================================
+# EMISOR DE ASISTENCIA EN VIVO (SOCKET.IO)
+# ============================================================
+# Cada clase tiene su sala. Los check-ins se acumulan por clase y un
+# hilo en segundo plano emite un único "asistencia_delta" por sala cada
+# ASISTENCIA_EMISION_MS milisegundos, con los nuevos registros y los
+# contadores actualizados. Solo se siguen las clases con alguien suscripto.
+#
+# Los contadores salen del resumen del primer suscriptor. Mientras ese
+# resumen se arma, los check-ins notificados se guardan y se aplican
+# después. Cada check-in mueve a un estudiante del padrón que el resumen
+# dio como ausente, una sola vez: los que el resumen ya contaba y los que
+# no están inscriptos no cambian los contadores.
+
+class EmisorAsistencia:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._contadores = {}   # clase_id -> {"presentes", "tardanza", "ausentes"}
+        self._ausentes = {}     # clase_id -> set de estudiantes del padrón todavía ausentes
+        self._umbrales = {}     # clase_id -> (minutos_presente, minutos_tardanza)
+        self._suscriptos = {}   # clase_id -> cantidad de sockets en la sala
+        self._pendientes = {}   # clase_id -> [delta, ...]
+        self._en_espera = {}    # clase_id -> [(clase, estudiante_id, fecha_hora), ...] mientras se arma el resumen
+        self._hilo = None
+        self.intervalo = 0.3
+
+    def seguir_clase(self, clase_id, construir_resumen):
+        """
+        Suscribe un socket a la clase y devuelve el resumen completo para
+        enviarle solo a él. Los contadores compartidos se toman del resumen
+        del primer suscriptor y después solo los mueven los check-ins: un
+        socket que entra más tarde no los pisa.
+        """
+        with self._lock:
+            self._suscriptos[clase_id] = self._suscriptos.get(clase_id, 0) + 1
+            espera = None
+            if clase_id not in self._contadores and clase_id not in self._en_espera:
+                espera = self._en_espera[clase_id] = []
+
+        try:
+            resumen = construir_resumen()
+        except Exception:
+            with self._lock:
+                if espera is not None and self._en_espera.get(clase_id) is espera:
+                    del self._en_espera[clase_id]
+            raise
+
+        if espera is not None:
+            with self._lock:
+                if self._en_espera.get(clase_id) is espera:
+                    del self._en_espera[clase_id]
+                    self._contadores[clase_id] = dict(resumen["resumen"])
+                    self._ausentes[clase_id] = {a["estudiante_id"] for a in resumen["ausentes_detalle"]}
+                    self._umbrales[clase_id] = obtener_umbrales()
+            for clase, estudiante_id, fecha_hora in espera:
+                self._aplicar(clase, estudiante_id, fecha_hora)
+        self._iniciar()
+        return resumen
+
+    def dejar_clase(self, clase_id):
+        with self._lock:
+            restantes = self._suscriptos.get(clase_id, 0) - 1
+            if restantes > 0:
+                self._suscriptos[clase_id] = restantes
+                return
+            self._suscriptos.pop(clase_id, None)
+            self._contadores.pop(clase_id, None)
+            self._ausentes.pop(clase_id, None)
+            self._umbrales.pop(clase_id, None)
+            self._pendientes.pop(clase_id, None)
+            self._en_espera.pop(clase_id, None)
+
+    def notificar(self, clase, estudiante_id, fecha_hora):
+        """Registra un check-in nuevo; se emite en el próximo lote."""
+        with self._lock:
+            espera = self._en_espera.get(clase["id"])
+            if espera is not None:
+                espera.append((clase, estudiante_id, fecha_hora))
+                return
+        self._aplicar(clase, estudiante_id, fecha_hora)
+
+    def _aplicar(self, clase, estudiante_id, fecha_hora):
+        clase_id = clase["id"]
+        with self._lock:
+            ausentes = self._ausentes.get(clase_id)
+            if ausentes is None or estudiante_id not in ausentes:
+                return
+            umbral_presente, umbral_tardanza = self._umbrales[clase_id]
+
+        inicio = datetime.combine(clase["fecha"], clase["hora_inicio"])
+        estado = clasificar(fecha_hora, inicio, umbral_presente, umbral_tardanza)
+        nombre, apellido = padron.nombre_de(estudiante_id)
+
+        with self._lock:
+            contadores = self._contadores.get(clase_id)
+            ausentes = self._ausentes.get(clase_id)
+            if contadores is None or estudiante_id not in ausentes:
+                return
+            ausentes.discard(estudiante_id)
+            if estado != "ausente":  # llegó pasada la tolerancia: sigue contando como ausente
+                contadores["presentes" if estado == "presente" else "tardanza"] += 1
+                contadores["ausentes"] -= 1
+
+            self._pendientes.setdefault(clase_id, []).append({
+                "estudiante_id": estudiante_id,
+                "nombre": nombre,
+                "apellido": apellido,
+                "fecha": fecha_hora.strftime("%Y-%m-%d"),
+                "hora": fecha_hora.strftime("%H:%M:%S"),
+                "estado": estado
+            })
+
+    def _iniciar(self):
+        with self._lock:
+            if self._hilo is not None:
+                return
+            self.intervalo = current_app.config.get("ASISTENCIA_EMISION_MS", 300) / 1000
+            self._hilo = socketio.start_background_task(self._trabajar)
+
+    def _trabajar(self):
+        while True:
+            socketio.sleep(self.intervalo)
+            self.emitir_pendientes()
+
+    def emitir_pendientes(self):
+        with self._lock:
+            lotes = [
+                (clase_id, deltas, dict(self._contadores.get(clase_id, {})))
+                for clase_id, deltas in self._pendientes.items()
+            ]
+            self._pendientes = {}
+
+        for clase_id, deltas, contadores in lotes:
+            socketio.emit("asistencia_delta", {
+                "clase_id": clase_id,
+                "registros": deltas,
+                "resumen": contadores
+            }, to=sala_clase(clase_id))
+
+
+emisor_asistencia = EmisorAsistencia()
@@ -0,0 +1,114 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from flask import current_app
+from itsdangerous import URLSafeTimedSerializer, BadData
+
+
+@lru_cache(maxsize=4)
+def _serializador(secret_key):
+    return URLSafeTimedSerializer(secret_key)
+
+
+# ============================================================
+# SERVICIO DE TOKENS QR ROTATIVOS
+# ============================================================
+# - Un token por clase y ventana de QR_ROTACION_SEGUNDOS; la pantalla
+#   del docente lo pide sin recalcular mientras la ventana no cambie.
+# - Validez corta (QR_VALIDEZ_SEGUNDOS): una captura de pantalla deja
+#   de servir en segundos.
+# - LRU acotado de tokens ya verificados: la firma se chequea una vez
+#   por token y no una vez por escaneo.
+# - Conjunto de reutilizaciones (token, usuario): si un estudiante ya
+#   registró asistencia con un token y lo reenvía, se le contesta desde
+#   memoria sin verificar ni consultar el padrón.
+
+class ServicioTokensQR:
+    def __init__(self, max_verificados=4096, max_usados=65536):
+        self.max_verificados = max_verificados
+        self.max_usados = max_usados
+        self._lock = threading.Lock()
+        self._actuales = {}                # clase_id -> (ventana, token)
+        self._verificados = OrderedDict()  # token -> (datos, expira_en)
+        self._usados = OrderedDict()       # (token, usuario_id) -> (respuesta, expira_en)
+
+    def _config(self):
+        periodo = current_app.config.get("QR_ROTACION_SEGUNDOS", 15)
+        validez = current_app.config.get("QR_VALIDEZ_SEGUNDOS", 2 * periodo)
+        return _serializador(current_app.config["SECRET_KEY"]), periodo, validez
+
+    # --------------------------------------------------------
+    # Emisión
+    # --------------------------------------------------------
+    def token_actual(self, clase_id):
+        """Devuelve (token, segundos_hasta_rotar, periodo)."""
+        serializador, periodo, _ = self._config()
+        ahora = time.time()
+        ventana = int(ahora // periodo)
+
+        with self._lock:
+            actual = self._actuales.get(clase_id)
+        if not actual or actual[0] != ventana:
+            actual = (ventana, serializador.dumps({"clase_id": clase_id, "v": ventana}))
+            with self._lock:
+                self._actuales[clase_id] = actual
+
+        restante = round((ventana + 1) * periodo - ahora, 3)
+        return actual[1], restante, periodo
+
+    # --------------------------------------------------------
+    # Verificación
+    # --------------------------------------------------------
+    def verificar(self, token, max_age=None):
+        if not token or not isinstance(token, str):
+            return None
+
+        ahora = time.time()
+        with self._lock:
+            cacheado = self._verificados.get(token)
+            if cacheado:
+                if cacheado[1] > ahora:
+                    self._verificados.move_to_end(token)
+                    return cacheado[0]
+                del self._verificados[token]
+                return None
+
+        serializador, _, validez = self._config()
+        max_age = max_age or validez
+        try:
+            datos, firmado = serializador.loads(token, max_age=max_age, return_timestamp=True)
+        except BadData:
+            return None
+
+        with self._lock:
+            self._verificados[token] = (datos, firmado.timestamp() + max_age)
+            while len(self._verificados) > self.max_verificados:
+                self._verificados.popitem(last=False)
+        return datos
+
+    # --------------------------------------------------------
+    # Reutilizaciones (token, usuario)
+    # --------------------------------------------------------
+    def respuesta_previa(self, token, usuario_id):
+        """Respuesta "Ya registraste" si el usuario ya usó este token vigente."""
+        with self._lock:
+            previa = self._usados.get((token, usuario_id))
+        if previa and previa[1] > time.time():
+            return previa[0]
+        return None
+
+    def marcar_usado(self, token, usuario_id, respuesta):
+        ahora = time.time()
+        with self._lock:
+            verificado = self._verificados.get(token)
+            if not verificado:
+                return
+            self._usados[(token, usuario_id)] = (respuesta, verificado[1])
+            while self._usados:
+                clave, (_, vence) = next(iter(self._usados.items()))
+                if vence > ahora and len(self._usados) <= self.max_usados:
+                    break
+                del self._usados[clave]
+
+tokens_qr = ServicioTokensQR()
@@ -0,0 +1,132 @@
+"""esquema inicial
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 12:00:00
+
+Esquema tal como lo creaba db.create_all() antes de las migraciones.
+Las bases ya existentes se adoptan: cada tabla se crea solo si falta.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _crear(nombre, *columnas, **kwargs):
+    if sa.inspect(op.get_bind()).has_table(nombre):
+        return
+    op.create_table(nombre, *columnas, **kwargs)
+
+
+def upgrade():
+    _crear(
+        'usuarios',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('nombre', sa.String(length=100)),
+        sa.Column('apellido', sa.String(length=100)),
+        sa.Column('correo', sa.String(length=100), unique=True),
+        sa.Column('contraseña', sa.Text()),
+        sa.Column('rol', sa.String(length=20)),
+        sa.Column('activo', sa.Boolean()),
+        sa.Column('dni', sa.String(length=20), unique=True, nullable=True),
+        sa.Column('debe_cambiar_password', sa.Boolean()),
+    )
+    _crear(
+        'carreras',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('nombre', sa.String(length=100), nullable=False),
+        sa.Column('descripcion', sa.String(length=255)),
+        sa.Column('activo', sa.Boolean()),
+    )
+    _crear(
+        'docentes',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('usuario_id', sa.Integer(), sa.ForeignKey('usuarios.id'), nullable=False),
+    )
+    _crear(
+        'cursos',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('nombre', sa.String(length=100)),
+        sa.Column('nivel', sa.String(length=50)),
+        sa.Column('carrera_id', sa.Integer(), sa.ForeignKey('carreras.id'), nullable=False),
+    )
+    _crear(
+        'estudiantes',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('usuario_id', sa.Integer(), sa.ForeignKey('usuarios.id')),
+        sa.Column('curso_id', sa.Integer(), sa.ForeignKey('cursos.id')),
+        sa.Column('qr_codigo', sa.Text(), unique=True),
+    )
+    _crear(
+        'materias',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('nombre', sa.String(length=100), nullable=False),
+        sa.Column('curso_id', sa.Integer(), sa.ForeignKey('cursos.id'), nullable=False),
+        sa.Column('docente_id', sa.Integer(), sa.ForeignKey('docentes.id'), nullable=True),
+    )
+    _crear(
+        'clases',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('materia_id', sa.Integer(), sa.ForeignKey('materias.id'), nullable=False),
+        sa.Column('docente_id', sa.Integer(), sa.ForeignKey('docentes.id'), nullable=False),
+        sa.Column('fecha', sa.Date(), nullable=False),
+        sa.Column('hora_inicio', sa.Time(), nullable=False),
+        sa.Column('hora_fin', sa.Time(), nullable=False),
+    )
+    _crear(
+        'estudiantes_materias',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('estudiante_id', sa.Integer(), sa.ForeignKey('estudiantes.id'), nullable=False),
+        sa.Column('materia_id', sa.Integer(), sa.ForeignKey('materias.id'), nullable=False),
+        sa.Column('fecha_alta', sa.DateTime()),
+        sa.Column('fecha_baja', sa.DateTime(), nullable=True),
+        sa.Column('estado', sa.String(length=30)),
+        sa.Column('docente_id', sa.Integer(), sa.ForeignKey('docentes.id'), nullable=True),
+    )
+    _crear(
+        'registros_de_asistencia',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('estudiante_id', sa.Integer(), sa.ForeignKey('estudiantes.id'), nullable=False),
+        sa.Column('clase_id', sa.Integer(), sa.ForeignKey('clases.id'), nullable=False),
+        sa.Column('método_registro', sa.String(length=20), nullable=False),
+        sa.Column('fecha_hora', sa.DateTime()),
+        sa.UniqueConstraint('estudiante_id', 'clase_id', name='uq_registro_estudiante_clase'),
+    )
+    _crear(
+        'acumulados_asistencia',
+        sa.Column('estudiante_id', sa.Integer(), sa.ForeignKey('estudiantes.id'), primary_key=True),
+        sa.Column('materia_id', sa.Integer(), sa.ForeignKey('materias.id'), primary_key=True),
+        sa.Column('clases', sa.Integer(), nullable=False),
+        sa.Column('presentes', sa.Integer(), nullable=False),
+        sa.Column('tardanzas', sa.Integer(), nullable=False),
+        sa.Column('ausentes', sa.Integer(), nullable=False),
+    )
+    _crear(
+        'estado_acumulados',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('acumulado_hasta', sa.Date(), nullable=False),
+    )
+
+
+def downgrade():
+    for nombre in (
+        'estado_acumulados',
+        'acumulados_asistencia',
+        'registros_de_asistencia',
+        'estudiantes_materias',
+        'clases',
+        'materias',
+        'estudiantes',
+        'cursos',
+        'docentes',
+        'carreras',
+        'usuarios',
+    ):
+        op.drop_table(nombre)
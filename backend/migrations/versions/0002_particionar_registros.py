@@ -0,0 +1,108 @@
+"""registros_de_asistencia particionada por mes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 12:10:00
+
+Convierte la tabla común en PARTITION BY RANGE (fecha_hora): crea una
+partición por mes desde el registro más antiguo hasta el mes actual
+(más la DEFAULT) y copia los datos. Las particiones futuras las crea
+"flask registros crear-particiones" al iniciar.
+
+"""
+from datetime import date
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+TABLA = 'registros_de_asistencia'
+LEGADO = f'{TABLA}_legado'
+
+
+def _particionada(conexion):
+    return conexion.execute(sa.text(
+        "SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(:tabla)"
+    ), {"tabla": TABLA}).scalar() or False
+
+
+def _meses(desde, hasta):
+    anio, mes = desde.year, desde.month
+    while (anio, mes) <= (hasta.year, hasta.month):
+        siguiente = (anio + 1, 1) if mes == 12 else (anio, mes + 1)
+        yield date(anio, mes, 1), date(*siguiente, 1)
+        anio, mes = siguiente
+
+
+def upgrade():
+    conexion = op.get_bind()
+    if _particionada(conexion):
+        return
+
+    op.rename_table(TABLA, LEGADO)
+    op.execute(f"ALTER TABLE {LEGADO} RENAME CONSTRAINT {TABLA}_pkey TO {LEGADO}_pkey")
+    op.execute(f"ALTER TABLE {LEGADO} DROP CONSTRAINT IF EXISTS uq_registro_estudiante_clase")
+    op.execute(f"ALTER SEQUENCE {TABLA}_id_seq RENAME TO {LEGADO}_id_seq")
+    op.execute(
+        f"UPDATE {LEGADO} r SET fecha_hora = c.fecha + c.hora_inicio "
+        f"FROM clases c WHERE c.id = r.clase_id AND r.fecha_hora IS NULL"
+    )
+
+    op.create_table(
+        TABLA,
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('estudiante_id', sa.Integer(), sa.ForeignKey('estudiantes.id'), nullable=False),
+        sa.Column('clase_id', sa.Integer(), sa.ForeignKey('clases.id'), nullable=False),
+        sa.Column('método_registro', sa.String(length=20), nullable=False),
+        sa.Column('fecha_hora', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id', 'fecha_hora'),
+        postgresql_partition_by='RANGE (fecha_hora)'
+    )
+
+    op.execute(f"CREATE TABLE {TABLA}_default PARTITION OF {TABLA} DEFAULT")
+    op.execute(f"CREATE UNIQUE INDEX uq_{TABLA}_default ON {TABLA}_default (estudiante_id, clase_id)")
+
+    primera = conexion.execute(sa.text(f"SELECT min(fecha_hora) FROM {LEGADO}")).scalar()
+    for desde, hasta in _meses(primera.date() if primera else date.today(), date.today()):
+        nombre = f"{TABLA}_{desde.year}_{desde.month:02d}"
+        op.execute(
+            f"CREATE TABLE {nombre} PARTITION OF {TABLA} "
+            f"FOR VALUES FROM ('{desde.isoformat()}') TO ('{hasta.isoformat()}')"
+        )
+        op.execute(f"CREATE UNIQUE INDEX uq_{nombre} ON {nombre} (estudiante_id, clase_id)")
+
+    # Un registro por (estudiante, clase): se conserva el primero
+    op.execute(
+        f'INSERT INTO {TABLA} (id, estudiante_id, clase_id, "método_registro", fecha_hora) '
+        f'SELECT DISTINCT ON (estudiante_id, clase_id) id, estudiante_id, clase_id, "método_registro", fecha_hora '
+        f"FROM {LEGADO} ORDER BY estudiante_id, clase_id, fecha_hora, id"
+    )
+    op.execute(f"SELECT setval('{TABLA}_id_seq', coalesce((SELECT max(id) FROM {TABLA}), 0) + 1, false)")
+    op.drop_table(LEGADO)
+
+
+def downgrade():
+    op.rename_table(TABLA, f'{TABLA}_particionada')
+    op.execute(f"ALTER TABLE {TABLA}_particionada RENAME CONSTRAINT {TABLA}_pkey TO {TABLA}_particionada_pkey")
+    op.execute(f"ALTER SEQUENCE {TABLA}_id_seq RENAME TO {TABLA}_particionada_id_seq")
+
+    op.create_table(
+        TABLA,
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('estudiante_id', sa.Integer(), sa.ForeignKey('estudiantes.id'), nullable=False),
+        sa.Column('clase_id', sa.Integer(), sa.ForeignKey('clases.id'), nullable=False),
+        sa.Column('método_registro', sa.String(length=20), nullable=False),
+        sa.Column('fecha_hora', sa.DateTime()),
+        sa.UniqueConstraint('estudiante_id', 'clase_id', name='uq_registro_estudiante_clase'),
+    )
+    op.execute(
+        f'INSERT INTO {TABLA} (id, estudiante_id, clase_id, "método_registro", fecha_hora) '
+        f'SELECT id, estudiante_id, clase_id, "método_registro", fecha_hora FROM {TABLA}_particionada'
+    )
+    op.execute(f"SELECT setval('{TABLA}_id_seq', coalesce((SELECT max(id) FROM {TABLA}), 0) + 1, false)")
+    op.execute(f"DROP TABLE {TABLA}_particionada CASCADE")
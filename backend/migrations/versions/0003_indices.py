@@ -0,0 +1,54 @@
+"""índices para las búsquedas frecuentes
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 12:20:00
+
+Cada índice corresponde a un filtro que usan las rutas en casi todas las
+peticiones ("flask indices verificar" comprueba los planes con EXPLAIN):
+
+- usuario -> estudiante / docente (login, check-in, "mis materias")
+- inscripciones activas de una materia (padrón, resumen, acumulados)
+- materias de un estudiante (porcentajes, inscripción)
+- registros de una clase, y reporte ordenado por (fecha_hora, id)
+- clases de una materia o un docente por fecha, y por rango de fechas
+- materias de un docente / de un curso, cursos de una carrera
+- acumulados de una materia
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+INDICES = [
+    ('ix_estudiantes_usuario_id', 'estudiantes', ['usuario_id'], {}),
+    ('ix_docentes_usuario_id', 'docentes', ['usuario_id'], {}),
+    ('ix_estudiantes_materias_activas', 'estudiantes_materias', ['materia_id', 'estudiante_id'],
+     {'postgresql_where': sa.text("estado = 'activo'")}),
+    ('ix_estudiantes_materias_estudiante', 'estudiantes_materias', ['estudiante_id', 'materia_id'], {}),
+    ('ix_registros_de_asistencia_clase_id', 'registros_de_asistencia', ['clase_id'], {}),
+    ('ix_registros_de_asistencia_fecha_hora_id', 'registros_de_asistencia', ['fecha_hora', 'id'], {}),
+    ('ix_clases_materia_fecha', 'clases', ['materia_id', 'fecha'], {}),
+    ('ix_clases_docente_fecha', 'clases', ['docente_id', 'fecha'], {}),
+    ('ix_clases_fecha', 'clases', ['fecha'], {}),
+    ('ix_materias_docente_id', 'materias', ['docente_id'], {}),
+    ('ix_materias_curso_id', 'materias', ['curso_id'], {}),
+    ('ix_cursos_carrera_id', 'cursos', ['carrera_id'], {}),
+    ('ix_acumulados_asistencia_materia_id', 'acumulados_asistencia', ['materia_id'], {}),
+]
+
+
+def upgrade():
+    for nombre, tabla, columnas, opciones in INDICES:
+        op.create_index(nombre, tabla, columnas, if_not_exists=True, **opciones)
+
+
+def downgrade():
+    for nombre, tabla, _, _ in reversed(INDICES):
+        op.drop_index(nombre, table_name=tabla, if_exists=True)
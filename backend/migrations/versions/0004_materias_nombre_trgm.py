@@ -0,0 +1,33 @@
+"""índice trigram para buscar materias por nombre
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 12:40:00
+
+El listado de clases filtra con Materia.nombre ILIKE '%texto%', que un
+B-tree no puede resolver. Con pg_trgm y un índice GIN (gin_trgm_ops) la
+búsqueda por subcadena usa el índice.
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        'ix_materias_nombre_trgm', 'materias', ['nombre'],
+        postgresql_using='gin', postgresql_ops={'nombre': 'gin_trgm_ops'},
+        if_not_exists=True
+    )
+
+
+def downgrade():
+    # La extensión se deja instalada: puede usarla otro esquema
+    op.drop_index('ix_materias_nombre_trgm', table_name='materias', if_exists=True)
@@ -0,0 +1,73 @@
+"""sincronización incremental: actualizado_en y lápidas
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 13:00:00
+
+Agrega actualizado_en a carreras, cursos, materias, clases y
+estudiantes_materias (un trigger lo actualiza en cada UPDATE) y la tabla
+eliminaciones, que un trigger por sentencia llena en cada DELETE. Las
+filas existentes quedan con la hora de la migración.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+TABLAS = ['carreras', 'cursos', 'materias', 'clases', 'estudiantes_materias']
+
+
+def upgrade():
+    op.create_table(
+        'eliminaciones',
+        sa.Column('id', sa.BigInteger(), primary_key=True),
+        sa.Column('tabla', sa.String(length=50), nullable=False),
+        sa.Column('registro_id', sa.Integer(), nullable=False),
+        sa.Column('eliminado_en', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index('ix_eliminaciones_eliminado_en', 'eliminaciones', ['eliminado_en'])
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION marcar_actualizado() RETURNS trigger AS $$
+        BEGIN
+            NEW.actualizado_en := now();
+            RETURN NEW;
+        END $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION registrar_eliminaciones() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO eliminaciones (tabla, registro_id, eliminado_en)
+            SELECT TG_TABLE_NAME, id, now() FROM borradas;
+            RETURN NULL;
+        END $$ LANGUAGE plpgsql
+    """)
+
+    for tabla in TABLAS:
+        op.add_column(tabla, sa.Column('actualizado_en', sa.DateTime(), nullable=False, server_default=sa.func.now()))
+        op.create_index(f'ix_{tabla}_actualizado', tabla, ['actualizado_en', 'id'])
+        op.execute(
+            f"CREATE TRIGGER trg_{tabla}_actualizado BEFORE UPDATE ON {tabla} "
+            f"FOR EACH ROW WHEN (OLD.* IS DISTINCT FROM NEW.*) EXECUTE FUNCTION marcar_actualizado()"
+        )
+        op.execute(
+            f"CREATE TRIGGER trg_{tabla}_eliminado AFTER DELETE ON {tabla} "
+            f"REFERENCING OLD TABLE AS borradas FOR EACH STATEMENT EXECUTE FUNCTION registrar_eliminaciones()"
+        )
+
+
+def downgrade():
+    for tabla in reversed(TABLAS):
+        op.execute(f"DROP TRIGGER IF EXISTS trg_{tabla}_eliminado ON {tabla}")
+        op.execute(f"DROP TRIGGER IF EXISTS trg_{tabla}_actualizado ON {tabla}")
+        op.drop_index(f'ix_{tabla}_actualizado', table_name=tabla)
+        op.drop_column(tabla, 'actualizado_en')
+    op.execute("DROP FUNCTION IF EXISTS registrar_eliminaciones()")
+    op.execute("DROP FUNCTION IF EXISTS marcar_actualizado()")
+    op.drop_table('eliminaciones')
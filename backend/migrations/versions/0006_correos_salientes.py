@@ -0,0 +1,45 @@
+"""bandeja de salida de correos
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 13:30:00
+
+send_email deja de enviar dentro de la petición: guarda el correo en
+correos_salientes y un hilo en segundo plano lo envía (ver
+app/utils/envio_correos.py).
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'correos_salientes',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('destinatario', sa.String(length=100), nullable=False),
+        sa.Column('asunto', sa.String(length=200), nullable=False),
+        sa.Column('cuerpo', sa.Text(), nullable=False),
+        sa.Column('estado', sa.String(length=20), nullable=False),
+        sa.Column('intentos', sa.Integer(), nullable=False),
+        sa.Column('proximo_intento', sa.DateTime(), nullable=False),
+        sa.Column('ultimo_error', sa.Text()),
+        sa.Column('creado_en', sa.DateTime(), nullable=False),
+        sa.Column('enviado_en', sa.DateTime()),
+    )
+    op.create_index(
+        'ix_correos_salientes_pendientes', 'correos_salientes', ['proximo_intento'],
+        postgresql_where=sa.text("estado = 'pendiente'")
+    )
+
+
+def downgrade():
+    op.drop_index('ix_correos_salientes_pendientes', table_name='correos_salientes')
+    op.drop_table('correos_salientes')
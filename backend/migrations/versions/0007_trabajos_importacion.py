@@ -0,0 +1,43 @@
+"""importaciones en segundo plano
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 14:00:00
+
+Las importaciones de usuarios y materias pasan a ser trabajos que se
+procesan por bloques fuera de la petición (ver app/utils/importaciones.py).
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'trabajos_importacion',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('tipo', sa.String(length=20), nullable=False),
+        sa.Column('estado', sa.String(length=20), nullable=False),
+        sa.Column('archivo', sa.String(length=255), nullable=False),
+        sa.Column('nombre_archivo', sa.String(length=255)),
+        sa.Column('creado_por', sa.Integer(), sa.ForeignKey('usuarios.id')),
+        sa.Column('filas_procesadas', sa.Integer(), nullable=False),
+        sa.Column('filas_importadas', sa.Integer(), nullable=False),
+        sa.Column('total_errores', sa.Integer(), nullable=False),
+        sa.Column('errores', sa.JSON(), nullable=False),
+        sa.Column('mensaje_error', sa.Text()),
+        sa.Column('creado_en', sa.DateTime(), nullable=False),
+        sa.Column('iniciado_en', sa.DateTime()),
+        sa.Column('terminado_en', sa.DateTime()),
+    )
+
+
+def downgrade():
+    op.drop_table('trabajos_importacion')
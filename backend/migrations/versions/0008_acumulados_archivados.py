@@ -0,0 +1,39 @@
+"""acumulados congelados de los registros archivados
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 17:00:00
+
+Al desenganchar particiones viejas de registros_de_asistencia, los
+contadores de esas clases se guardan en acumulados_archivados para que
+recalcular o reconstruir no conviertan las presencias archivadas en
+inasistencias.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'acumulados_archivados',
+        sa.Column('estudiante_id', sa.Integer(), sa.ForeignKey('estudiantes.id'), primary_key=True),
+        sa.Column('materia_id', sa.Integer(), sa.ForeignKey('materias.id'), primary_key=True),
+        sa.Column('clases', sa.Integer(), nullable=False),
+        sa.Column('presentes', sa.Integer(), nullable=False),
+        sa.Column('tardanzas', sa.Integer(), nullable=False),
+        sa.Column('ausentes', sa.Integer(), nullable=False),
+    )
+    op.add_column('estado_acumulados', sa.Column('archivado_hasta', sa.Date()))
+
+
+def downgrade():
+    op.drop_column('estado_acumulados', 'archivado_hasta')
+    op.drop_table('acumulados_archivados')
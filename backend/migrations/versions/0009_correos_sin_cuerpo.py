@@ -0,0 +1,30 @@
+"""los correos enviados no guardan el cuerpo
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 17:30:00
+
+correos_salientes.cuerpo pasa a admitir nulos: se borra cuando el correo
+se envía o queda 'fallido' (los de credenciales llevan la contraseña
+temporal). También se vacían los que ya estaban en esos estados.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.alter_column('correos_salientes', 'cuerpo', existing_type=sa.Text(), nullable=True)
+    op.execute("UPDATE correos_salientes SET cuerpo = NULL WHERE estado IN ('enviado', 'fallido')")
+
+
+def downgrade():
+    op.execute("UPDATE correos_salientes SET cuerpo = '' WHERE cuerpo IS NULL")
+    op.alter_column('correos_salientes', 'cuerpo', existing_type=sa.Text(), nullable=False)
@@ -0,0 +1,153 @@
+"""sincronización por transacción y cambios de alcance
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 18:30:00
+
+La marca de la sincronización pasa de la hora a la transacción:
+transaccion_id (el xid de quien escribió la fila) en las tablas
+sincronizadas y en eliminaciones, con índice (transaccion_id, id) en lugar
+del de actualizado_en. Las lápidas guardan materia, docente y estudiante
+de la fila borrada, y la tabla cambios_alcance registra las
+reasignaciones de docente y las altas, bajas y reincorporaciones de
+inscripciones. Las filas existentes quedan con el xid de la migración.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+TABLAS = ['carreras', 'cursos', 'materias', 'clases', 'estudiantes_materias']
+XID_ACTUAL = sa.text("pg_current_xact_id()::text::bigint")
+
+
+def upgrade():
+    for tabla in TABLAS:
+        op.add_column(tabla, sa.Column('transaccion_id', sa.BigInteger(), nullable=False, server_default=XID_ACTUAL))
+        op.drop_index(f'ix_{tabla}_actualizado', table_name=tabla)
+        op.create_index(f'ix_{tabla}_transaccion', tabla, ['transaccion_id', 'id'])
+
+    op.add_column('eliminaciones', sa.Column('transaccion_id', sa.BigInteger(), nullable=False, server_default=XID_ACTUAL))
+    op.add_column('eliminaciones', sa.Column('materia_id', sa.Integer(), nullable=True))
+    op.add_column('eliminaciones', sa.Column('docente_id', sa.Integer(), nullable=True))
+    op.add_column('eliminaciones', sa.Column('estudiante_id', sa.Integer(), nullable=True))
+    op.create_index('ix_eliminaciones_transaccion_id', 'eliminaciones', ['transaccion_id'])
+
+    op.create_table(
+        'cambios_alcance',
+        sa.Column('id', sa.BigInteger(), primary_key=True),
+        sa.Column('transaccion_id', sa.BigInteger(), nullable=False, server_default=XID_ACTUAL),
+        sa.Column('materia_id', sa.Integer(), nullable=False),
+        sa.Column('docente_id', sa.Integer(), nullable=True),
+        sa.Column('estudiante_id', sa.Integer(), nullable=True),
+        sa.Column('creado_en', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index('ix_cambios_alcance_transaccion_id', 'cambios_alcance', ['transaccion_id'])
+    op.create_index('ix_cambios_alcance_creado_en', 'cambios_alcance', ['creado_en'])
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION marcar_actualizado() RETURNS trigger AS $$
+        BEGIN
+            NEW.actualizado_en := now();
+            NEW.transaccion_id := pg_current_xact_id()::text::bigint;
+            RETURN NEW;
+        END $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION registrar_eliminaciones() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO eliminaciones (tabla, registro_id, eliminado_en, materia_id, docente_id, estudiante_id)
+            SELECT TG_TABLE_NAME, id, now(),
+                   CASE WHEN TG_TABLE_NAME = 'materias' THEN id ELSE (to_jsonb(b) ->> 'materia_id')::int END,
+                   CASE WHEN TG_TABLE_NAME = 'estudiantes_materias' THEN NULL ELSE (to_jsonb(b) ->> 'docente_id')::int END,
+                   (to_jsonb(b) ->> 'estudiante_id')::int
+            FROM borradas b;
+            RETURN NULL;
+        END $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION registrar_alcance_materias() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO cambios_alcance (materia_id, docente_id)
+            SELECT n.id, x.docente_id
+            FROM nuevas n JOIN viejas v ON v.id = n.id
+            CROSS JOIN LATERAL (VALUES (v.docente_id), (n.docente_id)) x(docente_id)
+            WHERE v.docente_id IS DISTINCT FROM n.docente_id AND x.docente_id IS NOT NULL;
+            RETURN NULL;
+        END $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION registrar_alcance_inscripciones() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE' THEN
+                INSERT INTO cambios_alcance (materia_id, estudiante_id)
+                SELECT DISTINCT x.materia_id, x.estudiante_id
+                FROM nuevas n JOIN viejas v ON v.id = n.id
+                CROSS JOIN LATERAL (VALUES (v.materia_id, v.estudiante_id), (n.materia_id, n.estudiante_id))
+                    x(materia_id, estudiante_id)
+                WHERE (v.estado, v.materia_id, v.estudiante_id) IS DISTINCT FROM (n.estado, n.materia_id, n.estudiante_id);
+            ELSE
+                INSERT INTO cambios_alcance (materia_id, estudiante_id)
+                SELECT DISTINCT materia_id, estudiante_id FROM filas;
+            END IF;
+            RETURN NULL;
+        END $$ LANGUAGE plpgsql
+    """)
+    op.execute(
+        "CREATE TRIGGER trg_materias_alcance AFTER UPDATE ON materias "
+        "REFERENCING OLD TABLE AS viejas NEW TABLE AS nuevas "
+        "FOR EACH STATEMENT EXECUTE FUNCTION registrar_alcance_materias()"
+    )
+    op.execute(
+        "CREATE TRIGGER trg_estudiantes_materias_alcance_alta AFTER INSERT ON estudiantes_materias "
+        "REFERENCING NEW TABLE AS filas FOR EACH STATEMENT EXECUTE FUNCTION registrar_alcance_inscripciones()"
+    )
+    op.execute(
+        "CREATE TRIGGER trg_estudiantes_materias_alcance_baja AFTER DELETE ON estudiantes_materias "
+        "REFERENCING OLD TABLE AS filas FOR EACH STATEMENT EXECUTE FUNCTION registrar_alcance_inscripciones()"
+    )
+    op.execute(
+        "CREATE TRIGGER trg_estudiantes_materias_alcance_cambio AFTER UPDATE ON estudiantes_materias "
+        "REFERENCING OLD TABLE AS viejas NEW TABLE AS nuevas "
+        "FOR EACH STATEMENT EXECUTE FUNCTION registrar_alcance_inscripciones()"
+    )
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS trg_estudiantes_materias_alcance_cambio ON estudiantes_materias")
+    op.execute("DROP TRIGGER IF EXISTS trg_estudiantes_materias_alcance_baja ON estudiantes_materias")
+    op.execute("DROP TRIGGER IF EXISTS trg_estudiantes_materias_alcance_alta ON estudiantes_materias")
+    op.execute("DROP TRIGGER IF EXISTS trg_materias_alcance ON materias")
+    op.execute("DROP FUNCTION IF EXISTS registrar_alcance_inscripciones()")
+    op.execute("DROP FUNCTION IF EXISTS registrar_alcance_materias()")
+    op.execute("""
+        CREATE OR REPLACE FUNCTION registrar_eliminaciones() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO eliminaciones (tabla, registro_id, eliminado_en)
+            SELECT TG_TABLE_NAME, id, now() FROM borradas;
+            RETURN NULL;
+        END $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION marcar_actualizado() RETURNS trigger AS $$
+        BEGIN
+            NEW.actualizado_en := now();
+            RETURN NEW;
+        END $$ LANGUAGE plpgsql
+    """)
+    op.drop_table('cambios_alcance')
+
+    op.drop_index('ix_eliminaciones_transaccion_id', table_name='eliminaciones')
+    for columna in ('estudiante_id', 'docente_id', 'materia_id', 'transaccion_id'):
+        op.drop_column('eliminaciones', columna)
+
+    for tabla in reversed(TABLAS):
+        op.drop_index(f'ix_{tabla}_transaccion', table_name=tabla)
+        op.create_index(f'ix_{tabla}_actualizado', tabla, ['actualizado_en', 'id'])
+        op.drop_column(tabla, 'transaccion_id')
@@ -0,0 +1,48 @@
+"""registro único por estudiante y clase entre particiones
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18 19:30:00
+
+El índice único (estudiante_id, clase_id) de registros_de_asistencia es
+de cada partición mensual y no evita un segundo registro de la misma
+clase en otro mes. La tabla registros_unicos (sin particionar) guarda el
+par de cada registro y todo INSERT lo toma antes. Se carga con los
+registros enganchados; si había duplicados entre meses se conserva el
+más temprano, y conviene correr `flask acumulados reconstruir` después.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'registros_unicos',
+        sa.Column('estudiante_id', sa.Integer(), sa.ForeignKey('estudiantes.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('clase_id', sa.Integer(), sa.ForeignKey('clases.id', ondelete='CASCADE'), primary_key=True),
+    )
+    op.create_index('ix_registros_unicos_clase_id', 'registros_unicos', ['clase_id'])
+
+    op.execute("""
+        DELETE FROM registros_de_asistencia r
+        USING registros_de_asistencia p
+        WHERE p.estudiante_id = r.estudiante_id AND p.clase_id = r.clase_id
+          AND (p.fecha_hora, p.id) < (r.fecha_hora, r.id)
+    """)
+    op.execute("""
+        INSERT INTO registros_unicos (estudiante_id, clase_id)
+        SELECT estudiante_id, clase_id FROM registros_de_asistencia
+    """)
+
+
+def downgrade():
+    op.drop_index('ix_registros_unicos_clase_id', table_name='registros_unicos')
+    op.drop_table('registros_unicos')
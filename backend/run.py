@@ -1,13 +1,29 @@
-from app import create_app, db, socketio
+from app import create_app, socketio
 from dotenv import load_dotenv
+import os
 import socket
 
 load_dotenv()
 
+DEBUG = True  # socketio.run con recargador
 app = create_app()
 
 with app.app_context():
-    db.create_all()
+    from flask_migrate import upgrade
+    from app.utils.particiones import crear_particiones_futuras
+    from app.utils.importaciones import importaciones
+    from app.utils.indice_materias import indice_materias
+    from app.utils.cola_registros import cola_registros
+
+    upgrade()  # migraciones en backend/migrations (flask db upgrade)
+    crear_particiones_futuras()
+    importaciones.reanudar()  # importaciones cortadas por un reinicio
+    indice_materias.cargar()  # autocompletado de materias en memoria
+
+    # Con el recargador, este archivo corre también en el proceso que solo
+    # vigila los cambios: el diario lo toma únicamente el que atiende
+    if not DEBUG or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        cola_registros.iniciar()  # write-behind: recupera el diario y arranca el volcado
 
 
 def obtener_ip_local():
@@ -34,7 +50,7 @@ if __name__ == '__main__':
         app,
         host="0.0.0.0",
         port=5000,
-        debug=True,
+        debug=DEBUG,
         ssl_context=(
             "C:/Users/ok/Desktop/proyecto de asistencia/frontend/127.0.0.1+3.pem",
             "C:/Users/ok/Desktop/proyecto de asistencia/frontend/127.0.0.1+3-key.pem"
@@ -0,0 +1,74 @@
+from datetime import date, time, datetime, timedelta
+import pytest
+from app.models import (
+    Usuario, Docente, Estudiante, Carrera, Curso, Materia, Clase, EstudiantesMaterias,
+    RegistrosDeAsistencia, AcumuladoAsistencia
+)
+from app.utils import acumulados
+
+# ============================================================
+# ACUMULADOS: CHECK-INS INCREMENTALES VS. RECONSTRUCCIÓN
+# ============================================================
+# Clases hace 5 y hace 1 día; el estudiante se reinscribió hace 3 días,
+# así que solo le cuenta la de ayer.
+
+
+@pytest.fixture
+def datos(db):
+    carrera = Carrera(nombre="Sistemas")
+    db.session.add(carrera)
+    db.session.flush()
+    curso = Curso(nombre="1A", nivel="1", carrera_id=carrera.id)
+    usuarios = [Usuario(nombre=f"U{i}", apellido="T", correo=f"u{i}@test", rol="x") for i in range(2)]
+    db.session.add_all([curso, *usuarios])
+    db.session.flush()
+    docente = Docente(usuario_id=usuarios[0].id)
+    estudiante = Estudiante(usuario_id=usuarios[1].id, curso_id=curso.id)
+    db.session.add_all([docente, estudiante])
+    db.session.flush()
+    materia = Materia(nombre="Matemática", curso_id=curso.id, docente_id=docente.id)
+    db.session.add(materia)
+    db.session.flush()
+
+    hoy = date.today()
+    clases = [Clase(materia_id=materia.id, docente_id=docente.id, fecha=hoy - timedelta(days=d),
+                    hora_inicio=time(8), hora_fin=time(10)) for d in (5, 1)]
+    db.session.add_all([*clases, EstudiantesMaterias(
+        estudiante_id=estudiante.id, materia_id=materia.id, estado="activo",
+        fecha_alta=datetime.now() - timedelta(days=3)
+    )])
+    db.session.commit()
+    acumulados.reconstruir()
+    db.session.commit()
+    return {"estudiante": estudiante.id, "materia": materia.id, "clases": [c.id for c in clases],
+            "fechas": [c.fecha for c in clases]}
+
+
+def _contadores(db, datos):
+    db.session.expire_all()
+    a = db.session.get(AcumuladoAsistencia, (datos["estudiante"], datos["materia"]))
+    return a.clases, a.presentes, a.tardanzas, a.ausentes
+
+
+def _registrar(db, datos, indice):
+    fecha_hora = datetime.combine(datos["fechas"][indice], time(8, 1))
+    db.session.add(RegistrosDeAsistencia(estudiante_id=datos["estudiante"], clase_id=datos["clases"][indice],
+                                         método_registro="QR", fecha_hora=fecha_hora))
+    acumulados.registrar_presencias([(datos["estudiante"], datos["clases"][indice], fecha_hora)])
+    db.session.commit()
+
+
+def test_check_in_anterior_a_la_reinscripcion_no_cuenta(app, db, datos):
+    _registrar(db, datos, 0)
+
+    assert _contadores(db, datos) == (1, 0, 0, 1)
+
+
+def test_incremental_coincide_con_reconstruir(app, db, datos):
+    _registrar(db, datos, 0)
+    _registrar(db, datos, 1)
+    incremental = _contadores(db, datos)
+
+    acumulados.reconstruir()
+    db.session.commit()
+    assert incremental == _contadores(db, datos) == (1, 1, 0, 0)
@@ -0,0 +1,128 @@
+import socket
+import pytest
+from aiosmtpd.controller import Controller
+from app import mail
+from app.models import CorreoSaliente
+from app.utils.email import send_email, send_emails
+from app.utils.envio_correos import envio_correos
+
+# ============================================================
+# BANDEJA DE SALIDA CONTRA UN SERVIDOR SMTP DE PRUEBA
+# ============================================================
+# aiosmtpd recibe los correos en memoria; los destinatarios que empiezan
+# con "rechazar" se rechazan con 550 para probar los reintentos.
+
+
+class Buzon:
+    def __init__(self):
+        self.recibidos = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("rechazar"):
+            return "550 buzón inexistente"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.recibidos.append((envelope.rcpt_tos, envelope.content.decode("utf-8", "replace")))
+        return "250 OK"
+
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _usar_servidor(app, puerto):
+    app.config.update(
+        MAIL_SERVER="127.0.0.1", MAIL_PORT=puerto, MAIL_USE_TLS=False, MAIL_USE_SSL=False,
+        MAIL_USERNAME=None, MAIL_PASSWORD=None, MAIL_SUPPRESS_SEND=False,
+        MAIL_DEFAULT_SENDER=("Sistema de Asistencia", "asistencia@test")
+    )
+    mail.init_app(app)  # Flask-Mail lee la configuración al iniciarse
+
+
+@pytest.fixture
+def buzon(app):
+    buzon = Buzon()
+    servidor = Controller(buzon, hostname="127.0.0.1", port=_puerto_libre())
+    servidor.start()
+    _usar_servidor(app, servidor.port)
+    app.config.update(CORREOS_MAX_INTENTOS=3, CORREOS_REINTENTO_SEGUNDOS=0)
+    yield buzon
+    servidor.stop()
+
+
+def _correo(db, correo_id):
+    db.session.expire_all()
+    return db.session.get(CorreoSaliente, correo_id)
+
+
+def test_envia_y_borra_el_cuerpo(db, buzon):
+    correo_id = send_email("ana@test", "Credenciales", "Contraseña temporal: x1y2z3")
+    db.session.commit()
+
+    assert envio_correos.enviar_pendientes() == 1
+
+    assert len(buzon.recibidos) == 1
+    destinatarios, contenido = buzon.recibidos[0]
+    assert destinatarios == ["ana@test"]
+    assert "x1y2z3" in contenido
+
+    correo = _correo(db, correo_id)
+    assert correo.estado == "enviado"
+    assert correo.enviado_en is not None
+    assert correo.cuerpo is None
+
+
+def test_no_reenvia_lo_ya_enviado(db, buzon):
+    send_emails([(f"e{i}@test", "Aviso", "Hola") for i in range(3)])
+    db.session.commit()
+
+    assert envio_correos.enviar_pendientes() == 3
+    assert envio_correos.enviar_pendientes() == 0
+    assert sorted(d[0] for d, _ in buzon.recibidos) == ["e0@test", "e1@test", "e2@test"]
+
+
+def test_un_lote_reservado_no_lo_toma_otro_envio(db, buzon, app):
+    send_emails([(f"e{i}@test", "Aviso", "Hola") for i in range(2)])
+    db.session.commit()
+
+    # Otro proceso reservó el lote (proximo_intento corrido hacia adelante)
+    reservado = envio_correos._reservar(app.config)
+    assert len(reservado) == 2
+    assert envio_correos.enviar_pendientes() == 0
+    assert buzon.recibidos == []
+
+
+def test_rechazo_se_reintenta_y_termina_fallido(db, buzon):
+    rechazado = send_email("rechazar@test", "Credenciales", "Contraseña temporal: secreta")
+    aceptado = send_email("ok@test", "Credenciales", "Contraseña temporal: otra")
+    db.session.commit()
+
+    assert envio_correos.enviar_pendientes() == 2
+    correo = _correo(db, rechazado)
+    assert (correo.estado, correo.intentos) == ("pendiente", 1)
+    assert "550" in correo.ultimo_error
+    assert correo.cuerpo is not None  # todavía puede salir
+    assert _correo(db, aceptado).estado == "enviado"
+
+    # Con CORREOS_REINTENTO_SEGUNDOS = 0 vuelve a estar disponible enseguida
+    envio_correos.enviar_pendientes()
+    envio_correos.enviar_pendientes()
+    correo = _correo(db, rechazado)
+    assert (correo.estado, correo.intentos) == ("fallido", 3)
+    assert correo.cuerpo is None
+    assert [d for d, _ in buzon.recibidos] == [["ok@test"]]
+
+
+def test_sin_servidor_no_gasta_intentos(db, app):
+    _usar_servidor(app, _puerto_libre())  # nadie escucha en ese puerto
+    correo_id = send_email("ana@test", "Aviso", "Hola")
+    db.session.commit()
+
+    assert envio_correos.enviar_pendientes() == 0
+    correo = _correo(db, correo_id)
+    assert (correo.estado, correo.intentos) == ("pendiente", 0)
+    assert correo.cuerpo == "Hola"
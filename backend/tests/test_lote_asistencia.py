@@ -0,0 +1,93 @@
+import gzip
+import json
+from datetime import date, time, datetime, timedelta
+import pytest
+from flask_jwt_extended import create_access_token
+from app.models import (
+    Usuario, Docente, Estudiante, Carrera, Curso, Materia, Clase, EstudiantesMaterias,
+    RegistrosDeAsistencia
+)
+from app.utils.lote_asistencia import registrar_lote
+
+# ============================================================
+# REGISTRO DE ASISTENCIAS EN LOTE
+# ============================================================
+# Una clase de hoy a las 8 con un estudiante inscripto.
+
+
+@pytest.fixture
+def datos(db):
+    carrera = Carrera(nombre="Sistemas")
+    db.session.add(carrera)
+    db.session.flush()
+    curso = Curso(nombre="1A", nivel="1", carrera_id=carrera.id)
+    usuarios = [Usuario(nombre=f"U{i}", apellido="T", correo=f"u{i}@test", rol=r)
+                for i, r in enumerate(("docente", "estudiante"))]
+    db.session.add_all([curso, *usuarios])
+    db.session.flush()
+    docente = Docente(usuario_id=usuarios[0].id)
+    estudiante = Estudiante(usuario_id=usuarios[1].id, curso_id=curso.id)
+    db.session.add_all([docente, estudiante])
+    db.session.flush()
+    materia = Materia(nombre="Matemática", curso_id=curso.id, docente_id=docente.id)
+    db.session.add(materia)
+    db.session.flush()
+    clase = Clase(materia_id=materia.id, docente_id=docente.id, fecha=date.today(),
+                  hora_inicio=time(8), hora_fin=time(10))
+    db.session.add_all([clase, EstudiantesMaterias(
+        estudiante_id=estudiante.id, materia_id=materia.id,
+        fecha_alta=datetime.now() - timedelta(days=1), estado="activo"
+    )])
+    db.session.commit()
+    return {"usuario_docente": usuarios[0].id, "estudiante": estudiante.id, "clase": clase.id}
+
+
+def test_fecha_con_zona_se_guarda_en_hora_local(app, db, datos):
+    inicio = datetime.combine(date.today(), time(8, 5)).astimezone()
+    registro = {"estudiante_id": datos["estudiante"], "clase_id": datos["clase"],
+                "fecha_hora": inicio.isoformat()}
+
+    assert registrar_lote([registro]) == [{"indice": 0, "estado": "registrado"}]
+    guardado = db.session.query(RegistrosDeAsistencia.fecha_hora).scalar()
+    assert guardado == inicio.replace(tzinfo=None)
+
+
+def test_mismo_par_en_lotes_de_meses_distintos(app, db, datos):
+    # Lotes offline con horas en meses distintos caen en particiones distintas
+    base = datetime.combine(date.today(), time(8, 5))
+    registro = {"estudiante_id": datos["estudiante"], "clase_id": datos["clase"]}
+
+    primero = registrar_lote([{**registro, "fecha_hora": (base - timedelta(days=40)).isoformat()}])
+    segundo = registrar_lote([{**registro, "fecha_hora": base.isoformat()}])
+
+    assert [r["estado"] for r in primero + segundo] == ["registrado", "ya_registrado"]
+    assert db.session.query(RegistrosDeAsistencia).count() == 1
+
+
+def _post(cliente, cuerpo, usuario_id, **cabeceras):
+    token = create_access_token(identity={"id": usuario_id, "rol": "docente"})
+    return cliente.post("/asistencia/registrar_lote", data=cuerpo,
+                        headers={"Authorization": f"Bearer {token}", **cabeceras})
+
+
+def test_gzip_que_infla_de_mas_devuelve_413(app, db, datos):
+    app.config["ASISTENCIA_LOTE_MAX_BYTES"] = 64 * 1024
+    bomba = gzip.compress(b"[" + b" " * (10 * 1024 * 1024) + b"]")
+    try:
+        respuesta = _post(app.test_client(), bomba, datos["usuario_docente"], **{"Content-Encoding": "gzip"})
+    finally:
+        app.config["ASISTENCIA_LOTE_MAX_BYTES"] = 8 * 1024 * 1024
+
+    assert len(bomba) < 64 * 1024
+    assert respuesta.status_code == 413
+
+
+def test_docente_sin_docente_id_en_el_token(app, db, datos):
+    cuerpo = json.dumps([{"estudiante_id": datos["estudiante"], "clase_id": datos["clase"]}])
+    otro = Usuario(nombre="Otro", apellido="T", correo="otro@test", rol="docente")
+    db.session.add(otro)
+    db.session.commit()
+
+    assert _post(app.test_client(), cuerpo, otro.id).status_code == 404
+    respuesta = _post(app.test_client(), cuerpo, datos["usuario_docente"])
+    assert respuesta.status_code == 200 and respuesta.json["registrados"] == 1
@@ -0,0 +1,92 @@
+import json
+import pytest
+from sqlalchemy import text
+from app.utils.planes import CONSULTAS
+
+# ============================================================
+# LAS CONSULTAS FRECUENTES USAN SUS ÍNDICES
+# ============================================================
+# A diferencia de "flask indices verificar" (enable_seqscan = off), acá
+# el planificador corre con su configuración por defecto sobre una base
+# con volumen y estadísticas: tiene que elegir el índice por costo.
+
+# consulta de app/utils/planes.py -> índice que debe aparecer en el plan
+ESPERADOS = {
+    "estudiante por usuario": "ix_estudiantes_usuario_id",
+    "docente por usuario": "ix_docentes_usuario_id",
+    "padrón activo de una materia": "ix_estudiantes_materias_activas",
+    "materias de un estudiante": "ix_estudiantes_materias_estudiante",
+    "registros de una clase": "clase_id",  # índice heredado por cada partición
+    "reporte por fecha (keyset)": "fecha_hora_id",  # ídem
+    "clases de una materia por fecha": "ix_clases_materia_fecha",
+    "clases de un docente": "ix_clases_docente_fecha",
+    "clases por rango de fechas": "ix_clases_fecha",
+    "materias de un docente": "ix_materias_docente_id",
+    "materias por nombre (trigram)": "ix_materias_nombre_trgm",
+    "materias de un curso": "ix_materias_curso_id",
+    "cursos de una carrera": "ix_cursos_carrera_id",
+    "clases cambiadas desde una marca": "ix_clases_transaccion",
+    "lápidas desde una marca": "ix_eliminaciones_transaccion_id",
+    "acumulados de una materia": "ix_acumulados_asistencia_materia_id",
+}
+
+SEMILLA = [
+    "INSERT INTO carreras (nombre) SELECT 'Carrera ' || i FROM generate_series(1, 200) i",
+    "INSERT INTO cursos (nombre, nivel, carrera_id) "
+    "SELECT 'Curso ' || i, '1', 1 + i % 200 FROM generate_series(1, 4000) i",
+    "INSERT INTO usuarios (nombre, apellido, correo, rol) "
+    "SELECT 'U' || i, 'A' || i, 'u' || i || '@test', CASE WHEN i <= 2000 THEN 'docente' ELSE 'estudiante' END "
+    "FROM generate_series(1, 22000) i",
+    "INSERT INTO docentes (usuario_id) SELECT i FROM generate_series(1, 2000) i",
+    "INSERT INTO estudiantes (usuario_id, curso_id) SELECT i, 1 + i % 4000 FROM generate_series(2001, 22000) i",
+    "INSERT INTO materias (nombre, curso_id, docente_id) "
+    "SELECT 'Materia ' || i, 1 + i % 4000, 1 + i % 2000 FROM generate_series(1, 10000) i",
+    # Marcas de sincronización repartidas: solo las últimas ~1000 quedan después de una marca reciente
+    "INSERT INTO clases (materia_id, docente_id, fecha, hora_inicio, hora_fin, transaccion_id) "
+    "SELECT 1 + i % 10000, 1 + i % 2000, current_date - (i % 730), '08:00', '10:00', "
+    "pg_current_xact_id()::text::bigint - 100000 + i "
+    "FROM generate_series(1, 100000) i",
+    "INSERT INTO estudiantes_materias (estudiante_id, materia_id, fecha_alta, estado) "
+    "SELECT 1 + i % 20000, 1 + (i * 7) % 10000, now(), CASE WHEN i % 10 = 0 THEN 'baja' ELSE 'activo' END "
+    "FROM generate_series(1, 100000) i",
+    "INSERT INTO registros_de_asistencia (estudiante_id, clase_id, \"método_registro\", fecha_hora) "
+    "SELECT 1 + i % 20000, 1 + i / 20, 'QR', date_trunc('month', now()) + (i % 600) * interval '1 hour' "
+    "FROM generate_series(1, 200000) i",
+    "INSERT INTO acumulados_asistencia (estudiante_id, materia_id, clases, presentes, tardanzas, ausentes) "
+    "SELECT DISTINCT estudiante_id, materia_id, 0, 0, 0, 0 FROM estudiantes_materias",
+    "INSERT INTO eliminaciones (tabla, registro_id, transaccion_id) "
+    "SELECT 'clases', 100000 + i, pg_current_xact_id()::text::bigint - 100000 + i "
+    "FROM generate_series(1, 100000) i",
+    "ANALYZE",
+]
+
+
+def _indices(nodo):
+    encontrados = {nodo["Index Name"]} if "Index Name" in nodo else set()
+    for hijo in nodo.get("Plans", []):
+        encontrados |= _indices(hijo)
+    return encontrados
+
+
+@pytest.fixture(scope="module")
+def base_poblada(db_modulo):
+    for sentencia in SEMILLA:
+        db_modulo.session.execute(text(sentencia))
+    db_modulo.session.commit()
+    return db_modulo
+
+
+@pytest.mark.parametrize("nombre", sorted(ESPERADOS))
+def test_consulta_usa_su_indice(base_poblada, nombre):
+    if nombre == "materias por nombre (trigram)" and not base_poblada.session.execute(
+        text("SELECT to_regclass('ix_materias_nombre_trgm') IS NOT NULL")
+    ).scalar():
+        pytest.skip("servidor sin pg_trgm")
+
+    sql = dict((n, s) for n, _, s in CONSULTAS)[nombre]
+    plan = base_poblada.session.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    indices = _indices(plan[0]["Plan"])
+    assert any(ESPERADOS[nombre] in i for i in indices), f"{nombre}: plan sin el índice esperado ({indices})"
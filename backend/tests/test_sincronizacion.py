@@ -0,0 +1,125 @@
+from datetime import date, time, datetime
+import pytest
+from sqlalchemy import text
+from app.models import (
+    Usuario, Docente, Estudiante, Carrera, Curso, Materia, Clase, EstudiantesMaterias
+)
+from app.utils.sincronizacion import sincronizar
+
+# ============================================================
+# SINCRONIZACIÓN INCREMENTAL
+# ============================================================
+# Dos docentes y dos estudiantes; la materia es del docente 1 y solo el
+# estudiante 1 está inscripto. Cada prueba toma una marca, hace cambios y
+# mira el delta que recibe cada usuario.
+
+ADMIN = {"id": 0, "rol": "administrador"}
+
+
+@pytest.fixture
+def datos(db):
+    carrera = Carrera(nombre="Sistemas")
+    db.session.add(carrera)
+    db.session.flush()
+    curso = Curso(nombre="1A", nivel="1", carrera_id=carrera.id)
+    db.session.add(curso)
+    db.session.flush()
+
+    usuarios = [Usuario(nombre=f"U{i}", apellido="T", correo=f"u{i}@test", rol="x") for i in range(4)]
+    db.session.add_all(usuarios)
+    db.session.flush()
+    docentes = [Docente(usuario_id=u.id) for u in usuarios[:2]]
+    estudiantes = [Estudiante(usuario_id=u.id, curso_id=curso.id) for u in usuarios[2:]]
+    db.session.add_all(docentes + estudiantes)
+    db.session.flush()
+
+    materia = Materia(nombre="Matemática", curso_id=curso.id, docente_id=docentes[0].id)
+    db.session.add(materia)
+    db.session.flush()
+    clase = Clase(materia_id=materia.id, docente_id=docentes[0].id, fecha=date.today(),
+                  hora_inicio=time(8), hora_fin=time(10))
+    inscripcion = EstudiantesMaterias(estudiante_id=estudiantes[0].id, materia_id=materia.id,
+                                      fecha_alta=datetime.now(), estado="activo")
+    db.session.add_all([clase, inscripcion])
+    db.session.commit()
+
+    return {
+        "materia": materia.id, "clase": clase.id, "inscripcion": inscripcion.id,
+        "docentes": [{"id": 0, "rol": "docente", "docente_id": d.id} for d in docentes],
+        "estudiantes": [{"id": 0, "rol": "estudiante", "estudiante_id": e.id} for e in estudiantes],
+    }
+
+
+def _ids(respuesta, tabla):
+    return sorted(f["id"] for f in respuesta["cambios"][tabla])
+
+
+def test_transaccion_que_confirma_despues_de_la_marca(app, db, datos):
+    # Una transacción ya en curso (con xid asignado) cuando se toma la marca
+    with db.engine.connect() as otra:
+        otra.execute(text("UPDATE clases SET hora_fin = '11:00' WHERE id = :id"), {"id": datos["clase"]})
+        marca = sincronizar(ADMIN)["marca"]
+        otra.commit()
+
+    assert _ids(sincronizar(ADMIN, marca=marca), "clases") == [datos["clase"]]
+
+
+def test_sin_cambios_no_reenvia_nada(app, db, datos):
+    marca = sincronizar(ADMIN)["marca"]
+    respuesta = sincronizar(ADMIN, marca=marca)
+
+    assert not respuesta["reiniciar"]
+    assert all(not filas for filas in respuesta["cambios"].values())
+
+
+def test_inscripcion_nueva_reenvia_materia_y_clases(app, db, datos):
+    estudiante = datos["estudiantes"][1]
+    primera = sincronizar(estudiante)
+    assert _ids(primera, "materias") == [] and _ids(primera, "clases") == []
+
+    db.session.add(EstudiantesMaterias(estudiante_id=estudiante["estudiante_id"], materia_id=datos["materia"],
+                                       fecha_alta=datetime.now(), estado="activo"))
+    db.session.commit()
+    respuesta = sincronizar(estudiante, marca=primera["marca"])
+
+    assert _ids(respuesta, "materias") == [datos["materia"]]
+    assert _ids(respuesta, "clases") == [datos["clase"]]
+
+
+def test_baja_quita_materia_y_clases(app, db, datos):
+    estudiante = datos["estudiantes"][0]
+    marca = sincronizar(estudiante)["marca"]
+
+    db.session.get(EstudiantesMaterias, datos["inscripcion"]).estado = "baja"
+    db.session.commit()
+    respuesta = sincronizar(estudiante, marca=marca)
+
+    assert respuesta["eliminados"]["materias"] == [datos["materia"]]
+    assert respuesta["eliminados"]["clases"] == [datos["clase"]]
+    assert _ids(respuesta, "estudiantes_materias") == [datos["inscripcion"]]  # sigue viendo su inscripción
+
+
+def test_reasignacion_de_docente(app, db, datos):
+    anterior, nuevo = datos["docentes"]
+    marcas = [sincronizar(d)["marca"] for d in (anterior, nuevo)]
+
+    db.session.get(Materia, datos["materia"]).docente_id = nuevo["docente_id"]
+    db.session.commit()
+    quitado = sincronizar(anterior, marca=marcas[0])
+    ganado = sincronizar(nuevo, marca=marcas[1])
+
+    assert quitado["eliminados"]["materias"] == [datos["materia"]]
+    assert quitado["eliminados"]["estudiantes_materias"] == [datos["inscripcion"]]
+    assert _ids(ganado, "materias") == [datos["materia"]]
+    assert _ids(ganado, "estudiantes_materias") == [datos["inscripcion"]]
+
+
+def test_lapidas_solo_para_quien_veia_la_fila(app, db, datos):
+    usuarios = [ADMIN, *datos["docentes"], *datos["estudiantes"]]
+    marcas = [sincronizar(u)["marca"] for u in usuarios]
+
+    db.session.delete(db.session.get(Clase, datos["clase"]))
+    db.session.commit()
+    clases = [sincronizar(u, marca=m)["eliminados"]["clases"] for u, m in zip(usuarios, marcas)]
+
+    assert clases == [[datos["clase"]], [datos["clase"]], [], [datos["clase"]], []]
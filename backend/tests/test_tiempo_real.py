@@ -0,0 +1,51 @@
+from datetime import date, time, datetime
+import pytest
+from app.utils import tiempo_real
+from app.utils.tiempo_real import EmisorAsistencia
+
+# ============================================================
+# CONTADORES DEL EMISOR DE ASISTENCIA EN VIVO
+# ============================================================
+# El resumen de la clase se simula: el estudiante 1 ya estaba presente,
+# 2 y 3 figuran ausentes y 9 no está inscripto.
+
+HOY = date.today()
+CLASE = {"id": 1, "fecha": HOY, "hora_inicio": time(8)}
+A_TIEMPO = datetime.combine(HOY, time(8, 5))
+
+
+@pytest.fixture
+def emisor(monkeypatch):
+    monkeypatch.setattr(tiempo_real.padron, "nombre_de", lambda estudiante_id: ("N", "A"))
+    monkeypatch.setattr(tiempo_real, "obtener_umbrales", lambda: (10, 20))
+    emisor = EmisorAsistencia()
+    monkeypatch.setattr(emisor, "_iniciar", lambda: None)
+    return emisor
+
+
+def _resumen():
+    return {
+        "resumen": {"presentes": 1, "tardanza": 0, "ausentes": 2},
+        "ausentes_detalle": [{"estudiante_id": 2}, {"estudiante_id": 3}],
+    }
+
+
+def test_check_ins_durante_el_resumen_se_cuentan_una_vez(emisor):
+    def construir():
+        for estudiante_id in (1, 2):
+            emisor.notificar(CLASE, estudiante_id, A_TIEMPO)
+        return _resumen()
+
+    emisor.seguir_clase(1, construir)
+    emisor.notificar(CLASE, 2, A_TIEMPO)  # la misma notificación, ya aplicada
+
+    assert emisor._contadores[1] == {"presentes": 2, "tardanza": 0, "ausentes": 1}
+    assert [d["estudiante_id"] for d in emisor._pendientes[1]] == [2]
+
+
+def test_estudiante_fuera_del_padron_no_mueve_contadores(emisor):
+    emisor.seguir_clase(1, _resumen)
+    emisor.notificar(CLASE, 9, A_TIEMPO)
+
+    assert emisor._contadores[1] == {"presentes": 1, "tardanza": 0, "ausentes": 2}
+    assert 1 not in emisor._pendientes
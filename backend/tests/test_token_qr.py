@@ -0,0 +1,48 @@
+from datetime import date, time
+import pytest
+from flask_jwt_extended import create_access_token
+from app.models import Usuario, Docente, Carrera, Curso, Materia, Clase
+from app.utils.padron import padron
+
+# ============================================================
+# TOKEN QR VIGENTE DE UNA CLASE
+# ============================================================
+# Dos docentes; la clase es del primero.
+
+
+@pytest.fixture
+def datos(db):
+    carrera = Carrera(nombre="Sistemas")
+    db.session.add(carrera)
+    db.session.flush()
+    curso = Curso(nombre="1A", nivel="1", carrera_id=carrera.id)
+    usuarios = [Usuario(nombre=f"U{i}", apellido="T", correo=f"u{i}@test", rol="docente") for i in range(2)]
+    db.session.add_all([curso, *usuarios])
+    db.session.flush()
+    docentes = [Docente(usuario_id=u.id) for u in usuarios]
+    db.session.add_all(docentes)
+    db.session.flush()
+    materia = Materia(nombre="Matemática", curso_id=curso.id, docente_id=docentes[0].id)
+    db.session.add(materia)
+    db.session.flush()
+    clase = Clase(materia_id=materia.id, docente_id=docentes[0].id, fecha=date.today(),
+                  hora_inicio=time(8), hora_fin=time(10))
+    db.session.add(clase)
+    db.session.commit()
+    yield {"usuarios": [u.id for u in usuarios], "clase": clase.id}
+    padron.limpiar()
+
+
+def _get(app, ruta, identidad):
+    token = create_access_token(identity=identidad)
+    return app.test_client().get(ruta, headers={"Authorization": f"Bearer {token}"})
+
+
+@pytest.mark.parametrize("ruta", ["/clases/token_qr/{}", "/clases/generar_qr/{}"])
+def test_solo_el_docente_de_la_clase_o_un_admin(app, db, datos, ruta):
+    ruta = ruta.format(datos["clase"])
+    propio, ajeno = ({"id": u, "rol": "docente"} for u in datos["usuarios"])
+
+    assert _get(app, ruta, ajeno).status_code == 403
+    assert _get(app, ruta, propio).status_code == 200
+    assert _get(app, ruta, {"id": 0, "rol": "administrador"}).status_code == 200
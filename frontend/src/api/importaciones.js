@@ -0,0 +1,14 @@
+import axios from "./axios";
+
+// Las importaciones se procesan en segundo plano: el POST devuelve el
+// trabajo (202) y se consulta /importaciones/<id> hasta que termina.
+export async function esperarImportacion(trabajo, onAvance, intervaloMs = 1000) {
+  let estado = trabajo;
+  while (estado.estado === "pendiente" || estado.estado === "procesando") {
+    await new Promise((resolver) => setTimeout(resolver, intervaloMs));
+    const res = await axios.get(`/importaciones/${estado.id}`);
+    estado = res.data;
+    if (onAvance) onAvance(estado);
+  }
+  return estado;
+}
@@ -1,11 +1,13 @@
 import { useState } from "react";
 import axios from "../api/axios";
+import { esperarImportacion } from "../api/importaciones";
 import { toast } from "react-toastify";
 
 export default function FormularioImportarUsuarios({ onClose, onSuccess }) {
   const [archivo, setArchivo] = useState(null);
   const [cargando, setCargando] = useState(false);
   const [resultado, setResultado] = useState(null);
+  const [avance, setAvance] = useState(null);
   const [tiposErrores, setTiposErrores] = useState([]);
 
   const handleFileChange = (e) => {
@@ -44,12 +46,21 @@ export default function FormularioImportarUsuarios({ onClose, onSuccess }) {
         headers: { "Content-Type": "multipart/form-data" },
       });
 
-      setResultado(res.data);
+      const trabajo = await esperarImportacion(res.data, setAvance);
+      if (trabajo.estado === "fallido") {
+        toast.error(trabajo.mensaje_error || "Error al importar");
+        return;
+      }
 
-      const errores = res.data?.detalle?.errores || [];
+      const errores = trabajo.errores || [];
+      setResultado({
+        total_importados: trabajo.filas_importadas,
+        total_errores: trabajo.total_errores,
+        detalle: { errores },
+      });
       setTiposErrores(analizarErrores(errores));
 
-      if (res.data.total_importados > 0 && errores.length === 0) {
+      if (trabajo.filas_importadas > 0 && trabajo.total_errores === 0) {
         toast.success("✅ Importación completada sin errores");
         if (onSuccess) onSuccess();
         onClose();
@@ -60,6 +71,7 @@ export default function FormularioImportarUsuarios({ onClose, onSuccess }) {
       toast.error(err.response?.data?.error || "Error al importar");
     } finally {
       setCargando(false);
+      setAvance(null);
     }
   };
 
@@ -79,7 +91,9 @@ export default function FormularioImportarUsuarios({ onClose, onSuccess }) {
           disabled={cargando}
           className="bg-blue-600 text-white px-4 py-2 rounded-lg hover:bg-blue-700"
         >
-          {cargando ? "Importando..." : "Importar"}
+          {cargando
+            ? `Importando... ${avance ? `(${avance.filas_procesadas} filas)` : ""}`
+            : "Importar"}
         </button>
         <button
           type="button"
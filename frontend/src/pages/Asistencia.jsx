@@ -10,6 +10,7 @@ import {
   ResponsiveContainer
 } from "recharts";
 import useAuth from "../hooks/useAuth";
+import { io } from "socket.io-client";
 
 const PALETA = {
   primario: "#237BB2",
@@ -23,6 +24,7 @@ export default function Asistencia() {
 
   const [materias, setMaterias] = useState([]);
   const [materiaId, setMateriaId] = useState("");
+  const [claseId, setClaseId] = useState(null);
 
   const [resumen, setResumen] = useState({
     presentes: 0,
@@ -51,11 +53,19 @@ export default function Asistencia() {
     cargarMaterias();
   }, [auth]);
 
+  const aplicarResumen = (data) => {
+    setResumen(data.resumen);
+    setPresentes(data.presentes_detalle);
+    setTardanza(data.tardanza_detalle);
+    setAusentes(data.ausentes_detalle);
+  };
+
   // ============================================================
   // OBTENER RESUMEN CUANDO CAMBIA LA MATERIA
   // ============================================================
   useEffect(() => {
     if (!materiaId) return;
+    setClaseId(null);
 
     const cargarResumen = async () => {
       try {
@@ -65,10 +75,8 @@ export default function Asistencia() {
           }
         });
 
-        setResumen(res.data.resumen);
-        setPresentes(res.data.presentes_detalle);
-        setTardanza(res.data.tardanza_detalle);
-        setAusentes(res.data.ausentes_detalle);
+        aplicarResumen(res.data);
+        setClaseId(res.data.clase_id);
 
       } catch (error) {
         console.error("Error al obtener resumen:", error);
@@ -78,6 +86,44 @@ export default function Asistencia() {
     cargarResumen();
   }, [materiaId, auth]);
 
+  // ============================================================
+  // ASISTENCIA EN VIVO (SOCKET.IO): SIN VOLVER A CONSULTAR
+  // ============================================================
+  // Al entrar a la sala llega el resumen completo y después solo los
+  // check-ins nuevos ("asistencia_delta") con los contadores al día.
+  useEffect(() => {
+    if (!claseId || !auth?.accessToken) return;
+
+    const socket = io({
+      path: "/api/socket.io",
+      transports: ["websocket"],
+      auth: { token: auth.accessToken },
+    });
+
+    // También al reconectar: la sesión del servidor es nueva
+    socket.on("connect", () => socket.emit("unirse_clase", { clase_id: claseId }));
+    socket.on("connect_error", (err) => console.error("Sin asistencia en vivo:", err.message));
+
+    socket.on("asistencia_resumen", aplicarResumen);
+    socket.on("asistencia_delta", (delta) => {
+      if (delta.clase_id !== claseId) return;
+      // Un registro fuera de la tolerancia sigue contando como ausente
+      const llegaron = delta.registros.filter((r) => r.estado !== "ausente");
+      const ids = new Set(llegaron.map((r) => r.estudiante_id));
+
+      setResumen(delta.resumen);
+      setAusentes((prev) => prev.filter((a) => !ids.has(a.estudiante_id)));
+      setPresentes((prev) => [...prev, ...llegaron.filter((r) => r.estado === "presente")]);
+      setTardanza((prev) => [...prev, ...llegaron.filter((r) => r.estado === "tardanza")]);
+    });
+    socket.on("error", (err) => console.error("Asistencia en vivo:", err));
+
+    return () => {
+      socket.emit("salir_clase", { clase_id: claseId });
+      socket.disconnect();
+    };
+  }, [claseId, auth]);
+
   // ============================================================
   // DATOS PARA EL GRÁFICO
   // ============================================================
@@ -12,13 +12,24 @@ const Clases = () => {
   const [mostrarModal, setMostrarModal] = useState(false);
   const [qrToken, setQrToken] = useState("");
   const [claseQR, setClaseQR] = useState(null);
+  const [siguiente, setSiguiente] = useState(null);
+  const [desde, setDesde] = useState("");
+  const [hasta, setHasta] = useState("");
 
-  const fetchClases = async () => {
+  // El backend devuelve las clases de a páginas (sin fechas, el
+  // cuatrimestre en curso): la siguiente se pide con X-Siguiente-Cursor.
+  const fetchClases = async (cursor = null) => {
+    const params = {};
+    if (desde) params.desde = desde;
+    if (hasta) params.hasta = hasta;
+    if (cursor) params.cursor = cursor;
     try {
       const res = await axios.get("/clases/", {
         headers: { Authorization: `Bearer ${auth?.accessToken}` },
+        params,
       });
-      setClases(res.data);
+      setClases((prev) => (cursor ? [...prev, ...res.data] : res.data));
+      setSiguiente(res.headers["x-siguiente-cursor"] || null);
     } catch (err) {
       setError("No se pudieron cargar las clases.");
       console.error(err);
@@ -27,7 +38,37 @@ const Clases = () => {
 
   useEffect(() => {
     fetchClases();
-  }, [auth]);
+  }, [auth, desde, hasta]);
+
+  // El token del QR rota cada pocos segundos (QR_ROTACION_SEGUNDOS) y vence
+  // enseguida: mientras el modal está abierto se pide el vigente justo
+  // después de cada rotación, mucho antes de que venza el que se muestra.
+  useEffect(() => {
+    if (!claseQR) return;
+    let timer = null;
+    let activo = true;
+
+    const refrescar = async () => {
+      let espera = 5000;
+      try {
+        const res = await axios.get(`/clases/token_qr/${claseQR.id}`, {
+          headers: { Authorization: `Bearer ${auth?.accessToken}` },
+        });
+        if (!activo) return;
+        setQrToken(res.data.token);
+        espera = Math.max(res.data.expira_en * 1000, 0) + 250;
+      } catch (err) {
+        console.error(err);
+      }
+      if (activo) timer = setTimeout(refrescar, espera);
+    };
+
+    timer = setTimeout(refrescar, 0);
+    return () => {
+      activo = false;
+      clearTimeout(timer);
+    };
+  }, [claseQR, auth]);
 
   const generarQR = async (clase) => {
     try {
@@ -54,6 +95,15 @@ const Clases = () => {
         </button>
       )}
 
+      <div className="flex gap-4 items-center mt-4 text-lg">
+        <label>
+          Desde <input type="date" value={desde} onChange={(e) => setDesde(e.target.value)} className="border px-3 py-2 rounded" />
+        </label>
+        <label>
+          Hasta <input type="date" value={hasta} onChange={(e) => setHasta(e.target.value)} className="border px-3 py-2 rounded" />
+        </label>
+      </div>
+
       {error && <p className="text-red-500 mt-2">{error}</p>}
 
       <div className="overflow-x-auto mt-6 shadow-lg border border-black">
@@ -95,6 +145,14 @@ const Clases = () => {
         </table>
       </div>
 
+      {siguiente && (
+        <div className="flex justify-center mt-4">
+          <button onClick={() => fetchClases(siguiente)} className="bg-[#375982] text-white px-4 py-2 rounded hover:bg-[#2c4668] transition">
+            Cargar más clases
+          </button>
+        </div>
+      )}
+
       {mostrarModal && (
         <div className="fixed inset-0 flex items-center justify-center bg-black bg-opacity-50 z-50">
           <div className="bg-white p-6 rounded-lg w-full max-w-md">
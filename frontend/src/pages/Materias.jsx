@@ -1,6 +1,7 @@
 import { useEffect, useState } from "react";
 import { useNavigate } from "react-router-dom";
 import axios from "../api/axios";
+import { esperarImportacion } from "../api/importaciones";
 import useAuth from "../hooks/useAuth";
 import { toast } from "react-toastify";
 
@@ -215,8 +216,18 @@ export default function Materias() {
         },
       });
 
-      toast.success(res.data.mensaje);
       setMostrarModalImportar(false);
+      const trabajo = await esperarImportacion(res.data);
+      if (trabajo.estado === "fallido") {
+        toast.error(trabajo.mensaje_error || "Error al importar");
+        return;
+      }
+
+      if (trabajo.total_errores > 0) {
+        toast.warning(`${trabajo.filas_importadas} materias importadas, ${trabajo.total_errores} con errores`);
+      } else {
+        toast.success(`${trabajo.filas_importadas} materias importadas`);
+      }
 
       obtenerMaterias();
     } catch (err) {
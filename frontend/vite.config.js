@@ -18,6 +18,7 @@ export default defineConfig({
         target: 'https://localhost:5000',
         changeOrigin: true,
         secure: false,
+        ws: true, // Socket.IO (asistencia en vivo)
         rewrite: path => path.replace(/^\/api/, '')
       }
     }